@@ -0,0 +1,257 @@
+"""Замеры обрезки, конвертации, ffprobe и шины сообщений на синтетическом видео.
+
+Входные файлы генерируются ffmpeg из lavfi (testsrc2 + sine) с bitexact-флагами,
+поэтому на одной машине и версии ffmpeg они одинаковы от запуска к запуску.
+Сеть и видеокарта не нужны.
+
+    python benchmarks/media.py                           # всё, результат в JSON
+    python benchmarks/media.py --quick --only cut,probe  # быстрый прогон части замеров
+    python benchmarks/media.py --save base.json          # сохранить как эталон
+    python benchmarks/media.py --baseline base.json      # сравнить; код 1 при регрессии
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# (имя, ширина, высота, длительность в секундах)
+SOURCES = [
+    ("360p_10s", 640, 360, 10),
+    ("720p_30s", 1280, 720, 30),
+    ("1080p_30s", 1920, 1080, 30),
+]
+QUICK_SOURCES = SOURCES[:1]
+CUT_RANGE = ("00:00:02", "00:00:08")
+CRFS = ["23", "30"]
+
+def generate(ffmpeg, folder, name, width, height, duration):
+    """Синтетический mp4 (H.264 + AAC, GOP 2 с); уже созданный файл переиспользуется."""
+    path = os.path.join(folder, f"{name}.mp4")
+    if os.path.exists(path):
+        return path
+    cmd = [
+        ffmpeg, "-hide_banner", "-loglevel", "error", "-y",
+        "-f", "lavfi", "-i", f"testsrc2=size={width}x{height}:rate=25:duration={duration}",
+        "-f", "lavfi", "-i", f"sine=frequency=440:sample_rate=48000:duration={duration}",
+        "-c:v", "libx264", "-preset", "ultrafast", "-g", "50", "-pix_fmt", "yuv420p",
+        "-c:a", "aac", "-b:a", "128k", "-shortest",
+        "-fflags", "+bitexact", "-flags", "+bitexact", "-map_metadata", "-1",
+        path,
+    ]
+    subprocess.run(cmd, check=True)
+    return path
+
+class Collector:
+    """Приёмник сообщений воркера: запоминает метрики задач и ошибки."""
+    def __init__(self):
+        self.metrics = []
+        self.errors = []
+
+    def put(self, item):
+        _, msg_type, data = item
+        if msg_type == "metrics":
+            self.metrics.append(data)
+        elif msg_type == "error":
+            self.errors.append(data)
+
+def _timed(func, runs):
+    """Медиана времени runs запусков и метрики последнего (fps, CPU и т.д.)."""
+    samples, sink = [], None
+    for _ in range(runs):
+        sink = Collector()
+        t0 = time.perf_counter()
+        func(sink)
+        samples.append(time.perf_counter() - t0)
+        if sink.errors:
+            return {"error": sink.errors[0]}
+    result = {"wall_s": round(statistics.median(samples), 3), "runs": runs}
+    if sink.metrics:
+        m = sink.metrics[-1]
+        result.update({k: m.get(k) for k in ("fps", "speed", "cpu_s", "output_bytes")})
+    return result
+
+def bench_cut(sources, runs):
+    from workers import cut_worker
+    results = {}
+    for name, path in sources.items():
+        for smart in (False, True):
+            suffix = "_bench_smart" if smart else "_bench_cut"
+            run = lambda sink: cut_worker([path], *CUT_RANGE, suffix, sink, threading.Event(),
+                                          smart=smart, skip_done=False)
+            results[f"cut/{name}/{'smart' if smart else 'copy'}"] = _timed(run, runs)
+    return results
+
+def bench_convert(sources, runs, crfs):
+    from workers import convert_worker
+    from command_builder import PRESETS
+    results = {}
+    for name, path in sources.items():
+        for preset_name in PRESETS:
+            for crf in crfs:
+                settings = {"preset_name": preset_name, "crf": crf, "suffix": f"_bench_{preset_name.replace(' ', '_')}_{crf}",
+                            "out_format": "mp4", "skip_done": False}
+                run = lambda sink: convert_worker([path], settings, sink, threading.Event(), jobs=1)
+                results[f"convert/{name}/{preset_name}/crf{crf}"] = _timed(run, runs)
+    return results
+
+def bench_probe(sources, runs, workdir):
+    """ffprobe без кэша, промах кэша (ffprobe + запись), попадание в память и в SQLite."""
+    from utils import run_ffprobe
+    from probe_cache import ProbeCache
+    results = {}
+    for name, path in sources.items():
+        db = os.path.join(workdir, f"probe_{name}.sqlite")
+        cold, miss, memory, disk = [], [], [], []
+        for _ in range(runs):
+            t0 = time.perf_counter(); run_ffprobe(path, use_cache=False); cold.append(time.perf_counter() - t0)
+            cache = ProbeCache(db)
+            cache.clear()
+            t0 = time.perf_counter(); cache.get(path); miss.append(time.perf_counter() - t0)
+            t0 = time.perf_counter(); cache.get(path); memory.append(time.perf_counter() - t0)
+            # Новый экземпляр — память пуста, запись читается из SQLite
+            t0 = time.perf_counter(); ProbeCache(db).get(path); disk.append(time.perf_counter() - t0)
+        ms = lambda xs: round(statistics.median(xs) * 1000, 3)
+        results[f"probe/{name}"] = {"cold_ms": ms(cold), "miss_ms": ms(miss), "memory_ms": ms(memory), "disk_ms": ms(disk)}
+    return results
+
+class _SyncWidget:
+    """Заменитель окна для шины без дисплея: пробуждение и after выполняются сразу."""
+    def __init__(self):
+        self.handlers = {}
+    def bind(self, event, handler):
+        self.handlers[event] = handler
+    def event_generate(self, event, when=None):
+        self.handlers[event]()
+    def after(self, ms, func):
+        func()
+
+def bench_queue(threads=4, messages=20000, jobs=8):
+    """Пропускная способность ProgressBus: threads воркеров шлют по messages сообщений
+    (прогресс задач вперемешку со статусами), меряется время до доставки последнего.
+    С дисплеем — настоящий Tk, иначе синхронный заменитель окна (без цикла событий)."""
+    from ui.progress_bus import ProgressBus
+    delivered = [0]
+    lock = threading.Lock()
+    def dispatch(task, msg_type, data):
+        with lock:
+            delivered[0] += 1
+
+    root = None
+    if os.name == "nt" or os.environ.get("DISPLAY"):
+        import tkinter as tk
+        root = tk.Tk()
+        root.withdraw()
+        bus = ProgressBus(root, dispatch)
+    else:
+        bus = ProgressBus(_SyncWidget(), dispatch, max_fps=10 ** 9)
+
+    def worker(n):
+        for i in range(messages):
+            if i % 50 == 0:
+                bus.put(("conv", "status", f"{n}:{i}"))
+            else:
+                bus.put(("conv", "job_progress", ((n * jobs + i) % jobs, i % 100, None)))
+        bus.put(("conv", "done", n))
+
+    t0 = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in pool: t.start()
+    if root is not None:
+        # Ждём и последнюю отложенную (по max_fps) выдачу
+        while any(t.is_alive() for t in pool) or bus._pending:
+            root.update()
+    for t in pool: t.join()
+    elapsed = time.perf_counter() - t0
+    if root is not None:
+        root.destroy()
+    sent = threads * (messages + 1)
+    return {"queue/progress_bus": {
+        "backend": "tk" if root is not None else "sync",
+        "sent": sent,
+        "delivered": delivered[0],
+        "wall_s": round(elapsed, 3),
+        "msgs_per_s": round(sent / elapsed),
+    }}
+
+def compare(result, base, tolerance):
+    """Регрессии по полям времени (*_s, *_ms) для совпадающих замеров."""
+    regressions = []
+    for case, values in result.items():
+        old = base.get(case)
+        if not isinstance(values, dict) or not isinstance(old, dict):
+            continue
+        for key, value in values.items():
+            if not (key.endswith("_s") or key.endswith("_ms")) or not isinstance(value, (int, float)):
+                continue
+            if old.get(key) and value > old[key] * (1 + tolerance):
+                regressions.append(f"{case} {key}: {old[key]} → {value}")
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default="cut,convert,probe,queue", help="через запятую: cut, convert, probe, queue")
+    parser.add_argument("--quick", action="store_true", help="только самый маленький исходник")
+    parser.add_argument("--runs", type=int, default=3, help="повторов (берётся медиана)")
+    parser.add_argument("--crf", nargs="+", default=CRFS, help="значения CRF для конвертации")
+    parser.add_argument("--workdir", help="папка для исходников и результатов (по умолчанию временная)")
+    parser.add_argument("--save", help="записать результат в файл")
+    parser.add_argument("--baseline", help="сравнить с сохранённым результатом")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимый рост времени, доля")
+    args = parser.parse_args(argv)
+    only = {s.strip() for s in args.only.split(",") if s.strip()}
+
+    import tools
+    result = {"meta": {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+    }}
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="neat_ffmpeg_bench_")
+    os.makedirs(workdir, exist_ok=True)
+    try:
+        if only & {"cut", "convert", "probe"}:
+            # Тот же ffmpeg, что используют воркеры
+            ffmpeg = tools.find_tool("ffmpeg")
+            if not ffmpeg:
+                print("ffmpeg не найден: нужен для генерации исходников", file=sys.stderr)
+                return 2
+            result["meta"]["ffmpeg"] = tools.tool_info().version
+            sources = {name: generate(ffmpeg, workdir, name, w, h, d)
+                       for name, w, h, d in (QUICK_SOURCES if args.quick else SOURCES)}
+            if "probe" in only:
+                result.update(bench_probe(sources, args.runs, workdir))
+            if "cut" in only:
+                result.update(bench_cut(sources, args.runs))
+            if "convert" in only:
+                result.update(bench_convert(sources, args.runs, args.crf))
+        if "queue" in only:
+            result.update(bench_queue())
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare(result, json.load(f), args.tolerance)
+        if regressions:
+            print("Регрессия производительности:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Замер времени запуска: разбивка `-X importtime` и время до первого окна.
+
+    python benchmarks/startup.py                         # вывести результат (JSON)
+    python benchmarks/startup.py --save startup.json     # сохранить как эталон
+    python benchmarks/startup.py --baseline startup.json # сравнить; код 1 при регрессии
+
+Время до окна меряется только при наличии дисплея, иначе поле равно null.
+"""
+import os
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Время от старта интерпретатора до первой отрисовки окна
+FIRST_WINDOW_SNIPPET = """
+import time
+t0 = time.perf_counter()
+from ui.app import FFmpegApp
+app = FFmpegApp()
+def shown():
+    print(round((time.perf_counter() - t0) * 1000, 1))
+    app.destroy()
+app.update_idletasks()
+app.after_idle(shown)
+app.mainloop()
+"""
+
+def import_breakdown(module, top=15):
+    """Суммарное время импорта module (мс) и самые тяжёлые модули по cumulative."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                          cwd=ROOT, capture_output=True, text=True)
+    rows = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line: continue
+        try:
+            self_us, cumulative_us, name = [p.strip() for p in line.split(":", 1)[1].split("|")]
+            rows.append((name, int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue  # строка-заголовок
+    root = next((r for r in reversed(rows) if r[0] == module), None)
+    heaviest = sorted(rows, key=lambda r: r[2], reverse=True)[:top]
+    return {
+        "total_ms": round(root[2] / 1000, 1) if root else None,
+        "heaviest": [{"module": n, "self_ms": round(s / 1000, 1), "cumulative_ms": round(c / 1000, 1)}
+                     for n, s, c in heaviest],
+    }
+
+def first_window_ms(runs):
+    if os.name != "nt" and not os.environ.get("DISPLAY"):
+        return None
+    samples = []
+    for _ in range(runs):
+        out = subprocess.run([sys.executable, "-c", FIRST_WINDOW_SNIPPET], cwd=ROOT,
+                             capture_output=True, text=True, timeout=60)
+        if out.returncode != 0:
+            return None
+        samples.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(samples)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="повторов (берётся медиана)")
+    parser.add_argument("--save", help="записать результат в файл")
+    parser.add_argument("--baseline", help="сравнить с сохранённым результатом")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="допустимый рост, доля (0.25 = +25%%)")
+    args = parser.parse_args(argv)
+
+    result = {"python": sys.version.split()[0]}
+    for module in ("ui.app", "cli", "workers"):
+        totals = [import_breakdown(module)["total_ms"] for _ in range(args.runs)]
+        totals = [t for t in totals if t is not None]
+        result[f"import_{module}_ms"] = statistics.median(totals) if totals else None
+    result["import_ui.app_heaviest"] = import_breakdown("ui.app")["heaviest"]
+    result["first_window_ms"] = first_window_ms(args.runs)
+
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            base = json.load(f)
+        regressions = []
+        for key, value in result.items():
+            if not key.endswith("_ms") or value is None or not base.get(key):
+                continue
+            if value > base[key] * (1 + args.tolerance):
+                regressions.append(f"{key}: {base[key]} → {value} мс")
+        if regressions:
+            print("Регрессия времени запуска:\n  " + "\n  ".join(regressions), file=sys.stderr)
+            return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,67 @@
+"""Параллельное кодирование одного длинного файла частями.
+
+Файл делится по ключевым кадрам на примерно равные куски, куски кодируются
+одновременно с одинаковыми настройками (только видео), звук кодируется одним
+отдельным проходом, затем всё склеивается concat demuxer'ом без перекодирования.
+Чистые функции планирования и сборки команд; запуск — в workers._encode_chunked.
+"""
+from command_builder import video_args, audio_args
+from smartcut import EPS
+
+# Короче этого кусок не делаем: запуск ffmpeg и разогрев кодера съедят выигрыш
+CHUNK_MIN_SECONDS = 60
+# Кусков больше, чем параллельных процессов, — чтобы в конце не ждать один медленный
+CHUNKS_PER_WORKER = 2
+# Сколько раз перезапускать упавший кусок (весь файл заново не кодируется)
+CHUNK_RETRIES = 2
+# Промежуточный контейнер — mkv принимает любой кодек
+CHUNK_EXT = ".mkv"
+AUDIO_EXT = ".mka"
+
+def chunk_count(duration, workers):
+    """Сколько кусков делать; 1 — делить не стоит."""
+    n = min(workers * CHUNKS_PER_WORKER, int(duration // CHUNK_MIN_SECONDS))
+    return n if n >= 2 else 1
+
+def plan_chunks(duration, n, find_keyframe):
+    """[(начало, конец)] кусков, границы — на ключевых кадрах.
+
+    find_keyframe(t) возвращает первый ключевой кадр не раньше t или None; граница
+    без найденного ключевого кадра пропускается (соседние куски сливаются).
+    """
+    bounds = [0.0]
+    for i in range(1, n):
+        k = find_keyframe(duration * i / n)
+        if k is not None and bounds[-1] + EPS < k < duration - EPS:
+            bounds.append(k)
+    bounds.append(duration)
+    return list(zip(bounds, bounds[1:]))
+
+def build_chunk_cmd(ffmpeg_exe, path, start, end, settings, outname, threads=None, last=False):
+    """Видео одного куска. -ss перед -i на ключевом кадре точен и не декодирует лишнего."""
+    cmd = [ffmpeg_exe, "-hide_banner", "-y", "-ss", f"{start:.6f}", "-i", path]
+    if not last:
+        cmd += ["-t", f"{end - start:.6f}"]
+    cmd += ["-map", "0:v:0"] + video_args(settings)
+    if threads:
+        cmd += ["-threads", str(threads)]
+    cmd += ["-an", "-sn", "-map_metadata", "-1", outname]
+    return cmd
+
+def build_audio_cmd(ffmpeg_exe, path, settings, outname, copy=False):
+    """Звук целиком одним проходом: на стыках кусков AAC дал бы щелчки из-за priming.
+    copy=True — звук уже подходит (см. command_builder.stream_plan) и только извлекается."""
+    args = ["-c:a", "copy"] if copy else audio_args(settings)
+    return [ffmpeg_exe, "-hide_banner", "-y", "-i", path, "-map", "0:a:0", "-vn"] + args + [
+        "-map_metadata", "-1", outname]
+
+def build_join_cmd(ffmpeg_exe, list_path, audio_path, settings, outname):
+    """Склейка кусков видео (concat demuxer) и звука в итоговый файл без перекодирования."""
+    cmd = [ffmpeg_exe, "-hide_banner", "-y", "-f", "concat", "-safe", "0", "-i", list_path]
+    if audio_path:
+        cmd += ["-i", audio_path, "-map", "0:v:0", "-map", "1:a:0"]
+    cmd += ["-c", "copy"]
+    if (settings.get("out_format") or "mp4") in ("mp4", "mov"):
+        cmd += ["-movflags", "+faststart"]
+    cmd += ["-map_metadata", "-1", outname]
+    return cmd
@@ -0,0 +1,434 @@
+"""Консольный запуск без интерфейса (для серверов и cron).
+
+    python cli.py convert video1.mp4 video2.mov --preset-name archive
+    python cli.py cut lecture.mp4 --start 00:01:00 --end 00:02:30
+    python cli.py cut --list jobs.csv --smart
+    python cli.py download "https://youtu.be/..." --out ./downloads
+    python cli.py download "https://youtu.be/..." --cut-start 00:01:00 --cut-end 00:02:00 --convert "fast preview"
+    python cli.py analyze lecture.mp4 --out parts.csv && python cli.py cut --list parts.csv --concat
+    python cli.py watch /mnt/ingest --convert balanced --jobs 2
+    python cli.py probe clip.mp4
+    python cli.py --metrics runs.jsonl convert *.mp4 && python cli.py metrics runs.jsonl
+
+Коды выхода: 0 — всё успешно, 1 — были ошибки, 2 — неверные аргументы, 130 — прервано (Ctrl+C).
+tkinter здесь не импортируется.
+"""
+import os
+import sys
+import csv
+import json
+import argparse
+import threading
+from utils import run_ffprobe, format_probe_info, parse_segments
+from metrics import with_metrics_log, read_metrics, summarize, Tee
+from scenes import SCENE_THRESHOLD, NOISE_DB, MIN_SILENCE, MIN_SEGMENT
+
+EXIT_OK, EXIT_FAILED, EXIT_USAGE, EXIT_CANCELED = 0, 1, 2, 130
+
+class ConsoleQueue:
+    """Подменяет очередь Tk: принимает те же кортежи (task, msg_type, data) и печатает их в консоль."""
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stderr
+        self.tty = self.stream.isatty()
+        self.failed = 0
+        self.done = False
+        self.canceled = False
+        self._last_pct = -1
+        self._lock = threading.Lock()
+
+    def put(self, item):
+        task, msg_type, data = item
+        with self._lock:
+            if msg_type == "progress":
+                self._progress(int(data))
+            elif msg_type == "status":
+                self._line(data)
+            elif msg_type == "job_done":
+                if not data[1]:
+                    self.failed += 1
+            elif msg_type == "error":
+                self.failed += 1
+                self._line(f"Ошибка: {data}")
+            elif msg_type == "log":
+                level, text = data
+                self._line(f"{'Ошибка' if level == 'error' else 'Предупреждение'}: {text}")
+            elif msg_type == "done":
+                self.done = True
+                self._progress(100)
+
+    def _progress(self, pct):
+        if pct == self._last_pct: return
+        if self.tty:
+            self.stream.write(f"\r[{'#' * (pct // 5):<20}] {pct:3d}%")
+            self.stream.flush()
+        elif pct // 10 != self._last_pct // 10:
+            # В лог (не терминал) — не чаще чем раз в 10%
+            self.stream.write(f"{pct}%\n")
+        self._last_pct = pct
+
+    def _line(self, text):
+        if self.tty and self._last_pct >= 0:
+            self.stream.write("\n")
+        self.stream.write(f"{text}\n")
+        self.stream.flush()
+
+def read_list(path, keys=("path", "file")):
+    """Список заданий из файла: JSON (список строк/объектов или {"files": [...]}) либо CSV/текст.
+
+    В каждой строке путь (или ссылка) лежит под одним из keys; он переносится в "path".
+    Строка без него — ValueError.
+    """
+    with open(path, encoding="utf-8-sig") as f:
+        text = f.read()
+    if path.lower().endswith(".json"):
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("files") or data.get("urls") or data.get("jobs") or []
+        rows = []
+        for n, row in enumerate(data, 1):
+            if not isinstance(row, dict):
+                row = {"path": row}
+            value = next((row.pop(k) for k in keys if row.get(k)), None)
+            if not isinstance(value, str):
+                raise ValueError(f"{path}: в строке {n} нет {' или '.join(keys)}")
+            row["path"] = value
+            rows.append(row)
+        return rows
+    rows = []
+    for row in csv.reader(text.splitlines()):
+        row = [c.strip() for c in row]
+        if not row or not row[0] or row[0].startswith("#"): continue
+        item = {"path": row[0]}
+        if len(row) >= 3:
+            item["start"], item["end"] = row[1], row[2]
+        rows.append(item)
+    return rows
+
+# Путь к JSON-lines логу метрик (--metrics); задаётся в main
+METRICS_PATH = None
+
+def run_worker(target, *args, **kwargs):
+    """Запускает воркер в потоке; Ctrl+C превращается в cancel_event. Возвращает ConsoleQueue."""
+    queue = ConsoleQueue()
+    sink = with_metrics_log(queue, METRICS_PATH)
+    cancel_event = threading.Event()
+    thread = threading.Thread(target=target, args=args + (sink, cancel_event), kwargs=kwargs, daemon=True)
+    thread.start()
+    try:
+        while thread.is_alive():
+            thread.join(timeout=0.5)
+    except KeyboardInterrupt:
+        cancel_event.set()
+        thread.join()
+        queue.canceled = True
+    return queue
+
+def _exit_code(queues):
+    if any(q.canceled for q in queues):
+        return EXIT_CANCELED
+    return EXIT_FAILED if any(q.failed or not q.done for q in queues) else EXIT_OK
+
+def cmd_convert(args):
+    from workers import convert_worker
+    files = list(args.files)
+    settings = {}
+    if args.list:
+        try:
+            rows = read_list(args.list)
+        except (OSError, ValueError) as e:
+            print(f"Неверный список заданий: {e}", file=sys.stderr)
+            return EXIT_USAGE
+        for row in rows:
+            files.append(row.pop("path"))
+            # Общие настройки могут лежать прямо в JSON-строках задания
+            settings.update({k: v for k, v in row.items() if k not in ("start", "end")})
+    if not files:
+        print("Не указаны файлы", file=sys.stderr)
+        return EXIT_USAGE
+    settings.update({
+        k: v for k, v in {
+            "preset_name": args.preset_name, "vcodec": args.vcodec, "crf": args.crf, "preset": args.preset,
+            "resolution": args.resolution, "fps": args.fps, "out_format": args.format,
+            "acodec": args.acodec, "abitrate": args.abitrate, "target_size_mb": args.target_size,
+        }.items() if v is not None
+    })
+    settings.setdefault("preset_name", "balanced")
+    settings.setdefault("suffix", args.suffix)
+    settings.setdefault("out_format", "mp4")
+    settings["skip_done"] = not args.no_skip
+    settings["chunked"] = args.chunked
+    settings["copy_matching"] = not args.always_encode
+    kwargs = {"jobs": args.jobs, "threads": args.threads}
+    # Обёртка нужна, чтобы queue и cancel_event встали на свои позиции аргументов
+    return _exit_code([run_worker(lambda q, ev: convert_worker(files, settings, q, ev, **kwargs))])
+
+def cmd_cut(args):
+    from workers import cut_worker
+    segments = None
+    if args.segments:
+        with open(args.segments, encoding="utf-8-sig") as f:
+            segments = parse_segments(f.read())
+    if not segments and args.start and args.end:
+        segments = [(args.start, args.end)]
+
+    # Файлы с одинаковым набором фрагментов обрезаются одним параллельным проходом
+    groups = {}
+    for path in args.files:
+        groups.setdefault(tuple(segments or ()), []).append(path)
+    if args.list:
+        try:
+            rows = read_list(args.list)
+        except (OSError, ValueError) as e:
+            print(f"Неверный список заданий: {e}", file=sys.stderr)
+            return EXIT_USAGE
+        per_file = {}
+        for row in rows:
+            path = row["path"]
+            if "start" in row and "end" in row:
+                per_file.setdefault(path, []).append((row["start"], row["end"]))
+            else:
+                per_file.setdefault(path, list(segments or []))
+        for path, segs in per_file.items():
+            groups.setdefault(tuple(segs), []).append(path)
+
+    if not groups:
+        print("Не указаны файлы", file=sys.stderr)
+        return EXIT_USAGE
+    if any(not segs for segs in groups):
+        print("Не указан фрагмент: --start/--end, --segments или колонки start,end в списке", file=sys.stderr)
+        return EXIT_USAGE
+
+    queues = []
+    for segs, files in groups.items():
+        kwargs = {"jobs": args.jobs, "segments": list(segs), "concat": args.concat,
+                  "smart": args.smart, "skip_done": not args.no_skip}
+        queues.append(run_worker(lambda q, ev: cut_worker(files, None, None, args.suffix, q, ev, **kwargs)))
+        if queues[-1].canceled:
+            break
+    return _exit_code(queues)
+
+def cmd_download(args):
+    from workers import download_worker
+    urls = list(args.urls)
+    if args.list:
+        try:
+            urls += [row["path"] for row in read_list(args.list, ("path", "url"))]
+        except (OSError, ValueError) as e:
+            print(f"Неверный список ссылок: {e}", file=sys.stderr)
+            return EXIT_USAGE
+    if not urls:
+        print("Не указаны ссылки", file=sys.stderr)
+        return EXIT_USAGE
+    os.makedirs(args.out, exist_ok=True)
+    stages = []
+    if args.cut_start and args.cut_end:
+        stages.append({"type": "cut", "start": args.cut_start, "end": args.cut_end})
+    if args.convert:
+        stages.append({"type": "convert", "settings": {"preset_name": args.convert}})
+    kwargs = {"jobs": args.jobs, "archive": not args.no_archive,
+              "stages": stages, "keep_intermediate": not args.delete_intermediate,
+              "section": (args.section_start, args.section_end) if args.section_start and args.section_end else None,
+              "precise_section": args.precise_section}
+    return _exit_code([run_worker(lambda q, ev: download_worker(urls, args.out, q, ev, **kwargs))])
+
+def cmd_watch(args):
+    from watcher import watch_worker, make_rule, stages_from, load_config
+    try:
+        rules, options = load_config(args.config) if args.config else ([], {})
+        cut = {"start": args.cut_start, "end": args.cut_end, "smart": args.smart} if args.cut_start and args.cut_end else None
+        rules += [make_rule(folder, stages_from(cut, args.convert), args.pattern) for folder in args.folders]
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Неверные настройки наблюдения: {e}", file=sys.stderr)
+        return EXIT_USAGE
+    if not rules:
+        print("Не указаны папки: FOLDER ... или --config", file=sys.stderr)
+        return EXIT_USAGE
+    options.update({k: v for k, v in {"jobs": args.jobs, "settle": args.settle, "interval": args.interval}.items()
+                    if v is not None})
+    # Службы останавливают процесс SIGTERM — обрабатываем его как Ctrl+C, чтобы ffmpeg завершились штатно
+    import signal
+    def on_term(signum, frame):
+        raise KeyboardInterrupt
+    signal.signal(signal.SIGTERM, on_term)
+    queue = run_worker(lambda q, ev: watch_worker(rules, q, ev, **options))
+    # Наблюдение заканчивается только остановкой — это штатное завершение
+    return EXIT_OK if queue.canceled else EXIT_FAILED
+
+class AnalysisCollector:
+    """Собирает (task, "analysis", (путь, фрагменты)) из воркера анализа."""
+    def __init__(self):
+        self.results = {}
+
+    def put(self, item):
+        _, msg_type, data = item
+        if msg_type == "analysis":
+            path, segments = data
+            self.results[path] = segments
+
+def cmd_analyze(args):
+    from workers import analyze_worker
+    from utils import format_cut_time
+    files = list(args.files)
+    if args.list:
+        try:
+            files += [row["path"] for row in read_list(args.list)]
+        except (OSError, ValueError) as e:
+            print(f"Неверный список файлов: {e}", file=sys.stderr)
+            return EXIT_USAGE
+    if not files:
+        print("Не указаны файлы", file=sys.stderr)
+        return EXIT_USAGE
+    options = {"scene_threshold": args.scene_threshold, "noise_db": args.noise_db, "min_silence": args.min_silence,
+               "min_segment": args.min_segment, "split_scenes": not args.no_scenes, "drop_silence": not args.keep_silence}
+    collector = AnalysisCollector()
+    queue = run_worker(lambda q, ev: analyze_worker(files, Tee(q, collector), ev, options, jobs=args.jobs))
+    # Формат списка для `cut --list`: путь,начало,конец — по строке на фрагмент
+    out = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+    try:
+        writer = csv.writer(out)
+        for path in files:
+            for start, end in collector.results.get(path, []):
+                writer.writerow([path, format_cut_time(start), format_cut_time(end)])
+    finally:
+        if args.out:
+            out.close()
+    return _exit_code([queue])
+
+def cmd_probe(args):
+    failed = False
+    result = {}
+    for path in args.files:
+        data = run_ffprobe(path, use_cache=not args.no_cache)
+        failed = failed or "error" in data
+        result[path] = data
+        if args.text:
+            print(f"== {path}\n{format_probe_info(data)}\n")
+    if not args.text:
+        json.dump(result, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+    return EXIT_FAILED if failed else EXIT_OK
+
+def cmd_tools(args):
+    import tools
+    info = tools.tool_info()
+    json.dump({**info._asdict(), "encoders": sorted(info.encoders)}, sys.stdout, ensure_ascii=False, indent=2)
+    print()
+    return EXIT_FAILED if info.problems else EXIT_OK
+
+def cmd_metrics(args):
+    records = read_metrics(args.file)
+    rows = summarize(records)
+    if args.json:
+        json.dump(rows, sys.stdout, ensure_ascii=False, indent=2)
+        print()
+        return EXIT_OK
+    for row in rows:
+        name = " ".join(str(row.pop(k)) for k in ("task", "preset_name", "vcodec", "preset", "crf") if k in row)
+        print(f"{name}: " + ", ".join(f"{k}={v}" for k, v in row.items() if v is not None))
+    return EXIT_OK
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="neat_ffmpeg", description="Neat FFmpeg без интерфейса")
+    parser.add_argument("--metrics", metavar="FILE",
+                        help="дописывать итоги задач (время, fps, скорость, размеры, CPU) в JSON-lines файл")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("convert", help="конвертация")
+    p.add_argument("files", nargs="*")
+    p.add_argument("--list", help="JSON/CSV со списком файлов")
+    p.add_argument("--preset-name", help="профиль: fast preview, balanced, archive")
+    p.add_argument("--vcodec")
+    p.add_argument("--crf")
+    p.add_argument("--preset")
+    p.add_argument("--resolution")
+    p.add_argument("--fps")
+    p.add_argument("--format")
+    p.add_argument("--acodec")
+    p.add_argument("--abitrate")
+    p.add_argument("--target-size", type=float, help="целевой размер файла, МБ")
+    p.add_argument("--suffix", default="_conv")
+    p.add_argument("--jobs", type=int)
+    p.add_argument("--threads", type=int)
+    p.add_argument("--no-skip", action="store_true", help="переделывать уже готовые файлы")
+    p.add_argument("--chunked", action="store_true", help="кодировать длинный файл частями параллельно")
+    p.add_argument("--always-encode", action="store_true",
+                   help="перекодировать и потоки, уже совпадающие с настройками")
+    p.set_defaults(func=cmd_convert)
+
+    p = sub.add_parser("cut", help="обрезка")
+    p.add_argument("files", nargs="*")
+    p.add_argument("--list", help="JSON/CSV: путь[,начало,конец] в строке")
+    p.add_argument("--start")
+    p.add_argument("--end")
+    p.add_argument("--segments", help="файл со списком фрагментов")
+    p.add_argument("--concat", action="store_true")
+    p.add_argument("--smart", action="store_true")
+    p.add_argument("--suffix", default="_cut")
+    p.add_argument("--jobs", type=int)
+    p.add_argument("--no-skip", action="store_true")
+    p.set_defaults(func=cmd_cut)
+
+    p = sub.add_parser("download", help="скачивание")
+    p.add_argument("urls", nargs="*")
+    p.add_argument("--list", help="JSON/CSV со ссылками")
+    p.add_argument("--out", default=".")
+    p.add_argument("--jobs", type=int, help="сколько роликов качать одновременно")
+    p.add_argument("--no-archive", action="store_true", help="не пропускать уже скачанные ролики")
+    p.add_argument("--section-start", help="скачать только отрезок: начало")
+    p.add_argument("--section-end", help="скачать только отрезок: конец")
+    p.add_argument("--precise-section", action="store_true", help="точные границы отрезка (с перекодированием)")
+    p.add_argument("--cut-start", help="после скачивания обрезать: начало")
+    p.add_argument("--cut-end", help="после скачивания обрезать: конец")
+    p.add_argument("--convert", metavar="PROFILE", help="после скачивания конвертировать профилем")
+    p.add_argument("--delete-intermediate", action="store_true", help="удалять скачанный и промежуточные файлы")
+    p.set_defaults(func=cmd_download)
+
+    p = sub.add_parser("analyze", help="найти фрагменты по сменам сцен и тишине (CSV для cut --list)")
+    p.add_argument("files", nargs="*")
+    p.add_argument("--list", help="JSON/CSV со списком файлов")
+    p.add_argument("--out", help="куда записать CSV (по умолчанию stdout)")
+    p.add_argument("--jobs", type=int, help="сколько файлов анализировать одновременно")
+    p.add_argument("--scene-threshold", type=float, default=SCENE_THRESHOLD, help="порог смены сцены, 0–100")
+    p.add_argument("--noise-db", type=float, default=NOISE_DB, help="тише этого уровня — тишина, дБ")
+    p.add_argument("--min-silence", type=float, default=MIN_SILENCE, help="минимальная длина тишины, с")
+    p.add_argument("--min-segment", type=float, default=MIN_SEGMENT, help="минимальная длина фрагмента, с")
+    p.add_argument("--no-scenes", action="store_true", help="не резать по сменам сцен")
+    p.add_argument("--keep-silence", action="store_true", help="не вырезать тишину")
+    p.set_defaults(func=cmd_analyze)
+
+    p = sub.add_parser("watch", help="следить за папками и обрабатывать новые файлы (до Ctrl+C)")
+    p.add_argument("folders", nargs="*")
+    p.add_argument("--config", help="JSON с папками и их профилями (см. watcher.load_config)")
+    p.add_argument("--pattern", action="append", help="шаблон имени файла, можно несколько (по умолчанию видео)")
+    p.add_argument("--cut-start", help="обрезать: начало")
+    p.add_argument("--cut-end", help="обрезать: конец")
+    p.add_argument("--smart", action="store_true", help="точная обрезка")
+    p.add_argument("--convert", metavar="PROFILE", help="конвертировать профилем")
+    p.add_argument("--jobs", type=int, help="сколько файлов обрабатывать одновременно")
+    p.add_argument("--settle", type=float, help="сколько секунд файл не должен меняться, чтобы взять его в работу")
+    p.add_argument("--interval", type=float, help="период опроса папок, с")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser("probe", help="информация о файлах (JSON)")
+    p.add_argument("files", nargs="+")
+    p.add_argument("--text", action="store_true", help="кратко, как в инфо-панели")
+    p.add_argument("--no-cache", action="store_true")
+    p.set_defaults(func=cmd_probe)
+
+    p = sub.add_parser("tools", help="какие ffmpeg/ffprobe используются: пути, версия, энкодеры, hwaccel")
+    p.set_defaults(func=cmd_tools)
+
+    p = sub.add_parser("metrics", help="сводка по логу метрик")
+    p.add_argument("file")
+    p.add_argument("--json", action="store_true")
+    p.set_defaults(func=cmd_metrics)
+    return parser
+
+def main(argv=None):
+    global METRICS_PATH
+    args = build_parser().parse_args(argv)
+    METRICS_PATH = args.metrics
+    return args.func(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,322 @@
+import os
+import subprocess
+from functools import lru_cache
+from utils import STARTUPINFO
+
+VIDEO_CODECS = ["libx264", "libx265", "libsvtav1", "libvpx-vp9", "copy"]
+
+# Названия из выпадающего списка → имя энкодера ffmpeg
+AUDIO_ENCODERS = {
+    "aac": "aac",
+    "mp3": "libmp3lame",
+    "opus": "libopus",
+    "flac": "flac",
+    "pcm_s16le": "pcm_s16le",
+}
+# Кодеки без понятия битрейта
+LOSSLESS_AUDIO = {"flac", "pcm_s16le"}
+
+# Пресеты x264 по порядку — для энкодеров с числовой «скоростью» берём позицию в этом списке
+X264_PRESETS = ["ultrafast", "superfast", "veryfast", "faster", "fast", "medium", "slow", "slower", "veryslow"]
+
+# Готовые наборы настроек; поверх них применяются только явно заданные поля
+PRESETS = {
+    "fast preview": {
+        "vcodec": "libx264", "crf": "30", "preset": "veryfast", "resolution": "1280:-1",
+        "fps": "copy", "acodec": "aac", "abitrate": "96k",
+    },
+    "balanced": {
+        "vcodec": "libx264", "crf": "26", "preset": "veryslow", "resolution": "1600:-1",
+        "fps": "24", "acodec": "aac", "abitrate": "128k",
+    },
+    "archive": {
+        "vcodec": "libx265", "crf": "20", "preset": "slow", "resolution": "copy",
+        "fps": "copy", "acodec": "copy", "abitrate": "copy",
+    },
+}
+
+def apply_preset(name, settings=None):
+    """Настройки пресета name, дополненные/переопределённые settings."""
+    merged = dict(PRESETS[name])
+    merged.update(settings or {})
+    return merged
+
+def _resolution(settings):
+    res = settings.get("resolution") or "copy"
+    if res == "custom":
+        res = (settings.get("resolution_custom") or "").strip() or "copy"
+    return res
+
+def scale_filter(res_mode):
+    """Фильтр масштабирования с защитой от нечётных размеров (x264/x265 их не принимают)."""
+    if not res_mode or res_mode == "copy":
+        return None
+    w, _, h = res_mode.partition(":")
+    if h == "-1":
+        return f"scale='{w}:trunc(ow/a/2)*2'"
+    if w == "-1":
+        return f"scale='trunc(oh*a/2)*2:{h}'"
+    return f"scale={res_mode}:force_original_aspect_ratio=decrease,pad='ceil(iw/2)*2:ceil(ih/2)*2'"
+
+def _speed_args(vcodec, preset):
+    if not preset:
+        return []
+    if vcodec in ("libx264", "libx265"):
+        return ["-preset", preset]
+    if preset not in X264_PRESETS:
+        return []
+    pos = X264_PRESETS.index(preset)
+    if vcodec == "libsvtav1":
+        # 0 — самый медленный, 13 — самый быстрый
+        return ["-preset", str(12 - pos)]
+    if vcodec == "libvpx-vp9":
+        return ["-deadline", "good", "-cpu-used", str(max(0, 5 - pos * 5 // 8))]
+    return []
+
+def video_args(settings, bitrate=None):
+    """Аргументы видео. bitrate (бит/с) заменяет CRF — нужен для кодирования под размер."""
+    vcodec = settings.get("vcodec") or "libx264"
+    if vcodec == "copy":
+        return ["-c:v", "copy"]
+    args = ["-c:v", vcodec]
+    crf = str(settings.get("crf") or "").strip()
+    if bitrate:
+        args += ["-b:v", str(int(bitrate))]
+    elif crf:
+        args += ["-crf", crf]
+        if vcodec == "libvpx-vp9":
+            # Без -b:v 0 vp9 трактует crf как потолок качества при битрейте по умолчанию
+            args += ["-b:v", "0"]
+    args += _speed_args(vcodec, settings.get("preset"))
+
+    filters = []
+    scale = scale_filter(_resolution(settings))
+    if scale:
+        filters.append(scale)
+    fps = settings.get("fps")
+    if fps and fps != "copy":
+        filters.append(f"fps={fps}")
+    if filters:
+        args += ["-vf", ",".join(filters)]
+    return args
+
+def audio_args(settings):
+    acodec = settings.get("acodec") or "aac"
+    if acodec == "copy":
+        return ["-c:a", "copy"]
+    args = ["-c:a", AUDIO_ENCODERS.get(acodec, acodec)]
+    abitrate = settings.get("abitrate")
+    if acodec not in LOSSLESS_AUDIO and abitrate and abitrate != "copy":
+        args += ["-b:a", abitrate]
+    return args
+
+# Какой codec_name (как в ffprobe) даёт энкодер — чтобы понять, совпадает ли исходник с целью
+ENCODER_CODEC = {"libx264": "h264", "libx265": "hevc", "libsvtav1": "av1", "libvpx-vp9": "vp9"}
+AUDIO_CODEC = {"aac": "aac", "mp3": "mp3", "opus": "opus", "flac": "flac", "pcm_s16le": "pcm_s16le"}
+# Какие кодеки контейнер принимает без перекодирования (mkv — любые)
+CONTAINER_CODECS = {
+    "mp4": {"h264", "hevc", "av1", "vp9", "mpeg4", "aac", "mp3", "opus", "flac", "ac3", "eac3", "alac"},
+    "mov": {"h264", "hevc", "prores", "mpeg4", "aac", "mp3", "alac", "pcm_s16le", "ac3"},
+    "webm": {"vp8", "vp9", "av1", "opus", "vorbis"},
+}
+# Звук копируем, если его битрейт не больше заданного с таким запасом
+AUDIO_COPY_SLACK = 1.1
+
+def _fits_container(codec, out_format):
+    allowed = CONTAINER_CODECS.get(out_format)
+    return allowed is None or codec in allowed
+
+def _frame_rate(value):
+    num, _, den = str(value or "").partition("/")
+    try:
+        return float(num) / float(den or 1)
+    except (ValueError, ZeroDivisionError):
+        return None
+
+def _same_size(res_mode, width, height):
+    """Даст ли масштабирование по res_mode тот же размер кадра."""
+    if not res_mode or res_mode == "copy":
+        return True
+    w, _, h = res_mode.partition(":")
+    try:
+        if h == "-1":
+            return int(w) == width and height % 2 == 0
+        if w == "-1":
+            return int(h) == height and width % 2 == 0
+        return int(w) == width and int(h) == height
+    except ValueError:
+        return False
+
+def stream_plan(settings, probe):
+    """Что делать с каждым потоком: {"video": "copy"|"encode"|None, "audio": ...}.
+
+    Поток копируется, если исходник уже в целевом кодеке, размере и FPS и подходит
+    контейнеру, — тогда перекодирование ничего не даст, кроме потери времени и качества.
+    None — такого потока в файле нет. settings["copy_matching"]=False отключает копирование.
+    """
+    streams = (probe or {}).get("streams", [])
+    video = next((s for s in streams if s.get("codec_type") == "video"
+                  and not (s.get("disposition") or {}).get("attached_pic")), None)
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    out_format = settings.get("out_format") or "mp4"
+    allow_copy = settings.get("copy_matching", True) and not settings.get("target_size_mb")
+    plan = {"video": None, "audio": None}
+
+    if video is not None or not probe:
+        vcodec = settings.get("vcodec") or "libx264"
+        src = (video or {}).get("codec_name")
+        fps = settings.get("fps")
+        src_fps = _frame_rate((video or {}).get("avg_frame_rate"))
+        target_fps = _frame_rate(fps)
+        same_fps = not fps or fps == "copy" or (None not in (src_fps, target_fps) and abs(src_fps - target_fps) < 0.01)
+        matches = (
+            video is not None and allow_copy
+            and src == ENCODER_CODEC.get(vcodec)
+            and _same_size(_resolution(settings), video.get("width"), video.get("height"))
+            and same_fps
+            and _fits_container(src, out_format)
+        )
+        plan["video"] = "copy" if vcodec == "copy" or matches else "encode"
+
+    if audio is not None or not probe:
+        acodec = settings.get("acodec") or "aac"
+        src = (audio or {}).get("codec_name")
+        abitrate = settings.get("abitrate")
+        limit = parse_bitrate(abitrate)
+        src_bps = parse_bitrate((audio or {}).get("bit_rate"))
+        bitrate_ok = (acodec in LOSSLESS_AUDIO or not abitrate or abitrate == "copy"
+                      or (limit and src_bps and src_bps <= limit * AUDIO_COPY_SLACK))
+        matches = (
+            audio is not None and allow_copy
+            and src == AUDIO_CODEC.get(acodec)
+            and bitrate_ok
+            and _fits_container(src, out_format)
+        )
+        plan["audio"] = "copy" if acodec == "copy" or matches else "encode"
+    return plan
+
+def describe_plan(plan):
+    """Короткое описание выбранного пути для статуса: «видео — копия, звук — перекодирование»."""
+    names = {"copy": "копия", "encode": "перекодирование"}
+    parts = [f"{label} — {names[plan[key]]}" for key, label in (("video", "видео"), ("audio", "звук")) if plan.get(key)]
+    return ", ".join(parts) or "нет потоков"
+
+def plan_kind(plan):
+    """'remux' — всё копируется, 'encode' — всё перекодируется, 'mixed' — часть потоков копируется."""
+    actions = {a for a in plan.values() if a}
+    if actions == {"copy"}:
+        return "remux"
+    return "mixed" if "copy" in actions else "encode"
+
+def build_convert_cmd(ffmpeg_exe, path, outname, settings, threads=None, plan=None):
+    """Полная команда ffmpeg для конвертации по настройкам вкладки. Чистая функция.
+
+    plan (см. stream_plan) позволяет скопировать потоки, которые уже подходят."""
+    out_format = settings.get("out_format") or "mp4"
+    plan = plan or {}
+    cmd = [ffmpeg_exe, "-hide_banner", "-y", "-i", path]
+    cmd += ["-c:v", "copy"] if plan.get("video") == "copy" else video_args(settings)
+    cmd += ["-c:a", "copy"] if plan.get("audio") == "copy" else audio_args(settings)
+    if threads and plan.get("video") != "copy":
+        cmd += ["-threads", str(threads)]
+    if out_format in ("mp4", "mov"):
+        cmd += ["-movflags", "+faststart"]
+    cmd += ["-map_metadata", "-1", outname]
+    return cmd
+
+# Кодеки, для которых поддержан двухпроходный режим через -pass/-passlogfile
+TWO_PASS_CODECS = {"libx264", "libvpx-vp9"}
+# Запас на контейнер (индексы mp4, заголовки) при расчёте битрейта
+MUXER_OVERHEAD = 0.02
+DEFAULT_AUDIO_BPS = 128_000
+
+def parse_bitrate(value):
+    """'128k' → 128000, '1.5M' → 1500000; None, если не число."""
+    value = str(value or "").strip().lower()
+    mult = 1
+    if value.endswith("k"):
+        mult, value = 1000, value[:-1]
+    elif value.endswith("m"):
+        mult, value = 1_000_000, value[:-1]
+    try:
+        return int(float(value) * mult)
+    except ValueError:
+        return None
+
+def audio_bitrate_bps(settings, probe=None):
+    """Сколько бит/с займёт звук на выходе (0, если звука нет)."""
+    streams = (probe or {}).get("streams", [])
+    audio = next((s for s in streams if s.get("codec_type") == "audio"), None)
+    if probe and audio is None:
+        return 0
+    if settings.get("acodec") == "copy" or settings.get("abitrate") == "copy":
+        return parse_bitrate((audio or {}).get("bit_rate")) or DEFAULT_AUDIO_BPS
+    return parse_bitrate(settings.get("abitrate")) or DEFAULT_AUDIO_BPS
+
+def target_video_bitrate(target_bytes, duration, audio_bps, overhead=MUXER_OVERHEAD):
+    """Битрейт видео (бит/с), при котором файл длительностью duration уложится в target_bytes."""
+    if duration <= 0:
+        return None
+    total_bps = target_bytes * 8 * (1 - overhead) / duration
+    return int(total_bps - audio_bps)
+
+def build_two_pass_cmds(ffmpeg_exe, path, outname, settings, bitrate, passlog, threads=None):
+    """Команды первого (анализ, без звука и без файла) и второго прохода кодирования под размер."""
+    vargs = video_args(settings, bitrate)
+    thread_args = ["-threads", str(threads)] if threads else []
+    first = [ffmpeg_exe, "-hide_banner", "-y", "-i", path] + vargs + thread_args
+    first += ["-pass", "1", "-passlogfile", passlog, "-an", "-f", "null", os.devnull]
+    second = [ffmpeg_exe, "-hide_banner", "-y", "-i", path] + vargs + audio_args(settings) + thread_args
+    second += ["-pass", "2", "-passlogfile", passlog]
+    if (settings.get("out_format") or "mp4") in ("mp4", "mov"):
+        second += ["-movflags", "+faststart"]
+    second += ["-map_metadata", "-1", outname]
+    return first, second
+
+@lru_cache(maxsize=None)
+def available_encoders(ffmpeg_exe):
+    """Имена энкодеров из `ffmpeg -encoders`; None, если ffmpeg запустить не удалось."""
+    try:
+        out = subprocess.check_output([ffmpeg_exe, "-hide_banner", "-encoders"],
+                                      stderr=subprocess.DEVNULL, startupinfo=STARTUPINFO)
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    names = set()
+    started = False
+    for line in out.decode("utf-8", "replace").splitlines():
+        # Таблица начинается после строки-разделителя " ------"
+        if line.strip().startswith("------"):
+            started = True
+            continue
+        parts = line.split()
+        if started and len(parts) >= 2:
+            names.add(parts[1])
+    return frozenset(names)
+
+def validate_settings(settings, encoders=None):
+    """Список понятных пользователю ошибок в настройках (пустой — всё в порядке)."""
+    errors = []
+    vcodec = settings.get("vcodec") or "libx264"
+    acodec = settings.get("acodec") or "aac"
+    out_format = settings.get("out_format") or "mp4"
+
+    if vcodec not in VIDEO_CODECS:
+        errors.append(f"Неизвестный видеокодек: {vcodec}")
+    if vcodec == "copy" and (_resolution(settings) != "copy" or settings.get("fps") not in (None, "", "copy")):
+        errors.append("При копировании видео нельзя менять разрешение и FPS")
+    crf = str(settings.get("crf") or "").strip()
+    if vcodec != "copy" and crf and not crf.isdigit():
+        errors.append(f"CRF должен быть числом: {crf}")
+    if acodec == "pcm_s16le" and out_format == "mp4":
+        errors.append("PCM-звук не поддерживается контейнером mp4")
+    if settings.get("target_size_mb"):
+        if vcodec not in TWO_PASS_CODECS:
+            errors.append(f"Кодирование под размер поддерживается только для {', '.join(sorted(TWO_PASS_CODECS))}")
+        if acodec in LOSSLESS_AUDIO:
+            errors.append("Для кодирования под размер выберите сжатый аудиокодек")
+
+    if encoders is not None:
+        for name in (vcodec, AUDIO_ENCODERS.get(acodec, acodec)):
+            if name != "copy" and name not in encoders:
+                errors.append(f"Энкодер {name} отсутствует в этой сборке ffmpeg")
+    return errors
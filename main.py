@@ -1,35 +1,14 @@
-import os
-import sys
-from pathlib import Path
+import tools
 from ui.app import FFmpegApp
 
-def setup_ffmpeg_path():
-    # Определяем базовый путь: если запущено как .exe — берем путь к .exe,
-    # если как скрипт — берем путь к файлу main.py
-    if getattr(sys, 'frozen', False):
-        base_path = Path(sys.executable).parent
-    else:
-        base_path = Path(__file__).parent
+# Сторонние программы из ffmpeg/bin (deno для yt-dlp) должны быть видны через PATH
+tools.add_bundled_to_path()
 
-    # Путь к папке с бинарниками ffmpeg
-    ffmpeg_bin_path = base_path / "ffmpeg" / "bin"
-    
-    if ffmpeg_bin_path.exists():
-        bin_dir = str(ffmpeg_bin_path.absolute())
-        # Добавляем путь в начало PATH текущего окружения, если его там еще нет
-        if bin_dir not in os.environ["PATH"]:
-            os.environ["PATH"] = bin_dir + os.pathsep + os.environ["PATH"]
-    else:
-        # Опционально: можно вывести в консоль для отладки, если папка не найдена
-        print(f"Warning: FFmpeg bin directory not found at {ffmpeg_bin_path}")
-
-# Инициализируем пути перед запуском интерфейса
-setup_ffmpeg_path()
-
-# Запуск основного приложения
+# Запуск основного приложения. ffmpeg/ffprobe ищет модуль tools при первом обращении,
+# проверка версии и энкодеров идёт в фоне после появления окна
 def main():
     app = FFmpegApp()
     app.mainloop()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,83 @@
+import os
+import json
+import hashlib
+import threading
+
+# Файл в папке с результатами: что, из чего и какой командой было сделано
+MANIFEST_NAME = ".neat_ffmpeg_manifest.json"
+
+def input_fingerprint(path, probe=None):
+    """Отпечаток входного файла: размер, mtime и хэш результата ffprobe."""
+    st = os.stat(path)
+    probe_hash = hashlib.sha1(json.dumps(probe or {}, sort_keys=True).encode("utf-8")).hexdigest()
+    return {"path": os.path.abspath(path), "size": st.st_size, "mtime_ns": st.st_mtime_ns, "probe": probe_hash}
+
+def command_recipe(cmd, **options):
+    """Команда без пути к ffmpeg и без -threads (они зависят от машины, а не от результата)."""
+    args = []
+    skip = False
+    for arg in cmd[1:]:
+        if skip:
+            skip = False
+            continue
+        if arg == "-threads":
+            skip = True
+            continue
+        args.append(arg)
+    return {"cmd": args, **options}
+
+def temp_output(outname):
+    """Имя, под которым файл пишется до успешного завершения (расширение сохраняется для муксера)."""
+    base, ext = os.path.splitext(outname)
+    return f"{base}.partial{ext}"
+
+class Manifest:
+    def __init__(self, folder):
+        self.path = os.path.join(folder, MANIFEST_NAME)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_done(self, outname, fingerprint, recipe):
+        """Готов ли outname: файл на месте, того же размера, сделан из того же входа той же командой."""
+        with self._lock:
+            entry = self.entries.get(os.path.basename(outname))
+        if not entry or not os.path.exists(outname):
+            return False
+        return (entry.get("input") == fingerprint
+                and entry.get("recipe") == recipe
+                and entry.get("output_size") == os.path.getsize(outname))
+
+    def record(self, outname, fingerprint, recipe):
+        with self._lock:
+            self.entries[os.path.basename(outname)] = {
+                "input": fingerprint,
+                "recipe": recipe,
+                "output_size": os.path.getsize(outname),
+            }
+            self._save()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+_manifests = {}
+_manifests_lock = threading.Lock()
+
+def get_manifest(folder):
+    folder = os.path.abspath(folder)
+    with _manifests_lock:
+        if folder not in _manifests:
+            _manifests[folder] = Manifest(folder)
+        return _manifests[folder]
+
+def commit_outputs(pairs, fingerprint, recipe):
+    """Атомарно переименовывает готовые временные файлы в итоговые и записывает их в манифест."""
+    for final, tmp in pairs:
+        os.replace(tmp, final)
+        get_manifest(os.path.dirname(final)).record(final, fingerprint, recipe)
@@ -0,0 +1,224 @@
+"""Метрики выполнения задач и приёмники сообщений воркеров.
+
+Воркеры общаются с внешним миром через объект с методом put((task, msg_type, data)):
+в интерфейсе это ProgressBus, в консоли — cli.ConsoleQueue, а JsonlLog пишет
+итоги задач (msg_type "metrics") и ошибки в файл. Tee раздаёт сообщения нескольким
+приёмникам сразу.
+"""
+import os
+import sys
+import json
+import time
+import threading
+from contextlib import contextmanager
+from datetime import datetime, timezone
+import supervisor
+
+# Файл JSON-lines для интерфейса; в консоли то же задаётся флагом --metrics
+METRICS_ENV = "NEAT_FFMPEG_METRICS"
+
+_local = threading.local()
+
+class JobStats:
+    """Накопитель метрик одной задачи. Внутри `with` все запуски ffmpeg в этом
+    потоке (включая проходы, куски smart cut и склейку) добавляют свои цифры сюда."""
+    def __init__(self, task, job_id, inputs, **labels):
+        self.task = task
+        self.job_id = job_id
+        self.inputs = [p for p in inputs if p]
+        self.labels = labels
+        self.cpu_seconds = 0.0
+        self.cpu_known = True
+        self.processes = 0
+        self.downloaded_bytes = None
+        self._best = None
+        self._started = None
+        self._wall = None
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        self._parent = getattr(_local, "stats", None)
+        _local.stats = self
+        self._started = time.monotonic()
+        return self
+
+    def __exit__(self, *exc):
+        self._wall = time.monotonic() - self._started
+        _local.stats = self._parent
+        return False
+
+    @contextmanager
+    def bind(self):
+        """Учитывать запуски ffmpeg из другого потока (куски параллельного кодирования) в этой задаче."""
+        parent = getattr(_local, "stats", None)
+        _local.stats = self
+        try:
+            yield self
+        finally:
+            _local.stats = parent
+
+    def add_process(self, cpu_seconds, last_event):
+        with self._lock:
+            self.processes += 1
+            if cpu_seconds is None:
+                self.cpu_known = False
+            else:
+                self.cpu_seconds += cpu_seconds
+            # fps и speed у ffmpeg — средние за весь запуск; берём самый длинный запуск,
+            # а не склейку или короткий край smart cut
+            if last_event is not None and (self._best is None or last_event.out_time >= self._best.out_time):
+                self._best = last_event
+
+    def result(self, ok, outputs=()):
+        wall = self._wall if self._wall is not None else time.monotonic() - self._started
+        return {
+            "task": self.task,
+            "job_id": self.job_id,
+            "input": self.inputs[0] if len(self.inputs) == 1 else (self.inputs or None),
+            "ok": ok,
+            "wall_s": round(wall, 3),
+            "fps": self._best.fps if self._best else None,
+            "speed": self._best.speed if self._best else None,
+            "media_s": round(self._best.out_time, 3) if self._best else None,
+            "input_bytes": _total_size(self.inputs),
+            "output_bytes": _total_size(outputs) if ok else None,
+            "downloaded_bytes": self.downloaded_bytes,
+            "cpu_s": round(self.cpu_seconds, 3) if self.cpu_known and self.processes else None,
+            "processes": self.processes,
+            **self.labels,
+        }
+
+def current_stats():
+    return getattr(_local, "stats", None)
+
+def _total_size(paths):
+    sizes = [os.path.getsize(p) for p in paths if p and os.path.isfile(p)]
+    return sum(sizes) if sizes else None
+
+def wait_process(proc):
+    """proc.wait(), но вместе с кодом возврата отдаёт процессорное время процесса (с),
+    либо None, если узнать его нельзя. Общий RUSAGE_CHILDREN не годится: ffmpeg
+    запускаются параллельно, а нужно время конкретного процесса."""
+    if os.name == "nt":
+        handle = _open_process(proc.pid)
+        try:
+            code = proc.wait()
+            return code, _windows_cpu_time(handle)
+        finally:
+            _close_handle(handle)
+    # Процесс забирает supervisor.reap — под замком, который не даёт supervisor.stop
+    # послать сигнал уже освобождённому pid; заодно отдаёт rusage этого процесса
+    code, usage = supervisor.reap(proc)
+    return code, None if usage is None else usage.ru_utime + usage.ru_stime
+
+# PROCESS_QUERY_LIMITED_INFORMATION — достаточно для GetProcessTimes
+_QUERY_ACCESS = 0x1000
+
+def _open_process(pid):
+    """Свой дескриптор процесса: он остаётся действительным и после выхода процесса."""
+    try:
+        import ctypes
+        from ctypes import wintypes
+        kernel32 = ctypes.windll.kernel32
+        kernel32.OpenProcess.restype = wintypes.HANDLE
+        return kernel32.OpenProcess(_QUERY_ACCESS, False, pid) or None
+    except (AttributeError, OSError):
+        return None
+
+def _close_handle(handle):
+    if handle:
+        import ctypes
+        from ctypes import wintypes
+        ctypes.windll.kernel32.CloseHandle(wintypes.HANDLE(handle))
+
+def _windows_cpu_time(handle):
+    if not handle:
+        return None
+    try:
+        import ctypes
+        from ctypes import wintypes
+        creation, exit_, kernel, user = (wintypes.FILETIME() for _ in range(4))
+        ok = ctypes.windll.kernel32.GetProcessTimes(
+            wintypes.HANDLE(handle), ctypes.byref(creation), ctypes.byref(exit_), ctypes.byref(kernel), ctypes.byref(user))
+        if not ok:
+            return None
+        # FILETIME — сотни наносекунд
+        ticks = lambda ft: (ft.dwHighDateTime << 32) | ft.dwLowDateTime
+        return (ticks(kernel) + ticks(user)) / 10_000_000
+    except (AttributeError, OSError, ValueError):
+        return None
+
+class JsonlLog:
+    """Приёмник, дописывающий в файл по строке JSON на итог задачи, ошибку или предупреждение."""
+    KEEP = {"metrics", "error", "log"}
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+
+    def put(self, item):
+        task, msg_type, data = item
+        if msg_type not in self.KEEP:
+            return
+        record = {"ts": datetime.now(timezone.utc).isoformat(timespec="milliseconds"), "task": task, "type": msg_type}
+        if msg_type == "metrics":
+            record.update(data)
+        else:
+            record["message"] = data if isinstance(data, str) else list(data)
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            try:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                # Лог метрик не должен ронять обработку
+                print(f"Не удалось записать метрики в {self.path}: {e}", file=sys.stderr)
+
+class Tee:
+    """Отдаёт каждое сообщение всем приёмникам по очереди."""
+    def __init__(self, *sinks):
+        self.sinks = [s for s in sinks if s is not None]
+
+    def put(self, item):
+        for sink in self.sinks:
+            sink.put(item)
+
+def with_metrics_log(sink, path=None):
+    """sink плюс JsonlLog, если путь задан аргументом или переменной NEAT_FFMPEG_METRICS."""
+    path = path or os.environ.get(METRICS_ENV)
+    return Tee(sink, JsonlLog(path)) if path else sink
+
+def read_metrics(path):
+    with open(path, encoding="utf-8") as f:
+        return [rec for rec in (json.loads(line) for line in f if line.strip()) if rec.get("type") == "metrics"]
+
+def summarize(records, group_by=("task", "preset_name", "vcodec", "preset", "crf")):
+    """Сводка по группам: число задач, ошибки, медианы скорости, fps и процессорного времени на секунду видео."""
+    groups = {}
+    for rec in records:
+        key = tuple(rec.get(k) for k in group_by)
+        groups.setdefault(key, []).append(rec)
+    rows = []
+    for key, recs in sorted(groups.items(), key=lambda kv: [str(k) for k in kv[0]]):
+        ok = [r for r in recs if r.get("ok")]
+        cpu_per_s = [r["cpu_s"] / r["media_s"] for r in ok if r.get("cpu_s") and r.get("media_s")]
+        rows.append({
+            **{k: v for k, v in zip(group_by, key) if v is not None},
+            "jobs": len(recs),
+            "failed": len(recs) - len(ok),
+            "speed": _median([r["speed"] for r in ok if r.get("speed")]),
+            "fps": _median([r["fps"] for r in ok if r.get("fps")]),
+            "cpu_per_media_s": _median(cpu_per_s),
+            "wall_s": round(sum(r.get("wall_s") or 0 for r in recs), 1),
+        })
+    return rows
+
+def _median(values):
+    if not values:
+        return None
+    values = sorted(values)
+    mid = len(values) // 2
+    value = values[mid] if len(values) % 2 else (values[mid - 1] + values[mid]) / 2
+    return round(value, 3)
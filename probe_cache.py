@@ -0,0 +1,157 @@
+import os
+import json
+import time
+import sqlite3
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+def default_cache_dir():
+    """Папка для кэшей приложения: NEAT_FFMPEG_CACHE_DIR, иначе пользовательский кэш ОС."""
+    override = os.environ.get("NEAT_FFMPEG_CACHE_DIR")
+    if override:
+        return override
+    if os.name == "nt":
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "neat_ffmpeg")
+
+def file_fingerprint(path):
+    """(абсолютный путь, размер, mtime в нс) — ключ, меняющийся при любой правке файла."""
+    path = os.path.abspath(path)
+    st = os.stat(path)
+    return path, st.st_size, st.st_mtime_ns
+
+class ProbeCache:
+    """Кэш результатов ffprobe: LRU в памяти поверх SQLite на диске.
+
+    Запись действительна, пока у файла не поменялись размер и mtime.
+    Ошибки ffprobe не кэшируются — файл мог быть недокачан.
+    """
+    def __init__(self, db_path=None, max_entries=5000, memory_entries=256, probe_func=None):
+        if db_path is None:
+            db_path = os.path.join(default_cache_dir(), "probe_cache.sqlite")
+        if db_path != ":memory:":
+            os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        self.max_entries = max_entries
+        self.memory_entries = memory_entries
+        self.probe_func = probe_func
+        self._mem = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        with self._db:
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS probes ("
+                " path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER,"
+                " accessed REAL, data TEXT)"
+            )
+            self._db.execute("CREATE INDEX IF NOT EXISTS probes_accessed ON probes(accessed)")
+
+    def _probe(self, path):
+        if self.probe_func is not None:
+            return self.probe_func(path)
+        from utils import run_ffprobe
+        return run_ffprobe(path, use_cache=False)
+
+    def _remember(self, key, data):
+        self._mem[key] = data
+        self._mem.move_to_end(key)
+        while len(self._mem) > self.memory_entries:
+            self._mem.popitem(last=False)
+
+    def lookup(self, path):
+        """Возвращает закэшированный результат или None, ffprobe не запускает."""
+        try:
+            key = file_fingerprint(path)
+        except OSError:
+            return None
+        with self._lock:
+            if key in self._mem:
+                self._mem.move_to_end(key)
+                return self._mem[key]
+            row = self._db.execute(
+                "SELECT data FROM probes WHERE path=? AND size=? AND mtime_ns=?", key
+            ).fetchone()
+            if row is None:
+                return None
+            with self._db:
+                self._db.execute("UPDATE probes SET accessed=? WHERE path=?", (time.time(), key[0]))
+            data = json.loads(row[0])
+            self._remember(key, data)
+            return data
+
+    def get(self, path):
+        """Результат ffprobe для файла: из кэша, а при промахе — свежий запуск."""
+        data = self.lookup(path)
+        if data is not None:
+            return data
+        try:
+            key = file_fingerprint(path)
+        except OSError as e:
+            return {"error": str(e)}
+        data = self._probe(path)
+        if "error" not in data:
+            self._store(key, data)
+        return data
+
+    def _store(self, key, data):
+        with self._lock:
+            self._remember(key, data)
+            with self._db:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO probes(path, size, mtime_ns, accessed, data) VALUES (?, ?, ?, ?, ?)",
+                    (*key, time.time(), json.dumps(data)),
+                )
+                count = self._db.execute("SELECT COUNT(*) FROM probes").fetchone()[0]
+                if count > self.max_entries:
+                    self._db.execute(
+                        "DELETE FROM probes WHERE path IN "
+                        "(SELECT path FROM probes ORDER BY accessed LIMIT ?)",
+                        (count - self.max_entries,),
+                    )
+
+    def prefetch(self, paths, max_workers=8):
+        """Пробует сразу пачку файлов (параллельно только промахи). Возвращает {path: probe}."""
+        paths = list(dict.fromkeys(paths))
+        result = {}
+        missing = []
+        for p in paths:
+            data = self.lookup(p)
+            if data is None:
+                missing.append(p)
+            else:
+                result[p] = data
+        if missing:
+            with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(missing)))) as pool:
+                for p, data in zip(missing, pool.map(self.get, missing)):
+                    result[p] = data
+        return result
+
+    def invalidate(self, path):
+        path = os.path.abspath(path)
+        with self._lock:
+            for key in [k for k in self._mem if k[0] == path]:
+                del self._mem[key]
+            with self._db:
+                self._db.execute("DELETE FROM probes WHERE path=?", (path,))
+
+    def clear(self):
+        with self._lock:
+            self._mem.clear()
+            with self._db:
+                self._db.execute("DELETE FROM probes")
+
+_cache = None
+_cache_lock = threading.Lock()
+
+def get_cache():
+    """Общий на процесс кэш. Если диск недоступен — работает только в памяти."""
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            try:
+                _cache = ProbeCache()
+            except (OSError, sqlite3.Error):
+                _cache = ProbeCache(db_path=":memory:")
+        return _cache
@@ -0,0 +1,108 @@
+import os
+import time
+from typing import NamedTuple
+
+# Аргументы, переключающие ffmpeg на машиночитаемый прогресс в stdout
+PROGRESS_ARGS = ["-progress", "pipe:1", "-nostats"]
+
+class ProgressEvent(NamedTuple):
+    out_time: float      # секунды обработанного выхода
+    fps: float
+    speed: float         # множитель относительно реального времени (2.0 = вдвое быстрее)
+    total_size: int      # байт записано
+    bitrate: float       # кбит/с
+    finished: bool       # ffmpeg прислал progress=end
+
+def _to_float(value, suffix=""):
+    if suffix and value.endswith(suffix):
+        value = value[:-len(suffix)]
+    try:
+        return float(value)
+    except ValueError:
+        return 0.0
+
+class ProgressParser:
+    """Инкрементальный разбор блоков key=value из `-progress pipe:1`.
+
+    ffmpeg пишет блок строк и завершает его строкой progress=continue|end.
+    События отдаются не чаще min_interval секунд, финальное — всегда.
+    """
+    def __init__(self, min_interval=0.25, clock=time.monotonic):
+        self.min_interval = min_interval
+        self.clock = clock
+        self._buf = b""
+        self._fields = {}
+        self._last_emit = None
+
+    def feed(self, chunk: bytes):
+        events = []
+        self._buf += chunk
+        *lines, self._buf = self._buf.split(b"\n")
+        for raw in lines:
+            key, sep, value = raw.strip().partition(b"=")
+            if not sep:
+                continue
+            key = key.decode("ascii", "ignore")
+            value = value.decode("ascii", "ignore").strip()
+            if key != "progress":
+                # N/A бывает в начале и в конце — оставляем последнее известное значение
+                if value != "N/A":
+                    self._fields[key] = value
+                continue
+            finished = value == "end"
+            now = self.clock()
+            if finished or self._last_emit is None or now - self._last_emit >= self.min_interval:
+                self._last_emit = now
+                events.append(self._event(finished))
+        return events
+
+    def _event(self, finished):
+        f = self._fields
+        # out_time_ms у ffmpeg исторически тоже в микросекундах
+        us = f.get("out_time_us") or f.get("out_time_ms") or "0"
+        size = f.get("total_size", "0")
+        return ProgressEvent(
+            out_time=max(_to_float(us), 0.0) / 1_000_000,
+            fps=_to_float(f.get("fps", "0")),
+            speed=_to_float(f.get("speed", "0"), "x"),
+            total_size=int(size) if size.isdigit() else 0,
+            bitrate=_to_float(f.get("bitrate", "0"), "kbits/s"),
+            finished=finished,
+        )
+
+def read_progress(stream, on_event, min_interval=0.25):
+    """Блокирующе читает бинарный stdout ffmpeg до EOF и вызывает on_event(ProgressEvent).
+
+    Чтение блокируется в os.read, поэтому поток не крутится вхолостую
+    между обновлениями; EOF наступает, когда процесс завершился или убит.
+    """
+    parser = ProgressParser(min_interval)
+    fd = stream.fileno()
+    while True:
+        chunk = os.read(fd, 4096)
+        if not chunk:
+            break
+        for event in parser.feed(chunk):
+            on_event(event)
+
+def follow_progress_file(path, on_event, stop_event, poll=0.25, min_interval=0.25):
+    """Как read_progress, но для `-progress <файл>`: дочитывает файл, пока не придёт
+    progress=end или не будет поднят stop_event (ffmpeg запущен не нами, pipe недоступен)."""
+    parser = ProgressParser(min_interval)
+    pos = 0
+    while True:
+        stopping = stop_event.is_set()
+        try:
+            with open(path, "rb") as f:
+                f.seek(pos)
+                chunk = f.read()
+        except OSError:
+            chunk = b""
+        pos += len(chunk)
+        for event in parser.feed(chunk):
+            on_event(event)
+            if event.finished:
+                return
+        if stopping:
+            return
+        stop_event.wait(poll)
@@ -0,0 +1,154 @@
+"""Поиск смен сцен и тишины для автоматического списка фрагментов.
+
+Файл декодируется один раз: видео прореживается до ANALYSIS_FPS кадров в секунду и
+уменьшается до ANALYSIS_WIDTH, scdet считает оценку смены сцены для каждого кадра;
+звук сводится в моно, и astats меряет уровень RMS в окнах по AUDIO_WINDOW секунд.
+Кэшируются сырые оценки и уровни, а не найденные границы, — поэтому пороги
+(propose_segments) можно менять без повторного декодирования.
+Чистые функции и кэш; запуск ffmpeg — в workers.analyze_worker.
+"""
+import os
+import re
+import json
+import hashlib
+from probe_cache import default_cache_dir, file_fingerprint
+
+ANALYSIS_FPS = 5
+ANALYSIS_WIDTH = 160
+AUDIO_RATE = 8000
+AUDIO_WINDOW = 0.2
+# Файлы метаданных пишутся в рабочую папку процесса — так путь не нужно экранировать в графе фильтров
+SCENES_FILE = "scenes.txt"
+LEVELS_FILE = "levels.txt"
+# Тишина в цифре — -inf дБ; в JSON бесконечность не пишется
+FLOOR_DB = -120.0
+
+# Пороги по умолчанию: оценка scdet 0–100 (у самого scdet по умолчанию 10)
+SCENE_THRESHOLD = 10.0
+NOISE_DB = -35.0
+MIN_SILENCE = 1.0
+MIN_SEGMENT = 1.0
+# Сколько тишины оставлять по краям фрагмента, чтобы речь не обрывалась
+SILENCE_PAD = 0.25
+MAX_CACHED = 500
+
+def build_analysis_cmd(ffmpeg_exe, path, has_video=True, has_audio=True):
+    """Один проход: оценки сцен в SCENES_FILE, уровни звука в LEVELS_FILE (относительно cwd)."""
+    chains, maps = [], []
+    if has_video:
+        chains.append(f"[0:v:0]fps={ANALYSIS_FPS},scale={ANALYSIS_WIDTH}:-2,scdet,"
+                      f"metadata=mode=print:key=lavfi.scd.score:file={SCENES_FILE}[v]")
+        maps += ["-map", "[v]"]
+    if has_audio:
+        chains.append(f"[0:a:0]aresample={AUDIO_RATE},aformat=channel_layouts=mono,"
+                      f"asetnsamples=n={int(AUDIO_RATE * AUDIO_WINDOW)}:p=0,astats=metadata=1:reset=1,"
+                      f"ametadata=mode=print:key=lavfi.astats.Overall.RMS_level:file={LEVELS_FILE}[a]")
+        maps += ["-map", "[a]"]
+    return [ffmpeg_exe, "-hide_banner", "-y", "-i", path, "-sn", "-dn",
+            "-filter_complex", ";".join(chains)] + maps + ["-f", "null", "-"]
+
+def _read_metadata(path, key):
+    """[(время, значение)] из вывода metadata=mode=print."""
+    values, t = [], None
+    try:
+        f = open(path, encoding="utf-8", errors="replace")
+    except FileNotFoundError:
+        return values
+    with f:
+        for line in f:
+            if line.startswith("frame:"):
+                match = re.search(r"pts_time:(\S+)", line)
+                t = float(match.group(1)) if match else None
+            elif line.startswith(key + "=") and t is not None:
+                value = float(line.split("=", 1)[1])
+                values.append((round(t, 3), value if value == value and value > FLOOR_DB else FLOOR_DB))
+    return values
+
+def read_analysis(workdir):
+    """Сырые результаты прохода из рабочей папки — то, что кэшируется."""
+    return {
+        "scores": _read_metadata(os.path.join(workdir, SCENES_FILE), "lavfi.scd.score"),
+        "levels": _read_metadata(os.path.join(workdir, LEVELS_FILE), "lavfi.astats.Overall.RMS_level"),
+        "window": AUDIO_WINDOW,
+    }
+
+def _cache_path(path):
+    key = "|".join(map(str, file_fingerprint(path) + (ANALYSIS_FPS, ANALYSIS_WIDTH, AUDIO_WINDOW)))
+    return os.path.join(default_cache_dir(), "analysis", hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+def load_cached(path):
+    try:
+        cache_path = _cache_path(path)
+        with open(cache_path, encoding="utf-8") as f:
+            data = json.load(f)
+        os.utime(cache_path)
+        return data
+    except (OSError, ValueError):
+        return None
+
+def store_cached(path, data):
+    cache_path = _cache_path(path)
+    folder = os.path.dirname(cache_path)
+    os.makedirs(folder, exist_ok=True)
+    tmp = cache_path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, cache_path)
+    entries = sorted(os.scandir(folder), key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in entries[MAX_CACHED:]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+def detect_scenes(data, threshold=SCENE_THRESHOLD, min_gap=MIN_SEGMENT):
+    """Времена смен сцен: оценка не ниже threshold, не чаще раза в min_gap секунд."""
+    cuts = []
+    for t, score in data.get("scores", []):
+        if score >= threshold and t > 0 and (not cuts or t - cuts[-1] >= min_gap):
+            cuts.append(t)
+    return cuts
+
+def detect_silences(data, noise_db=NOISE_DB, min_duration=MIN_SILENCE):
+    """[(начало, конец)] участков, где уровень ниже noise_db не меньше min_duration секунд."""
+    window = data.get("window", AUDIO_WINDOW)
+    silences, start, end = [], None, None
+    for t, level in data.get("levels", []):
+        if level < noise_db:
+            if start is None:
+                start = t
+            end = t + window
+            continue
+        if start is not None and end - start >= min_duration:
+            silences.append((start, end))
+        start = None
+    if start is not None and end - start >= min_duration:
+        silences.append((start, end))
+    return silences
+
+def propose_segments(data, duration, scene_threshold=SCENE_THRESHOLD, noise_db=NOISE_DB,
+                     min_silence=MIN_SILENCE, min_segment=MIN_SEGMENT, split_scenes=True, drop_silence=True):
+    """Фрагменты [(начало, конец)] в секундах: файл без тишины (drop_silence),
+    разрезанный по сменам сцен (split_scenes). Короче min_segment не предлагаются."""
+    spans = [(0.0, duration)]
+    if drop_silence:
+        spans, pos = [], 0.0
+        for start, end in detect_silences(data, noise_db, min_silence):
+            start, end = max(start + SILENCE_PAD, 0.0), min(end - SILENCE_PAD, duration)
+            if start > pos:
+                spans.append((pos, start))
+            pos = max(pos, end)
+        if pos < duration:
+            spans.append((pos, duration))
+    if split_scenes:
+        cuts = detect_scenes(data, scene_threshold, min_segment)
+        split = []
+        for start, end in spans:
+            pos = start
+            for t in cuts:
+                if pos + min_segment <= t <= end - min_segment:
+                    split.append((pos, t))
+                    pos = t
+            split.append((pos, end))
+        spans = split
+    return [(round(a, 3), round(b, 3)) for a, b in spans if b - a >= min_segment]
@@ -0,0 +1,118 @@
+import os
+import sys
+import time
+import traceback
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+import supervisor
+
+# x264/x265 почти не ускоряются после ~8 потоков, поэтому выгоднее
+# запустить несколько ffmpeg параллельно, чем отдать все ядра одному
+MAX_THREADS_PER_JOB = 8
+
+def plan_concurrency(jobs=None, threads=None, cpu_count=None):
+    """Возвращает (число параллельных задач, потоков ffmpeg на задачу)."""
+    cpu = cpu_count or os.cpu_count() or 1
+    if not threads or threads <= 0:
+        if jobs and jobs > 0:
+            threads = max(1, cpu // jobs)
+        else:
+            threads = min(cpu, MAX_THREADS_PER_JOB)
+    if not jobs or jobs <= 0:
+        jobs = max(1, cpu // threads)
+    return jobs, threads
+
+class BatchProgress:
+    """Общий прогресс пачки, взвешенный по длительности каждого файла."""
+    def __init__(self, weights):
+        weights = [max(float(w or 0), 0.0) for w in weights]
+        total = sum(weights)
+        if total > 0:
+            self.weights = [w / total for w in weights]
+        else:
+            self.weights = [1.0 / len(weights)] * len(weights) if weights else []
+        self.fractions = [0.0] * len(weights)
+        self.started = time.monotonic()
+        self._lock = threading.Lock()
+
+    def update(self, job_id, fraction):
+        """Запоминает долю готовности задачи (0..1) и возвращает общий процент."""
+        fraction = min(max(fraction, 0.0), 1.0)
+        with self._lock:
+            self.fractions[job_id] = fraction
+            done = sum(w * f for w, f in zip(self.weights, self.fractions))
+        return int(done * 100)
+
+    def eta(self):
+        """Оценка оставшегося времени пачки в секундах (None, пока нечего оценивать)."""
+        with self._lock:
+            done = sum(w * f for w, f in zip(self.weights, self.fractions))
+        if done <= 0:
+            return None
+        elapsed = time.monotonic() - self.started
+        return elapsed * (1 - done) / done
+
+class JobScheduler:
+    """Ограниченный пул задач ffmpeg с общей отменой через cancel_event."""
+    def __init__(self, max_workers, cancel_event):
+        self.max_workers = max(1, int(max_workers))
+        self.cancel_event = cancel_event
+        self._procs = set()
+        self._stopping = set()
+        self._lock = threading.Lock()
+
+    def register(self, proc):
+        with self._lock:
+            self._procs.add(proc)
+        # Отмена могла прийти, пока процесс запускался
+        if self.cancel_event.is_set():
+            self.terminate_all()
+
+    def unregister(self, proc):
+        with self._lock:
+            self._procs.discard(proc)
+            self._stopping.discard(proc)
+
+    def terminate_all(self):
+        """Останавливает процессы задач (мягко, с эскалацией — см. supervisor.stop)."""
+        with self._lock:
+            procs = [p for p in self._procs if p not in self._stopping]
+            self._stopping.update(procs)
+        for proc in procs:
+            if not supervisor.exited(proc):
+                supervisor.stop_async(proc)
+
+    def run(self, func, items, on_error=None):
+        """Вызывает func(job_id, item) для каждого элемента, не больше max_workers одновременно.
+
+        Возвращает список результатов в порядке items; для отменённых задач — None.
+        Исключение задачи не обрывает пачку: её результат — False, а исключение
+        передаётся в on_error(job_id, item, exc) (без него — печатается в stderr).
+        """
+        results = [None] * len(items)
+        executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="ffjob")
+        try:
+            futures = {executor.submit(func, job_id, item): job_id for job_id, item in enumerate(items)}
+            pending = set(futures)
+            while pending:
+                done, pending = wait(pending, timeout=0.2, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    if fut.cancelled():
+                        continue
+                    job_id = futures[fut]
+                    exc = fut.exception()
+                    if exc is None:
+                        results[job_id] = fut.result()
+                        continue
+                    results[job_id] = False
+                    if on_error is not None:
+                        on_error(job_id, items[job_id], exc)
+                    else:
+                        traceback.print_exception(type(exc), exc, exc.__traceback__, file=sys.stderr)
+                if self.cancel_event.is_set():
+                    for fut in pending:
+                        fut.cancel()
+                    self.terminate_all()
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+        return results
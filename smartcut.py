@@ -0,0 +1,146 @@
+import subprocess
+from utils import STARTUPINFO
+
+# Насколько далеко от границы фрагмента ищем ключевой кадр. Длиннее GOP почти не бывает,
+# а если ключевых кадров в окне нет — фрагмент просто перекодируется целиком
+KEYFRAME_WINDOW = 30.0
+EPS = 0.001
+
+# Кодек исходника → энкодер, которым перекодируются края
+VIDEO_ENCODERS = {
+    "h264": "libx264",
+    "hevc": "libx265",
+    "vp9": "libvpx-vp9",
+    "av1": "libsvtav1",
+    "mpeg4": "mpeg4",
+}
+AUDIO_ENCODERS = {
+    "aac": "aac",
+    "mp3": "libmp3lame",
+    "opus": "libopus",
+    "vorbis": "libvorbis",
+    "flac": "flac",
+    "ac3": "ac3",
+}
+# Края перекодируются со своими SPS/PPS, а mp4/mkv хранят один набор на дорожку (avcC/hvcC).
+# Такие куски склеиваются через MPEG-TS: фильтр кладёт параметры каждого куска в поток
+ANNEXB_FILTERS = {
+    "h264": "h264_mp4toannexb",
+    "hevc": "hevc_mp4toannexb",
+}
+H264_PROFILES = {
+    "Constrained Baseline": "baseline",
+    "Baseline": "baseline",
+    "Main": "main",
+    "High": "high",
+    "High 10": "high10",
+    "High 4:2:2": "high422",
+    "High 4:4:4 Predictive": "high444",
+}
+
+def start_time(probe):
+    """format.start_time: от него ffmpeg отсчитывает -ss, а ffprobe показывает pts как есть."""
+    try:
+        return float((probe or {}).get("format", {}).get("start_time") or 0)
+    except ValueError:
+        return 0.0
+
+def probe_keyframes(path, start, end, ffprobe="ffprobe", offset=0.0):
+    """Время ключевых кадров первого видеопотока около начала и конца фрагмента.
+
+    Читаются только пакеты (без декодирования) в двух окнах по KEYFRAME_WINDOW секунд.
+    start/end и результат — в отсчёте -ss, offset — start_time файла.
+    """
+    head_end = min(end, start + KEYFRAME_WINDOW)
+    tail_start = max(head_end, end - KEYFRAME_WINDOW)
+    intervals = f"{start + offset:.3f}%{head_end + offset:.3f}"
+    if tail_start < end:
+        intervals += f",{tail_start + offset:.3f}%{end + offset:.3f}"
+    cmd = [
+        ffprobe, "-v", "error", "-select_streams", "v:0",
+        "-read_intervals", intervals,
+        "-show_entries", "packet=pts_time,flags",
+        "-of", "csv=print_section=0", path,
+    ]
+    out = subprocess.check_output(cmd, stderr=subprocess.DEVNULL, startupinfo=STARTUPINFO)
+    return parse_keyframes(out.decode("ascii", "ignore"), offset)
+
+def parse_keyframes(text, offset=0.0):
+    """Времена ключевых кадров из вывода ffprobe за вычетом offset (start_time файла)."""
+    keyframes = set()
+    for line in text.splitlines():
+        pts, _, flags = line.strip().partition(",")
+        if "K" not in flags: continue
+        try:
+            keyframes.add(round(float(pts) - offset, 6))
+        except ValueError:
+            continue
+    return sorted(keyframes)
+
+def plan_smart_cut(keyframes, start, end):
+    """Делит [start, end) на куски ("encode"|"copy", начало, конец).
+
+    Между первым и последним ключевым кадром внутри фрагмента — копия потока,
+    края до/после них перекодируются, чтобы обрезка была точной до кадра.
+    """
+    inner = [k for k in keyframes if start - EPS <= k <= end + EPS]
+    if not inner:
+        return [("encode", start, end)]
+    k1, k2 = inner[0], inner[-1]
+    pieces = []
+    if k1 - start > EPS:
+        pieces.append(("encode", start, k1))
+    if k2 - k1 > EPS:
+        pieces.append(("copy", k1, k2))
+    if end - k2 > EPS:
+        pieces.append(("encode", k2, end))
+    return pieces
+
+def _stream(probe, codec_type):
+    for s in probe.get("streams", []):
+        if s.get("codec_type") == codec_type:
+            return s
+    return None
+
+def can_smart_cut(probe):
+    video = _stream(probe, "video")
+    return video is not None and video.get("codec_name") in VIDEO_ENCODERS
+
+def edge_encode_args(probe, ext=""):
+    """Параметры перекодирования краёв, совпадающие с исходником, чтобы concat склеил куски без перекодирования."""
+    args = []
+    video = _stream(probe, "video")
+    if video:
+        codec = video.get("codec_name")
+        args += ["-c:v", VIDEO_ENCODERS[codec]]
+        if video.get("pix_fmt"):
+            args += ["-pix_fmt", video["pix_fmt"]]
+        if codec == "h264" and video.get("profile") in H264_PROFILES:
+            args += ["-profile:v", H264_PROFILES[video["profile"]]]
+        if codec in ("h264", "hevc"):
+            # Края короткие — почти без потерь и быстро
+            args += ["-crf", "16", "-preset", "veryfast"]
+        tb = video.get("time_base", "")
+        # Опция есть только у mp4/mov-муксера; одинаковый timescale нужен concat для точных стыков
+        if "/" in tb and ext.lower() in (".mp4", ".mov", ".m4v"):
+            args += ["-video_track_timescale", tb.split("/")[1]]
+    audio = _stream(probe, "audio")
+    if audio:
+        args += ["-c:a", AUDIO_ENCODERS.get(audio.get("codec_name"), "aac")]
+        if audio.get("sample_rate"):
+            args += ["-ar", str(audio["sample_rate"])]
+        if audio.get("channels"):
+            args += ["-ac", str(audio["channels"])]
+        if audio.get("bit_rate"):
+            args += ["-b:a", str(audio["bit_rate"])]
+    return args
+
+def build_piece_cmd(ffmpeg_exe, path, kind, start, end, encode_args, outname):
+    cmd = [ffmpeg_exe, "-hide_banner", "-y", "-ss", f"{start:.6f}", "-i", path, "-t", f"{end - start:.6f}",
+           "-map", "0:v:0?", "-map", "0:a:0?"]
+    if kind == "copy":
+        cmd += ["-c", "copy", "-avoid_negative_ts", "make_zero"]
+    else:
+        cmd += encode_args
+    cmd += ["-map_metadata", "-1", outname]
+    return cmd
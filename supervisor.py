@@ -0,0 +1,199 @@
+"""Жизненный цикл дочерних процессов ffmpeg.
+
+Все процессы запускаются через spawn: в отдельной группе процессов и с stdin-pipe.
+Остановка мягкая — ffmpeg получает `q` и сам дописывает/закрывает файл; если он
+не завершился за GRACE_TIMEOUT, группе отправляется terminate, затем kill.
+Недописанные файлы регистрируются через partial_outputs и удаляются, если задача
+не довела их до конца, в том числе при закрытии программы (shutdown / atexit).
+
+На POSIX процесс забирается (waitpid) только через reap и под тем же замком, под
+которым stop шлёт сигналы группе: сигнал не уйдёт освобождённому pid, который
+система могла уже отдать другому процессу.
+"""
+import os
+import sys
+import atexit
+import signal
+import time
+import threading
+import subprocess
+from contextlib import contextmanager
+from utils import STARTUPINFO
+
+# Сколько ждать выхода по `q` и после terminate, секунд
+GRACE_TIMEOUT = 3.0
+TERMINATE_TIMEOUT = 2.0
+
+_lock = threading.Lock()
+_procs = set()
+_partials = set()
+# Забрать процесс и послать сигнал его группе можно только под этим замком
+_reap_lock = threading.Lock()
+
+def spawn(cmd, **kwargs):
+    """subprocess.Popen в своей группе процессов; процесс учитывается до stop/wait."""
+    kwargs.setdefault("stdin", subprocess.PIPE)
+    if os.name == "nt":
+        kwargs.setdefault("startupinfo", STARTUPINFO)
+        kwargs["creationflags"] = kwargs.get("creationflags", 0) | subprocess.CREATE_NEW_PROCESS_GROUP
+    else:
+        kwargs["start_new_session"] = True
+    proc = subprocess.Popen(cmd, **kwargs)
+    with _lock:
+        _procs.add(proc)
+    return proc
+
+def release(proc):
+    """Процесс завершён и дождан — больше не отслеживаем."""
+    with _lock:
+        _procs.discard(proc)
+    if proc.stdin:
+        try:
+            proc.stdin.close()
+        except OSError:
+            pass
+
+def exited(proc):
+    """Завершился ли процесс. На POSIX не забирает его (WNOWAIT): pid остаётся занят до reap."""
+    if proc.returncode is not None:
+        return True
+    if os.name == "nt" or not hasattr(os, "waitid"):
+        return proc.poll() is not None
+    try:
+        return os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOHANG | os.WNOWAIT) is not None
+    except ChildProcessError:
+        return True
+
+def reap(proc, block=True):
+    """Забирает завершившийся процесс и ставит proc.returncode.
+
+    Возвращает (код, rusage). rusage — из os.wait4, None на Windows и если процесс
+    уже забран; при block=False для ещё работающего процесса — (None, None).
+    """
+    if os.name == "nt" or not hasattr(os, "wait4"):
+        return (proc.wait() if block else proc.poll()), None
+    if block:
+        try:
+            if hasattr(os, "waitid"):
+                # Ждём выхода, не забирая процесс: забираем ниже, под замком
+                os.waitid(os.P_PID, proc.pid, os.WEXITED | os.WNOWAIT)
+            else:
+                # Без waitid (macOS) ждать, не забирая, нечем — остаётся гонка с stop
+                _, status, usage = os.wait4(proc.pid, 0)
+                with _reap_lock:
+                    proc.returncode = os.waitstatus_to_exitcode(status)
+                return proc.returncode, usage
+        except ChildProcessError:
+            pass
+    with _reap_lock:
+        if proc.returncode is not None:
+            return proc.returncode, None
+        try:
+            pid, status, usage = os.wait4(proc.pid, 0 if block else os.WNOHANG)
+        except ChildProcessError:
+            # Забран в обход reap (Popen.poll/wait) — код знает только Popen
+            return proc.wait(), None
+        if pid == 0:
+            return None, None
+        # Popen, который сам не дождался процесса, при ECHILD ставит код 0 — ставим свой
+        proc.returncode = os.waitstatus_to_exitcode(status)
+        return proc.returncode, usage
+
+def _wait_exit(proc, timeout):
+    if os.name == "nt":
+        try:
+            proc.wait(timeout=timeout)
+            return True
+        except subprocess.TimeoutExpired:
+            return False
+    deadline = time.monotonic() + timeout
+    while not exited(proc):
+        if time.monotonic() >= deadline:
+            return False
+        time.sleep(0.05)
+    return True
+
+def _signal_group(proc, kill):
+    if os.name == "nt":
+        if kill:
+            # TerminateProcess не трогает потомков — taskkill /T снимает всё дерево
+            subprocess.run(["taskkill", "/F", "/T", "/PID", str(proc.pid)],
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, startupinfo=STARTUPINFO)
+        else:
+            proc.terminate()
+        return
+    with _reap_lock:
+        if proc.returncode is not None:
+            # Процесс забран, его pid мог достаться другому
+            return
+        try:
+            os.killpg(proc.pid, signal.SIGKILL if kill else signal.SIGTERM)
+        except (ProcessLookupError, PermissionError):
+            pass
+
+def stop(proc, grace=GRACE_TIMEOUT):
+    """Останавливает процесс: `q` в stdin → terminate группы → kill. Блокирует до выхода."""
+    if not exited(proc) and proc.stdin:
+        try:
+            proc.stdin.write(b"q")
+            proc.stdin.flush()
+            proc.stdin.close()
+        except (OSError, ValueError):
+            pass
+    for escalate in (None, False, True):
+        if escalate is not None:
+            _signal_group(proc, kill=escalate)
+        if _wait_exit(proc, grace if escalate is None else TERMINATE_TIMEOUT):
+            break
+    if os.name != "nt":
+        # Лидер вышел, но его потомки в группе могли остаться. Пока лидер не забран,
+        # его pid занят — сигнал уходит именно этой группе (если уже забран — не уходит)
+        _signal_group(proc, kill=True)
+    reap(proc, block=False)
+    release(proc)
+
+def stop_async(proc, grace=GRACE_TIMEOUT):
+    """stop в фоновом потоке: вызывающий (цикл планировщика, интерфейс) не ждёт таймаутов."""
+    thread = threading.Thread(target=stop, args=(proc, grace), daemon=True, name=f"stop-{proc.pid}")
+    thread.start()
+    return thread
+
+@contextmanager
+def partial_outputs(paths):
+    """Файлы, которые задача пишет до подтверждения результата. На выходе из блока
+    (успех, ошибка или отмена) оставшиеся удаляются — готовые к этому моменту уже переименованы."""
+    paths = [p for p in paths if p]
+    with _lock:
+        _partials.update(paths)
+    try:
+        yield
+    finally:
+        with _lock:
+            _partials.difference_update(paths)
+        _remove(paths)
+
+def _remove(paths):
+    for path in paths:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            print(f"Не удалось удалить {path}: {e}", file=sys.stderr)
+
+def running():
+    with _lock:
+        return [p for p in _procs if not exited(p)]
+
+def shutdown(grace=GRACE_TIMEOUT):
+    """Останавливает все процессы параллельно и удаляет недописанные файлы.
+    Вызывается при закрытии окна и при выходе интерпретатора."""
+    threads = [stop_async(p, grace) for p in running()]
+    for t in threads:
+        t.join(grace + 2 * TERMINATE_TIMEOUT + 1)
+    with _lock:
+        paths = list(_partials)
+        _partials.clear()
+    _remove(paths)
+
+atexit.register(shutdown)
@@ -0,0 +1,24 @@
+import os
+import sys
+
+# Модули проекта лежат в корне репозитория, без пакета
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import stat
+import pytest
+
+@pytest.fixture
+def failing_ffmpeg(tmp_path, monkeypatch):
+    """ffmpeg, который сразу завершается с ошибкой (скрипт с shebang — только POSIX)."""
+    import tools
+    if os.name == "nt":
+        pytest.skip("фальшивый ffmpeg — скрипт с shebang")
+    exe = tmp_path / "bin" / "ffmpeg"
+    exe.parent.mkdir()
+    exe.write_text("#!/bin/sh\necho 'Conversion failed!' >&2\nexit 1\n")
+    exe.chmod(exe.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv(tools.TOOL_ENV["ffmpeg"], str(exe))
+    monkeypatch.setenv("NEAT_FFMPEG_CACHE_DIR", str(tmp_path / "cache"))
+    tools.find_tool.cache_clear()
+    yield exe
+    tools.find_tool.cache_clear()
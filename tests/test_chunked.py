@@ -0,0 +1,19 @@
+import bisect
+from chunked import chunk_count, plan_chunks
+
+def test_chunk_count():
+    assert chunk_count(30, 4) == 1
+    assert chunk_count(150, 4) == 2
+    assert chunk_count(3600, 4) == 8
+
+def test_plan_chunks_snaps_to_keyframes():
+    keyframes = [0.0, 48.0, 97.0, 151.0, 200.0]
+    def find_keyframe(t):
+        i = bisect.bisect_left(keyframes, t)
+        return keyframes[i] if i < len(keyframes) else None
+    assert plan_chunks(240, 4, find_keyframe) == [(0.0, 97.0), (97.0, 151.0), (151.0, 200.0), (200.0, 240)]
+
+def test_plan_chunks_merges_when_no_keyframe():
+    assert plan_chunks(240, 3, lambda t: None) == [(0.0, 240)]
+    # Один и тот же ключевой кадр для двух границ — кусок не дублируется
+    assert plan_chunks(240, 3, lambda t: 150.0) == [(0.0, 150.0), (150.0, 240)]
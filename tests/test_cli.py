@@ -0,0 +1,14 @@
+import json
+import cli
+
+def test_read_list_moves_file_key_to_path(tmp_path):
+    jobs = tmp_path / "jobs.json"
+    jobs.write_text(json.dumps(["a.mp4", {"file": "b.mp4", "crf": 20}]), encoding="utf-8")
+    assert cli.read_list(str(jobs)) == [{"path": "a.mp4"}, {"path": "b.mp4", "crf": 20}]
+
+def test_row_without_path_is_a_usage_error(tmp_path, capsys):
+    jobs = tmp_path / "jobs.json"
+    jobs.write_text(json.dumps([{"path": "a.mp4"}, {"crf": 20}]), encoding="utf-8")
+    assert cli.main(["convert", "--list", str(jobs)]) == cli.EXIT_USAGE
+    assert "в строке 2 нет path или file" in capsys.readouterr().err
+    assert cli.main(["cut", "--list", str(jobs)]) == cli.EXIT_USAGE
@@ -0,0 +1,87 @@
+import os
+import pytest
+from command_builder import build_convert_cmd, validate_settings, stream_plan, apply_preset
+from command_builder import build_two_pass_cmds, target_video_bitrate, audio_bitrate_bps, MUXER_OVERHEAD
+
+def _probe(vcodec="h264", fps="30000/1001", acodec="aac", abitrate="128000"):
+    return {"streams": [
+        {"codec_type": "video", "codec_name": vcodec, "width": 1920, "height": 1080, "avg_frame_rate": fps},
+        {"codec_type": "audio", "codec_name": acodec, "bit_rate": abitrate},
+    ]}
+
+def test_convert_cmd_defaults():
+    cmd = build_convert_cmd("ffmpeg", "in.mov", "out.mp4", {"crf": "23", "preset": "medium"}, threads=4)
+    assert cmd == ["ffmpeg", "-hide_banner", "-y", "-i", "in.mov",
+                   "-c:v", "libx264", "-crf", "23", "-preset", "medium", "-c:a", "aac",
+                   "-threads", "4", "-movflags", "+faststart", "-map_metadata", "-1", "out.mp4"]
+
+def test_convert_cmd_filters_and_vp9_crf():
+    settings = {"vcodec": "libvpx-vp9", "crf": "31", "resolution": "1280:-1", "fps": "30000/1001",
+                "acodec": "opus", "abitrate": "96k", "out_format": "webm"}
+    cmd = build_convert_cmd("ffmpeg", "in.mp4", "out.webm", settings)
+    assert cmd[cmd.index("-crf") + 1:cmd.index("-crf") + 4] == ["31", "-b:v", "0"]
+    assert cmd[cmd.index("-vf") + 1] == "scale='1280:trunc(ow/a/2)*2',fps=30000/1001"
+    assert cmd[cmd.index("-c:a") + 1:cmd.index("-c:a") + 4] == ["libopus", "-b:a", "96k"]
+    assert "-movflags" not in cmd
+
+def test_convert_cmd_copies_planned_streams():
+    cmd = build_convert_cmd("ffmpeg", "in.mp4", "out.mp4", {"resolution": "1280:-1"}, threads=4,
+                            plan={"video": "copy", "audio": "encode"})
+    assert cmd[cmd.index("-c:v") + 1] == "copy"
+    assert "-vf" not in cmd and "-threads" not in cmd
+
+def test_validate_settings():
+    assert validate_settings(apply_preset("fast preview")) == []
+    errors = validate_settings({"vcodec": "copy", "fps": "24", "acodec": "pcm_s16le", "out_format": "mp4"})
+    assert len(errors) == 2
+    assert validate_settings({"crf": "high"}) == ["CRF должен быть числом: high"]
+    assert len(validate_settings({"vcodec": "libx265", "target_size_mb": "50", "acodec": "flac"})) == 2
+    assert validate_settings({"acodec": "opus"}, encoders={"libx264"}) == [
+        "Энкодер libopus отсутствует в этой сборке ffmpeg"]
+
+def test_stream_plan_accepts_rational_fps():
+    settings = {"vcodec": "libx264", "out_format": "mp4", "fps": "30000/1001"}
+    assert stream_plan(settings, _probe())["video"] == "copy"
+    assert stream_plan(dict(settings, fps="25"), _probe())["video"] == "encode"
+
+def test_stream_plan_copy_rules():
+    settings = {"vcodec": "libx264", "acodec": "aac", "abitrate": "128k", "out_format": "mp4"}
+    assert stream_plan(settings, _probe()) == {"video": "copy", "audio": "copy"}
+    # Исходник с большим битрейтом звука пережимается
+    assert stream_plan(settings, _probe(abitrate="320000"))["audio"] == "encode"
+    # Другой кодек, другой размер, копирование запрещено, кодирование под размер
+    assert stream_plan(settings, _probe(vcodec="hevc"))["video"] == "encode"
+    assert stream_plan(dict(settings, resolution="1280:720"), _probe())["video"] == "encode"
+    assert stream_plan(dict(settings, copy_matching=False), _probe()) == {"video": "encode", "audio": "encode"}
+    assert stream_plan(dict(settings, target_size_mb="10"), _probe())["video"] == "encode"
+    # Кодек не подходит контейнеру
+    assert stream_plan(dict(settings, vcodec="libvpx-vp9", out_format="mov"), _probe(vcodec="vp9"))["video"] == "encode"
+    # Потока нет — нечего делать; probe нет — всё перекодируется
+    assert stream_plan(settings, {"streams": [{"codec_type": "audio", "codec_name": "aac"}]})["video"] is None
+    assert stream_plan(settings, None) == {"video": "encode", "audio": "encode"}
+
+def test_target_bitrate_leaves_room_for_audio():
+    # 10 МБ на 80 с: всего ~1 Мбит/с за вычетом накладных расходов контейнера
+    total = 10_000_000 * 8 * (1 - MUXER_OVERHEAD) / 80
+    assert target_video_bitrate(10_000_000, 80, 128_000) == int(total - 128_000)
+    assert target_video_bitrate(10_000_000, 80, 0) == int(total)
+    assert target_video_bitrate(10_000_000, 0, 128_000) is None
+    # Звук съедает весь бюджет — битрейт видео не положительный, кодировать нечем
+    assert target_video_bitrate(100_000, 80, 128_000) <= 0
+
+def test_audio_bitrate_for_size():
+    assert audio_bitrate_bps({"abitrate": "96k"}) == 96_000
+    assert audio_bitrate_bps({"acodec": "copy"}, _probe(abitrate="192000")) == 192_000
+    assert audio_bitrate_bps({}, {"streams": [{"codec_type": "video"}]}) == 0
+
+@pytest.mark.parametrize("devnull", ["/dev/null", "nul"])
+def test_two_pass_cmds(monkeypatch, devnull):
+    monkeypatch.setattr(os, "devnull", devnull)
+    first, second = build_two_pass_cmds("ffmpeg", "in.mov", "out.mp4", {"preset": "medium", "abitrate": "128k"},
+                                        1_000_000, "/tmp/pass/pass", threads=4)
+    video = ["-c:v", "libx264", "-b:v", "1000000", "-preset", "medium"]
+    assert first == ["ffmpeg", "-hide_banner", "-y", "-i", "in.mov"] + video + [
+        "-threads", "4", "-pass", "1", "-passlogfile", "/tmp/pass/pass", "-an", "-f", "null", devnull]
+    assert second == ["ffmpeg", "-hide_banner", "-y", "-i", "in.mov"] + video + [
+        "-c:a", "aac", "-b:a", "128k", "-threads", "4", "-pass", "2", "-passlogfile", "/tmp/pass/pass",
+        "-movflags", "+faststart", "-map_metadata", "-1", "out.mp4"]
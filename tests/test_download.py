@@ -0,0 +1,46 @@
+import functools
+import http.server
+import queue
+import threading
+import pytest
+
+pytest.importorskip("yt_dlp")
+import workers
+
+@pytest.fixture
+def media_server(tmp_path):
+    """Локальный HTTP-сервер, раздающий папку с одним «роликом»."""
+    served = tmp_path / "served"
+    served.mkdir()
+    (served / "clip.mp4").write_bytes(b"\x00" * 64 * 1024)
+    handler = functools.partial(http.server.SimpleHTTPRequestHandler, directory=str(served))
+    handler.log_message = lambda *args: None
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/clip.mp4"
+    server.shutdown()
+    server.server_close()
+
+def _run(url, folder):
+    q = queue.Queue()
+    workers.download_worker(url, str(folder), q, threading.Event(),
+                            ydl_overrides={"force_generic_extractor": True, "retries": 0})
+    messages = []
+    while not q.empty():
+        messages.append(q.get())
+    return messages
+
+def test_download_from_local_server(media_server, tmp_path, monkeypatch):
+    monkeypatch.setenv("NEAT_FFMPEG_CACHE_DIR", str(tmp_path / "cache"))
+    out = tmp_path / "out"
+    out.mkdir()
+    messages = _run(media_server, out)
+    assert messages[-1] == ("dl", "done", None), messages
+    assert (out / "clip.mp4").stat().st_size == 64 * 1024
+    assert any(t == "metrics" and m["ok"] and m["downloaded_bytes"] for _, t, m in messages)
+
+    # Повторный запуск: ролик уже в архиве, сайт не запрашивается
+    messages = _run(media_server, out)
+    assert ("dl", "job_status", (0, "Уже скачано")) in messages
+    assert messages[-1] == ("dl", "done", None)
@@ -0,0 +1,72 @@
+import os
+import queue
+import threading
+import workers
+from manifest import Manifest, command_recipe, commit_outputs, get_manifest, input_fingerprint, temp_output
+
+def _done(tmp_path, data=b"video"):
+    src = tmp_path / "a.mp4"
+    src.write_bytes(data)
+    out = str(tmp_path / "a_cut.mp4")
+    with open(temp_output(out), "wb") as f:
+        f.write(b"result")
+    fingerprint = input_fingerprint(str(src), {"format": {"duration": "10"}})
+    recipe = command_recipe(["ffmpeg", "-i", str(src), "-c", "copy", out])
+    commit_outputs([(out, temp_output(out))], fingerprint, recipe)
+    return src, out, fingerprint, recipe
+
+def test_recorded_output_is_done(tmp_path):
+    src, out, fingerprint, recipe = _done(tmp_path)
+    assert not os.path.exists(temp_output(out))
+    assert get_manifest(str(tmp_path)).is_done(out, fingerprint, recipe)
+    # Манифест лежит на диске и переживает перезапуск
+    assert Manifest(str(tmp_path)).is_done(out, fingerprint, recipe)
+
+def test_changed_recipe_or_input_is_not_done(tmp_path):
+    src, out, fingerprint, recipe = _done(tmp_path)
+    manifest = get_manifest(str(tmp_path))
+    assert not manifest.is_done(out, fingerprint, command_recipe(["ffmpeg", "-i", str(src), "-c:v", "libx264", out]))
+    assert not manifest.is_done(out, fingerprint, dict(recipe, smart=True))
+    assert not manifest.is_done(out, input_fingerprint(str(src), {"format": {"duration": "11"}}), recipe)
+    src.write_bytes(b"other video")
+    assert not manifest.is_done(out, input_fingerprint(str(src), {"format": {"duration": "10"}}), recipe)
+
+def test_changed_or_missing_output_is_not_done(tmp_path):
+    src, out, fingerprint, recipe = _done(tmp_path)
+    manifest = get_manifest(str(tmp_path))
+    with open(out, "ab") as f:
+        f.write(b"!")
+    assert not manifest.is_done(out, fingerprint, recipe)
+    os.remove(out)
+    assert not manifest.is_done(out, fingerprint, recipe)
+
+def test_threads_do_not_change_recipe():
+    cmd = ["ffmpeg", "-i", "a.mp4", "-c:v", "libx264", "-threads", "4", "out.mp4"]
+    assert command_recipe(cmd) == command_recipe(["/opt/ffmpeg", "-i", "a.mp4", "-c:v", "libx264", "-threads", "8", "out.mp4"])
+    assert command_recipe(cmd, crf=23)["cmd"] == ["-i", "a.mp4", "-c:v", "libx264", "out.mp4"]
+
+def test_second_cut_run_skips_done_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(workers, "_resolve_ffmpeg", lambda task, queue: "ffmpeg")
+    calls = []
+    def fake_run(cmd, scheduler, on_progress, cwd=None):
+        calls.append(cmd)
+        with open(cmd[-1], "wb") as f:
+            f.write(b"result")
+        return 0, ""
+    monkeypatch.setattr(workers, "_run_ffmpeg", fake_run)
+    src = tmp_path / "a.mp4"
+    src.write_bytes(b"video")
+    probes = {str(src): {"format": {"duration": "10"}, "streams": []}}
+
+    def run(start="00:00:01"):
+        q = queue.Queue()
+        workers.cut_worker([str(src)], start, "00:00:05", "_cut", q, threading.Event(), probes=probes)
+        return list(q.queue)
+
+    run()
+    assert len(calls) == 1 and (tmp_path / "a_cut.mp4").exists()
+    messages = run()
+    assert len(calls) == 1
+    assert ("cut", "status", "a.mp4: уже обработан, пропуск") in messages
+    run("00:00:02")
+    assert len(calls) == 2
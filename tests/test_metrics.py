@@ -0,0 +1,30 @@
+import os
+import subprocess
+import sys
+import threading
+import pytest
+from metrics import wait_process
+
+BUSY = "import sys, time\nend = time.process_time() + 0.2\nwhile time.process_time() < end: pass\nsys.exit(3)"
+
+def test_wait_process_reports_code_and_cpu_time():
+    proc = subprocess.Popen([sys.executable, "-c", BUSY])
+    code, cpu = wait_process(proc)
+    assert code == 3 and proc.returncode == 3
+    assert cpu is None or cpu >= 0.15
+
+@pytest.mark.skipif(os.name == "nt", reason="гонка с waitpid есть только на POSIX")
+def test_wait_process_survives_concurrent_poll():
+    proc = subprocess.Popen([sys.executable, "-c", BUSY])
+    stop = threading.Event()
+    def poll():
+        while not stop.is_set():
+            proc.poll()
+    poller = threading.Thread(target=poll)
+    poller.start()
+    try:
+        code, _ = wait_process(proc)
+    finally:
+        stop.set()
+        poller.join()
+    assert code == 3
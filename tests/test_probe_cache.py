@@ -0,0 +1,61 @@
+import itertools
+import os
+import probe_cache
+from probe_cache import ProbeCache
+
+def _cache(monkeypatch, tmp_path, **kwargs):
+    monkeypatch.setenv("NEAT_FFMPEG_CACHE_DIR", str(tmp_path / "cache"))
+    calls = []
+    def probe(path):
+        calls.append(os.path.basename(path))
+        return {"format": {"duration": str(len(calls))}}
+    return ProbeCache(probe_func=probe, **kwargs), calls
+
+def _file(tmp_path, name, data=b"video"):
+    path = tmp_path / name
+    path.write_bytes(data)
+    return str(path)
+
+def test_cache_lives_in_cache_dir(monkeypatch, tmp_path):
+    cache, calls = _cache(monkeypatch, tmp_path)
+    path = _file(tmp_path, "a.mp4")
+    assert cache.get(path) == cache.get(path)
+    assert calls == ["a.mp4"]
+    assert os.path.exists(tmp_path / "cache" / "probe_cache.sqlite")
+    # Новый экземпляр (новый запуск программы) читает с диска
+    assert ProbeCache(probe_func=None).lookup(path) == {"format": {"duration": "1"}}
+
+def test_changed_mtime_or_size_misses(monkeypatch, tmp_path):
+    cache, calls = _cache(monkeypatch, tmp_path)
+    path = _file(tmp_path, "a.mp4")
+    cache.get(path)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert cache.lookup(path) is None
+    cache.get(path)
+    with open(path, "ab") as f:
+        f.write(b"more")
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+    assert cache.lookup(path) is None
+    assert cache.get(path) == {"format": {"duration": "3"}}
+    assert calls == ["a.mp4"] * 3
+
+def test_errors_are_not_cached(monkeypatch, tmp_path):
+    monkeypatch.setenv("NEAT_FFMPEG_CACHE_DIR", str(tmp_path / "cache"))
+    cache = ProbeCache(probe_func=lambda path: {"error": "moov atom not found"})
+    path = _file(tmp_path, "a.mp4")
+    assert "error" in cache.get(path)
+    assert cache.lookup(path) is None
+
+def test_least_recently_used_is_evicted(monkeypatch, tmp_path):
+    clock = itertools.count()
+    monkeypatch.setattr(probe_cache.time, "time", lambda: next(clock))
+    # Без памяти — проверяем вытеснение на диске
+    cache, calls = _cache(monkeypatch, tmp_path, max_entries=2, memory_entries=0)
+    a, b, c = (_file(tmp_path, n) for n in ("a.mp4", "b.mp4", "c.mp4"))
+    cache.get(a)
+    cache.get(b)
+    assert cache.lookup(a) is not None
+    cache.get(c)
+    assert cache.lookup(b) is None
+    assert cache.lookup(a) is not None and cache.lookup(c) is not None
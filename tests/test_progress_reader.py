@@ -0,0 +1,45 @@
+import os
+from progress_reader import ProgressParser, read_progress
+
+BLOCK = (b"frame=50\nfps=25.00\nbitrate=1024.5kbits/s\ntotal_size=65536\n"
+         b"out_time_us=2000000\nspeed=1.5x\nprogress=continue\n")
+
+def test_event_fields():
+    event, = ProgressParser(min_interval=0).feed(BLOCK)
+    assert event.out_time == 2.0 and event.fps == 25.0 and event.speed == 1.5
+    assert event.total_size == 65536 and event.bitrate == 1024.5
+    assert not event.finished
+
+def test_key_value_split_across_reads():
+    parser = ProgressParser(min_interval=0)
+    events = []
+    for i in range(0, len(BLOCK), 7):
+        events += parser.feed(BLOCK[i:i + 7])
+    assert [e.out_time for e in events] == [2.0]
+    # Неполная строка ждёт продолжения и событий не даёт
+    assert parser.feed(b"out_time_us=30") == []
+    assert parser.feed(b"00000\nprogress=continue\n")[0].out_time == 3.0
+
+def test_na_keeps_last_known_value():
+    parser = ProgressParser(min_interval=0)
+    parser.feed(BLOCK)
+    event, = parser.feed(b"out_time_us=N/A\nspeed=N/A\nprogress=continue\n")
+    assert event.out_time == 2.0 and event.speed == 1.5
+
+def test_events_are_throttled_but_end_is_always_sent():
+    now = [0.0]
+    parser = ProgressParser(min_interval=1.0, clock=lambda: now[0])
+    assert len(parser.feed(BLOCK)) == 1
+    now[0] = 0.5
+    assert parser.feed(BLOCK) == []
+    event, = parser.feed(b"out_time_us=4000000\nprogress=end\n")
+    assert event.finished and event.out_time == 4.0
+
+def test_read_progress_reads_pipe_until_eof():
+    r, w = os.pipe()
+    os.write(w, BLOCK + b"out_time_us=N/A\nprogress=end\n")
+    os.close(w)
+    events = []
+    with os.fdopen(r, "rb") as stream:
+        read_progress(stream, events.append, min_interval=0)
+    assert [(e.out_time, e.finished) for e in events] == [(2.0, False), (2.0, True)]
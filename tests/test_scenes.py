@@ -0,0 +1,26 @@
+from scenes import detect_scenes, detect_silences, propose_segments
+
+def _levels(duration, quiet, window=0.2):
+    """Уровни звука по окнам: -inf (FLOOR) внутри участков quiet, иначе -20 дБ."""
+    levels = []
+    for i in range(int(duration / window)):
+        t = round(i * window, 3)
+        levels.append((t, -120.0 if any(a <= t < b for a, b in quiet) else -20.0))
+    return {"scores": [], "levels": levels, "window": window}
+
+def test_detect_scenes_respects_threshold_and_gap():
+    data = {"scores": [(0.0, 90.0), (5.0, 40.0), (5.4, 50.0), (9.0, 3.0), (12.0, 11.0)]}
+    assert detect_scenes(data, threshold=10, min_gap=1.0) == [5.0, 12.0]
+
+def test_detect_silences():
+    data = _levels(20, [(4.0, 6.0), (10.0, 10.4)])
+    assert detect_silences(data, min_duration=1.0) == [(4.0, 6.0)]
+
+def test_propose_segments_drops_silence_and_splits_scenes():
+    data = _levels(20, [(4.0, 6.0)])
+    data["scores"] = [(12.0, 40.0), (19.5, 40.0)]
+    assert propose_segments(data, 20.0) == [(0.0, 4.25), (5.75, 12.0), (12.0, 20.0)]
+    assert propose_segments(data, 20.0, split_scenes=False) == [(0.0, 4.25), (5.75, 20.0)]
+    assert propose_segments(data, 20.0, drop_silence=False, split_scenes=False) == [(0.0, 20.0)]
+    # Фрагменты короче min_segment не предлагаются
+    assert propose_segments(data, 20.0, min_segment=5.0) == [(5.75, 12.0), (12.0, 20.0)]
@@ -0,0 +1,41 @@
+import threading
+from scheduler import JobScheduler, BatchProgress, plan_concurrency
+
+def test_failing_job_does_not_abort_batch():
+    errors = []
+    def job(job_id, item):
+        if item == "bad":
+            raise FileNotFoundError(item)
+        return item.upper()
+
+    scheduler = JobScheduler(2, threading.Event())
+    results = scheduler.run(job, ["a", "bad", "c"], on_error=lambda job_id, item, exc: errors.append((job_id, item)))
+    assert results == ["A", False, "C"]
+    assert errors == [(1, "bad")]
+
+def test_failing_job_without_callback_is_reported(capsys):
+    def job(job_id, item):
+        raise RuntimeError("boom")
+
+    assert JobScheduler(1, threading.Event()).run(job, [1]) == [False]
+    assert "boom" in capsys.readouterr().err
+
+def test_canceled_batch_returns_none_for_skipped():
+    cancel = threading.Event()
+    def job(job_id, item):
+        cancel.set()
+        return True
+
+    results = JobScheduler(1, cancel).run(job, range(5))
+    assert results[0] is True
+    assert results[-1] is None
+
+def test_plan_concurrency():
+    assert plan_concurrency(cpu_count=16) == (2, 8)
+    assert plan_concurrency(jobs=4, cpu_count=16) == (4, 4)
+    assert plan_concurrency(threads=1, cpu_count=4) == (4, 1)
+
+def test_batch_progress_weights_by_duration():
+    batch = BatchProgress([30, 10])
+    assert batch.update(0, 1.0) == 75
+    assert batch.update(1, 0.5) == 87
@@ -0,0 +1,109 @@
+import json
+import os
+import queue
+import shutil
+import subprocess
+import threading
+import pytest
+from smartcut import parse_keyframes, plan_smart_cut
+
+FFMPEG = shutil.which("ffmpeg")
+FFPROBE = shutil.which("ffprobe")
+
+def test_keyframes_are_shifted_by_start_time():
+    text = "1.400000,K__\n1.440000,___\n3.400000,K__\nN/A,K__\n"
+    assert parse_keyframes(text) == [1.4, 3.4]
+    assert parse_keyframes(text, offset=1.4) == [0.0, 2.0]
+
+def test_plan_smart_cut():
+    keyframes = [0.0, 2.0, 4.0, 6.0, 8.0]
+    assert plan_smart_cut(keyframes, 1.0, 7.0) == [("encode", 1.0, 2.0), ("copy", 2.0, 6.0), ("encode", 6.0, 7.0)]
+    # Границы на ключевых кадрах — перекодировать нечего
+    assert plan_smart_cut(keyframes, 2.0, 6.0) == [("copy", 2.0, 6.0)]
+    assert plan_smart_cut(keyframes, 2.0, 3.5) == [("encode", 2.0, 3.5)]
+    # Ключевых кадров внутри нет — фрагмент перекодируется целиком
+    assert plan_smart_cut(keyframes, 8.5, 9.5) == [("encode", 8.5, 9.5)]
+
+@pytest.mark.skipif(not (FFMPEG and FFPROBE), reason="нужны ffmpeg и ffprobe")
+def test_smart_cut_output_decodes(tmp_path, monkeypatch):
+    import workers
+    monkeypatch.setenv("NEAT_FFMPEG_CACHE_DIR", str(tmp_path / "cache"))
+    src = tmp_path / "src.mp4"
+    # Ненулевой start_time и другие настройки x264, чем у перекодированных краёв
+    subprocess.run([FFMPEG, "-v", "error", "-f", "lavfi", "-i", "testsrc2=size=320x240:rate=25:duration=6",
+                    "-f", "lavfi", "-i", "sine=duration=6", "-c:v", "libx264", "-preset", "ultrafast",
+                    "-g", "25", "-c:a", "aac", "-output_ts_offset", "10", str(src)], check=True)
+    q = queue.Queue()
+    workers.cut_worker([str(src)], "00:00:00.500", "00:00:04.300", "_cut", q, threading.Event(),
+                       smart=True, skip_done=False)
+    out = tmp_path / "src_cut.mp4"
+    decoded = subprocess.run([FFMPEG, "-v", "error", "-xerror", "-i", str(out), "-f", "null", "-"],
+                             capture_output=True, text=True)
+    assert decoded.returncode == 0, decoded.stderr
+    info = json.loads(subprocess.check_output([FFPROBE, "-v", "error", "-show_format", "-of", "json", str(out)]))
+    assert abs(float(info["format"]["duration"]) - 3.8) < 0.15
+
+def _parts(tmp_path, n=3):
+    parts = [tmp_path / f"src_cut.partial.part{i}.mp4" for i in range(n)]
+    for p in parts:
+        p.write_bytes(b"part")
+    return [str(p) for p in parts]
+
+def test_failed_concat_removes_parts(tmp_path, monkeypatch):
+    import workers
+    monkeypatch.setattr(workers, "_run_ffmpeg", lambda cmd, scheduler, on_progress, cwd=None: (1, "concat failed"))
+    parts = _parts(tmp_path)
+    out = str(tmp_path / "src_cut.partial.mp4")
+    assert workers._concat_parts("ffmpeg", parts, out, None, "h264_mp4toannexb") == (1, "concat failed")
+    assert os.listdir(tmp_path) == []
+
+class _FakeFfmpeg:
+    """Записывает команды и создаёт выходной файл; list-файл читается, пока он ещё есть."""
+    def __init__(self, fail_on=None):
+        self.cmds, self.lists, self.fail_on = [], [], fail_on
+
+    def __call__(self, cmd, scheduler, on_progress, cwd=None):
+        self.cmds.append(cmd)
+        if "concat" in cmd:
+            with open(cmd[cmd.index("-i") + 1], encoding="utf-8") as f:
+                self.lists.append(f.read())
+        if len(self.cmds) == self.fail_on:
+            return 1, "failed"
+        with open(cmd[-1], "wb") as f:
+            f.write(b"out")
+        return 0, ""
+
+def test_concat_parts_copy(tmp_path, monkeypatch):
+    import workers
+    fake = _FakeFfmpeg()
+    monkeypatch.setattr(workers, "_run_ffmpeg", fake)
+    parts = _parts(tmp_path, 2)
+    out = str(tmp_path / "src_cut.partial.mp4")
+    assert workers._concat_parts("ffmpeg", parts, out, None) == (0, "")
+    assert fake.cmds == [["ffmpeg", "-hide_banner", "-y", "-f", "concat", "-safe", "0", "-i", out + ".concat.txt",
+                          "-c", "copy", "-map_metadata", "-1", out]]
+    assert fake.lists == [workers.build_concat_list(parts)]
+    assert os.listdir(tmp_path) == ["src_cut.partial.mp4"]
+
+def test_concat_parts_annexb(tmp_path, monkeypatch):
+    import workers
+    fake = _FakeFfmpeg()
+    monkeypatch.setattr(workers, "_run_ffmpeg", fake)
+    parts = _parts(tmp_path, 2)
+    out = str(tmp_path / "src_cut.partial.mp4")
+    assert workers._concat_parts("ffmpeg", parts, out, None, "hevc_mp4toannexb") == (0, "")
+    assert fake.cmds[:2] == [["ffmpeg", "-hide_banner", "-y", "-i", p, "-c", "copy",
+                              "-bsf:v", "hevc_mp4toannexb", "-f", "mpegts", p + ".ts"] for p in parts]
+    assert fake.cmds[2][-1] == out and len(fake.cmds) == 3
+    assert fake.lists == [workers.build_concat_list([p + ".ts" for p in parts])]
+    assert os.listdir(tmp_path) == ["src_cut.partial.mp4"]
+
+def test_concat_parts_stops_when_remux_fails(tmp_path, monkeypatch):
+    import workers
+    fake = _FakeFfmpeg(fail_on=2)
+    monkeypatch.setattr(workers, "_run_ffmpeg", fake)
+    parts = _parts(tmp_path, 3)
+    out = str(tmp_path / "src_cut.partial.mp4")
+    assert workers._concat_parts("ffmpeg", parts, out, None, "h264_mp4toannexb") == (1, "failed")
+    assert len(fake.cmds) == 2 and not fake.lists
+    assert os.listdir(tmp_path) == []
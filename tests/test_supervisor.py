@@ -0,0 +1,39 @@
+import os
+import signal
+import sys
+import threading
+import pytest
+import supervisor
+from metrics import wait_process
+
+pytestmark = pytest.mark.skipif(os.name == "nt", reason="группы процессов и waitpid — только POSIX")
+
+def _record_killpg(monkeypatch, proc):
+    signals = []
+    real_killpg = os.killpg
+    def killpg(pid, sig):
+        # Сигнал допустим, только пока процесс не забран
+        assert proc.returncode is None
+        signals.append(sig)
+        real_killpg(pid, sig)
+    monkeypatch.setattr(os, "killpg", killpg)
+    return signals
+
+def test_stop_does_not_signal_reaped_process(monkeypatch):
+    proc = supervisor.spawn([sys.executable, "-c", "pass"])
+    assert wait_process(proc)[0] == 0
+    signals = _record_killpg(monkeypatch, proc)
+    supervisor.stop(proc, grace=0.1)
+    assert signals == []
+    assert proc not in supervisor.running()
+
+def test_stop_escalates_while_waiter_reaps(monkeypatch):
+    proc = supervisor.spawn([sys.executable, "-c", "import time; time.sleep(30)"])
+    signals = _record_killpg(monkeypatch, proc)
+    result = []
+    waiter = threading.Thread(target=lambda: result.append(wait_process(proc)))
+    waiter.start()
+    supervisor.stop(proc, grace=0.2)
+    waiter.join(5)
+    assert result and result[0][0] == -signal.SIGTERM
+    assert signals[0] == signal.SIGTERM
@@ -0,0 +1,58 @@
+import os
+import sys
+import stat
+import pytest
+import thumbnails
+import tools
+
+# Вместо ffmpeg — скрипт, который печатает строки showinfo и пишет PNG по шаблону из последнего аргумента
+FAKE_FFMPEG = f"""#!{sys.executable}
+import sys
+out = sys.argv[-1]
+for i in range(3):
+    sys.stderr.write(f"[Parsed_showinfo_2 @ 0x1] n:   {{i}} pts:  {{i}} pts_time:{{10.0 + i * 2.5:.3f}}  duration: 1\\n")
+    sys.stderr.flush()
+    with open(out % (i + 1), "wb") as f:
+        f.write(b"png%d" % i)
+"""
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path, monkeypatch):
+    exe = tmp_path / "ffmpeg"
+    exe.write_text(FAKE_FFMPEG)
+    exe.chmod(exe.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setenv(tools.TOOL_ENV["ffmpeg"], str(exe))
+    monkeypatch.setenv("NEAT_FFMPEG_CACHE_DIR", str(tmp_path / "cache"))
+    tools.find_tool.cache_clear()
+    yield exe
+    tools.find_tool.cache_clear()
+
+@pytest.mark.skipif(os.name == "nt", reason="фальшивый ffmpeg — скрипт с shebang")
+def test_filmstrip_is_built_aside_and_cached(fake_ffmpeg, tmp_path):
+    src = tmp_path / "in.mp4"
+    src.write_bytes(b"video")
+    seen = []
+    def on_thumb(t, png):
+        with open(png, "rb") as f:
+            seen.append((t, f.read()))
+
+    thumbs = thumbnails.filmstrip(str(src), on_thumb, duration=5.0, start_time=10.0)
+    # Время — от начала файла, как у -ss
+    assert seen == [(0.0, b"png0"), (2.5, b"png1"), (5.0, b"png2")]
+    folder = thumbnails.cache_folder(str(src))
+    assert [os.path.dirname(png) for _, png in thumbs] == [folder] * 3
+    assert sorted(os.listdir(thumbnails.cache_root())) == [os.path.basename(folder)]
+
+    # Готовая лента берётся из кэша, ffmpeg не запускается
+    fake_ffmpeg.write_text("#!/bin/sh\nexit 1\n")
+    seen.clear()
+    assert thumbnails.filmstrip(str(src), on_thumb, start_time=10.0) == thumbs
+    assert [t for t, _ in seen] == [0.0, 2.5, 5.0]
+
+@pytest.mark.skipif(os.name == "nt", reason="фальшивый ffmpeg — скрипт с shebang")
+def test_failed_build_leaves_no_folder(fake_ffmpeg, tmp_path):
+    fake_ffmpeg.write_text("#!/bin/sh\nexit 1\n")
+    src = tmp_path / "in.mp4"
+    src.write_bytes(b"video")
+    assert thumbnails.filmstrip(str(src), lambda t, png: None) is None
+    assert os.listdir(thumbnails.cache_root()) == []
@@ -0,0 +1,15 @@
+import os
+import tools
+
+def test_bundled_dir_is_prepended_to_path_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "bundled_dir", lambda: tmp_path)
+    monkeypatch.setenv("PATH", os.pathsep.join(["/usr/bin", "/bin"]))
+    tools.add_bundled_to_path()
+    tools.add_bundled_to_path()
+    assert os.environ["PATH"].split(os.pathsep) == [str(tmp_path), "/usr/bin", "/bin"]
+
+def test_missing_bundled_dir_leaves_path_alone(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "bundled_dir", lambda: tmp_path / "nope")
+    monkeypatch.setenv("PATH", "/usr/bin")
+    tools.add_bundled_to_path()
+    assert os.environ["PATH"] == "/usr/bin"
@@ -0,0 +1,17 @@
+from utils import parse_segments, hms_to_seconds, seconds_to_hms
+
+def test_parse_segments():
+    text = """start,end
+    # вступление
+    00:00:05 - 00:01:00
+    1:10;1:20.5
+    00:02:00\t00:03:00   # хвост
+    00:04:00—00:05:00
+    только одно 00:06:00
+    """
+    assert parse_segments(text) == [("00:00:05", "00:01:00"), ("1:10", "1:20.5"),
+                                    ("00:02:00", "00:03:00"), ("00:04:00", "00:05:00")]
+
+def test_hms_round_trip():
+    assert hms_to_seconds("01:02:03.5") == 3723.5
+    assert hms_to_seconds(seconds_to_hms(3723)) == 3723
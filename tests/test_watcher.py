@@ -0,0 +1,85 @@
+import queue
+import threading
+import time
+import watcher
+
+SETTLE = 0.3
+INTERVAL = 0.02
+
+class _Watch:
+    """watch_worker в отдельном потоке с короткими интервалами."""
+    def __init__(self, rules):
+        self.cancel = threading.Event()
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=watcher.watch_worker, args=(rules, self.queue, self.cancel),
+                                       kwargs={"interval": INTERVAL, "settle": SETTLE}, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self.cancel.set()
+        self.thread.join(timeout=5)
+
+def _wait_for(predicate, timeout=5):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(INTERVAL)
+    return False
+
+def test_watch_processes_settled_files_once(tmp_path, monkeypatch):
+    calls = []
+    def fake_run_stage(stage, path, queue, cancel_event, job_id, on_fraction, task="dl"):
+        calls.append((path, time.monotonic()))
+        outname = watcher.stage_output_path(stage, path)
+        with open(outname, "wb") as f:
+            f.write(b"result")
+        return outname, None
+    monkeypatch.setattr(watcher, "run_stage", fake_run_stage)
+
+    # Недописанные и служебные файлы, а также чужие расширения не берутся
+    (tmp_path / "b.partial.mp4").write_bytes(b"x" * 10)
+    (tmp_path / ".hidden.mp4").write_bytes(b"x" * 10)
+    (tmp_path / "notes.txt").write_bytes(b"x" * 10)
+    rule = watcher.make_rule(str(tmp_path), [{"type": "cut", "start": "00:00:00", "end": "00:00:05"}])
+    watch = _Watch([rule])
+    try:
+        # Пока файл растёт, он не обрабатывается
+        source = tmp_path / "a.mp4"
+        for _ in range(5):
+            with open(source, "ab") as f:
+                f.write(b"x" * 1000)
+            last_write = time.monotonic()
+            time.sleep(SETTLE / 3)
+            assert not calls
+        assert _wait_for(lambda: calls)
+        assert calls[0][1] - last_write >= SETTLE
+        # Результат (a_cut.mp4) и уже обработанный файл на следующих опросах не берутся
+        time.sleep(SETTLE * 3)
+        assert [path for path, _ in calls] == [str(source)]
+    finally:
+        watch.stop()
+
+    # После перезапуска обработанное помнится по файлу состояния
+    watch = _Watch([rule])
+    try:
+        time.sleep(SETTLE * 3)
+    finally:
+        watch.stop()
+    assert len(calls) == 1
+
+def test_failed_stage_is_recorded_as_failed(tmp_path, failing_ffmpeg):
+    folder = tmp_path / "in"
+    folder.mkdir()
+    (folder / "a.mp4").write_bytes(b"x" * 100)
+    rule = watcher.make_rule(str(folder), [{"type": "cut", "start": "00:00:00", "end": "00:00:05"}])
+    watch = _Watch([rule])
+    try:
+        assert _wait_for(lambda: any(m[1] == "job_done" for m in list(watch.queue.queue)))
+    finally:
+        watch.stop()
+    messages = list(watch.queue.queue)
+    assert ("watch", "job_done", (0, False)) in messages
+    entry = watcher.WatchState(str(folder)).entries["a.mp4"]
+    assert entry["ok"] is False
+    assert not (folder / "a_cut.mp4").exists()
@@ -0,0 +1,106 @@
+import os
+import queue
+import threading
+import workers
+
+def _messages(q):
+    items = []
+    while not q.empty():
+        items.append(q.get())
+    return items
+
+def test_missing_input_is_reported_and_batch_finishes(tmp_path, monkeypatch):
+    monkeypatch.setattr(workers, "_resolve_ffmpeg", lambda task, queue: "ffmpeg")
+    q = queue.Queue()
+    workers.cut_worker([str(tmp_path / "missing.mp4")], "00:00:00", "00:00:05", "_cut", q,
+                       threading.Event(), skip_done=False)
+    messages = _messages(q)
+    types = [(task, msg_type) for task, msg_type, _ in messages]
+    # Ошибка одного файла — не ошибка всей пачки
+    assert ("cut", "error") not in types
+    assert ("cut", "job_done", (0, False)) in messages
+    assert any(t == "status" and "missing.mp4" in d for _, t, d in messages)
+    assert ("cut", "update_index") in types
+    assert messages[-1] == ("cut", "done", 1)
+
+def test_analysis_passes_absolute_input_path(tmp_path, monkeypatch):
+    monkeypatch.setenv("NEAT_FFMPEG_CACHE_DIR", str(tmp_path / "cache"))
+    monkeypatch.setattr(workers, "_resolve_ffmpeg", lambda task, queue: "ffmpeg")
+    calls = []
+    def fake_run(cmd, scheduler, on_progress, cwd=None):
+        calls.append((cmd, cwd))
+        return 0, ""
+    monkeypatch.setattr(workers, "_run_ffmpeg", fake_run)
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.mp4").write_bytes(b"x")
+    probes = {"a.mp4": {"format": {"duration": "10"}, "streams": [{"codec_type": "audio"}]}}
+    q = queue.Queue()
+    workers.analyze_worker(["a.mp4"], q, threading.Event(), probes=probes)
+    (cmd, cwd), = calls
+    assert str(tmp_path / "a.mp4") in cmd
+    assert cwd != str(tmp_path)
+    assert ("cut", "analysis", ("a.mp4", [(0.0, 10.0)])) in _messages(q)
+
+def test_failed_stage_is_reported(tmp_path, failing_ffmpeg):
+    src = tmp_path / "src.mp4"
+    src.write_bytes(b"video")
+    stages = [{"type": "cut", "start": "00:00:00", "end": "00:00:05"},
+              {"type": "convert", "settings": {"vcodec": "libx264"}}]
+    for stage in stages:
+        q = queue.Queue()
+        outname, error = workers.run_stage(stage, str(src), q, threading.Event(), 0, lambda frac: None)
+        assert outname is None
+        assert "Conversion failed!" in error
+        assert not (tmp_path / os.path.basename(workers.stage_output_path(stage, str(src)))).exists()
+
+def test_stage_failure_is_not_reset_by_done():
+    sq = workers._StageQueue(queue.Queue(), 0, "Обрезка", lambda frac: None)
+    for item in [("cut", "status", "Ошибка в src.mp4: -11"), ("cut", "job_done", (0, False)), ("cut", "done", None)]:
+        sq.put(item)
+    assert sq.ok is False
+    assert sq.error == "Ошибка в src.mp4: -11"
+
+def _two_pass(monkeypatch, sizes):
+    """Подменяет ffmpeg: второй проход пишет файл очередного размера из sizes."""
+    calls = []
+    def fake_run(cmd, scheduler, on_progress, cwd=None):
+        calls.append(cmd)
+        passlog = cmd[cmd.index("-passlogfile") + 1]
+        if cmd[cmd.index("-pass") + 1] == "1":
+            with open(passlog + "-0.log", "w") as f:
+                f.write("stats")
+        else:
+            assert os.path.exists(passlog + "-0.log")
+            with open(cmd[-1], "wb") as f:
+                f.write(b"x" * sizes.pop(0))
+        return 0, ""
+    monkeypatch.setattr(workers, "_run_ffmpeg", fake_run)
+    return calls
+
+def _encode(tmp_path, target_bytes, dur=8.0):
+    return workers._encode_to_size("ffmpeg", "in.mov", str(tmp_path / "out.mp4"), {"abitrate": "128k"},
+                                   None, dur, target_bytes, None, None, threading.Event(), lambda ev: None)
+
+def test_encode_to_size_bitrate_and_cleanup(tmp_path, monkeypatch):
+    calls = _two_pass(monkeypatch, [900_000])
+    assert _encode(tmp_path, 1_000_000) == (0, "")
+    first, second = calls
+    expected = workers.target_video_bitrate(1_000_000, 8.0, 128_000)
+    assert first[first.index("-b:v") + 1] == second[second.index("-b:v") + 1] == str(expected)
+    assert first[-4:] == ["-an", "-f", "null", os.devnull]
+    passlog = first[first.index("-passlogfile") + 1]
+    assert passlog == second[second.index("-passlogfile") + 1]
+    assert not os.path.exists(os.path.dirname(passlog))
+
+def test_encode_to_size_retries_smaller_second_pass(tmp_path, monkeypatch):
+    calls = _two_pass(monkeypatch, [1_250_000, 950_000])
+    assert _encode(tmp_path, 1_000_000) == (0, "")
+    assert [c[c.index("-pass") + 1] for c in calls] == ["1", "2", "2"]
+    first, retry = (int(c[c.index("-b:v") + 1]) for c in calls[1:])
+    assert retry == int(first * 1_000_000 / 1_250_000 * 0.97)
+
+def test_encode_to_size_rejects_budget_below_audio(tmp_path, monkeypatch):
+    calls = _two_pass(monkeypatch, [])
+    code, err = _encode(tmp_path, 100_000)
+    assert code != 0 and "слишком мал" in err
+    assert calls == []
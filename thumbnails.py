@@ -0,0 +1,142 @@
+"""Лента миниатюр ключевых кадров для выбора точек обрезки.
+
+Один проход ffmpeg с -skip_frame nokey: декодируются только ключевые кадры, и то
+не все — не чаще раза в duration / MAX_THUMBS секунд, сразу в маленьком размере.
+Время каждого кадра берётся из showinfo. Миниатюры — PNG (Tk читает их сам, без Pillow)
+в папке кэша по отпечатку файла. Лента строится во временной папке рядом и целиком
+переименовывается в папку кэша, когда index.json уже записан: другой поток или процесс,
+строящий ту же ленту, никогда не видит и не удаляет чужие недописанные файлы.
+"""
+import os
+import re
+import json
+import shutil
+import hashlib
+import tempfile
+import subprocess
+import supervisor
+import tools
+from probe_cache import default_cache_dir, file_fingerprint
+
+THUMB_HEIGHT = 72
+MAX_THUMBS = 120
+INDEX_NAME = "index.json"
+# Сколько лент хранить; старые (по времени использования) удаляются
+MAX_CACHED = 200
+SHOWINFO_RE = re.compile(r"\bn:\s*(\d+)\s+pts:\s*\S+\s+pts_time:\s*([-\d.]+)")
+
+def cache_root():
+    return os.path.join(default_cache_dir(), "thumbs")
+
+def cache_folder(path):
+    """Папка ленты файла: меняется вместе с размером/mtime файла и параметрами ленты."""
+    key = "|".join(map(str, file_fingerprint(path) + (THUMB_HEIGHT, MAX_THUMBS)))
+    return os.path.join(cache_root(), hashlib.sha1(key.encode("utf-8")).hexdigest())
+
+def build_filmstrip_cmd(ffmpeg_exe, path, outdir, duration=None):
+    """Команда ffmpeg: ключевые кадры не чаще duration / MAX_THUMBS, высотой THUMB_HEIGHT, в outdir/00001.png...
+
+    -copyts: showinfo печатает pts_time в шкале файла, от неё отнимается его start_time."""
+    filters = []
+    if duration and duration > 0:
+        filters.append(f"select='isnan(prev_selected_t)+gte(t-prev_selected_t,{duration / MAX_THUMBS:.3f})'")
+    filters += [f"scale=-2:{THUMB_HEIGHT}", "showinfo"]
+    return [ffmpeg_exe, "-hide_banner", "-nostats", "-loglevel", "info", "-y", "-copyts",
+            "-skip_frame", "nokey", "-i", path, "-map", "0:v:0", "-an", "-sn", "-dn",
+            "-vf", ",".join(filters), "-fps_mode", "passthrough", "-f", "image2",
+            os.path.join(outdir, "%05d.png")]
+
+def _load_index(folder):
+    try:
+        with open(os.path.join(folder, INDEX_NAME), encoding="utf-8") as f:
+            items = json.load(f)
+    except (OSError, ValueError):
+        return None
+    thumbs = [(t, os.path.join(folder, name)) for t, name in items]
+    if not all(os.path.exists(png) for _, png in thumbs):
+        return None
+    os.utime(folder)  # для вытеснения: недавно открытые ленты не удаляются
+    return thumbs
+
+def _prune():
+    root = cache_root()
+    try:
+        folders = [e for e in os.scandir(root) if e.is_dir()]
+    except OSError:
+        return
+    folders.sort(key=lambda e: e.stat().st_mtime, reverse=True)
+    for entry in folders[MAX_CACHED:]:
+        shutil.rmtree(entry.path, ignore_errors=True)
+
+def filmstrip(path, on_thumb, cancel_event=None, duration=None, start_time=0.0):
+    """Строит (или берёт из кэша) ленту файла; on_thumb(время, путь к png) вызывается
+    для каждой миниатюры по мере готовности — из этого же потока. Пока лента строится,
+    png лежит во временной папке: читать его нужно внутри on_thumb.
+    Время — от start_time файла (format.start_time), как у -ss при обрезке.
+    Возвращает [(время, путь)] или None, если прервано или ffmpeg завершился с ошибкой."""
+    folder = cache_folder(path)
+    cached = _load_index(folder)
+    if cached is not None:
+        for t, png in cached:
+            on_thumb(t, png)
+        return cached
+
+    os.makedirs(cache_root(), exist_ok=True)
+    workdir = tempfile.mkdtemp(prefix=os.path.basename(folder) + ".", suffix=".tmp", dir=cache_root())
+    try:
+        thumbs = _build(path, workdir, on_thumb, cancel_event, duration, start_time)
+        if thumbs is None:
+            return None
+        with open(os.path.join(workdir, INDEX_NAME), "w", encoding="utf-8") as f:
+            json.dump([(t, os.path.basename(png)) for t, png in thumbs], f)
+        if not _publish(workdir, folder):
+            return _load_index(folder)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    _prune()
+    return [(t, os.path.join(folder, os.path.basename(png))) for t, png in thumbs]
+
+def _publish(workdir, folder):
+    """Переименовывает готовую ленту в папку кэша. False — её уже опубликовал другой."""
+    for _ in range(2):
+        try:
+            os.replace(workdir, folder)
+            return True
+        except OSError:
+            if _load_index(folder) is not None:
+                return False
+            # Папка без index.json — остаток старой версии, где лента строилась на месте
+            shutil.rmtree(folder, ignore_errors=True)
+    return False
+
+def _build(path, outdir, on_thumb, cancel_event, duration, start_time):
+    png_path = lambda i: os.path.join(outdir, f"{i + 1:05d}.png")
+    proc = supervisor.spawn(build_filmstrip_cmd(tools.ffmpeg_exe(), path, outdir, duration),
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    times, thumbs = [], []
+
+    def emit(ready):
+        # Кадр i дописан, когда муксер уже создал следующий файл (или процесс завершился)
+        while len(thumbs) < len(times) and (ready or os.path.exists(png_path(len(thumbs) + 1))):
+            i = len(thumbs)
+            if not os.path.exists(png_path(i)):
+                break
+            thumbs.append((times[i], png_path(i)))
+            on_thumb(*thumbs[-1])
+
+    try:
+        for line in iter(proc.stderr.readline, b""):
+            if cancel_event is not None and cancel_event.is_set():
+                supervisor.stop(proc)
+                return None
+            match = SHOWINFO_RE.search(line.decode("utf-8", "replace"))
+            if match:
+                times.append(round(float(match.group(2)) - start_time, 3))
+                emit(False)
+        code, _ = supervisor.reap(proc)
+        if code != 0 or (cancel_event is not None and cancel_event.is_set()):
+            return None
+        emit(True)
+    finally:
+        supervisor.release(proc)
+    return thumbs
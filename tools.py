@@ -0,0 +1,122 @@
+"""Поиск ffmpeg/ffprobe — один раз на процесс.
+
+Порядок: переменная NEAT_FFMPEG_FFMPEG / NEAT_FFMPEG_FFPROBE (путь к файлу),
+папка NEAT_FFMPEG_BIN, папка ffmpeg/bin рядом с программой, затем PATH.
+Найденный путь кэшируется, так что запуск задачи не ходит по диску.
+"""
+import os
+import re
+import sys
+import shutil
+import subprocess
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional
+from utils import STARTUPINFO
+
+TOOL_ENV = {"ffmpeg": "NEAT_FFMPEG_FFMPEG", "ffprobe": "NEAT_FFMPEG_FFPROBE"}
+BIN_DIR_ENV = "NEAT_FFMPEG_BIN"
+# -progress с out_time_us и -fps_mode есть начиная с 5.0
+MIN_VERSION = (5, 0)
+
+class ToolError(RuntimeError):
+    pass
+
+def app_dir():
+    """Папка программы: рядом с .exe в собранной версии, иначе папка проекта."""
+    if getattr(sys, 'frozen', False):
+        return Path(sys.executable).parent
+    return Path(__file__).parent
+
+def bundled_dir():
+    return app_dir() / "ffmpeg" / "bin"
+
+def add_bundled_to_path():
+    """Ставит ffmpeg/bin в начало PATH: там же лежит deno.exe, который yt-dlp ищет
+    в PATH для JS-проверок YouTube. ffmpeg/ffprobe от этого не зависят — см. find_tool."""
+    folder = bundled_dir()
+    if not folder.is_dir():
+        return
+    bin_dir = str(folder.absolute())
+    paths = os.environ.get("PATH", "").split(os.pathsep)
+    if bin_dir not in paths:
+        os.environ["PATH"] = os.pathsep.join([bin_dir] + [p for p in paths if p])
+
+def _in_dir(folder, name):
+    exe = name + ".exe" if os.name == "nt" else name
+    path = Path(folder) / exe
+    return str(path.absolute()) if path.is_file() else None
+
+@lru_cache(maxsize=None)
+def find_tool(name):
+    """Абсолютный путь к ffmpeg или ffprobe, либо None."""
+    override = os.environ.get(TOOL_ENV[name])
+    if override:
+        return str(Path(override).absolute()) if Path(override).is_file() else None
+    for folder in (os.environ.get(BIN_DIR_ENV), bundled_dir()):
+        if folder:
+            found = _in_dir(folder, name)
+            if found:
+                return found
+    found = shutil.which(name)
+    return os.path.abspath(found) if found else None
+
+def _require(name):
+    path = find_tool(name)
+    if not path:
+        raise ToolError(f"{name} не найден: положите его в {bundled_dir()}, добавьте в PATH "
+                        f"или укажите путь в {TOOL_ENV[name]}")
+    return path
+
+def ffmpeg_exe():
+    return _require("ffmpeg")
+
+def ffprobe_exe():
+    return _require("ffprobe")
+
+def ffmpeg_dir():
+    """Папка с ffmpeg (для yt-dlp: ffmpeg_location) или None."""
+    path = find_tool("ffmpeg")
+    return os.path.dirname(path) if path else None
+
+def parse_version(text):
+    """(major, minor) из `ffmpeg -version`; None для сборок из git (N-12345-g...)."""
+    match = re.search(r"version n?(\d+)\.(\d+)", text)
+    return (int(match.group(1)), int(match.group(2))) if match else None
+
+class ToolInfo(NamedTuple):
+    ffmpeg: Optional[str]
+    ffprobe: Optional[str]
+    version: Optional[str]        # первая строка `ffmpeg -version`
+    encoders: frozenset
+    hwaccels: tuple
+    problems: tuple               # что не так, по-русски; пусто — всё в порядке
+
+def _run(cmd):
+    return subprocess.run(cmd, capture_output=True, text=True, errors="replace",
+                          startupinfo=STARTUPINFO, timeout=15).stdout
+
+@lru_cache(maxsize=1)
+def tool_info():
+    """Проверка при старте: пути, версия, энкодеры и аппаратные ускорители ffmpeg."""
+    from command_builder import available_encoders
+    ffmpeg, ffprobe = find_tool("ffmpeg"), find_tool("ffprobe")
+    problems, version, encoders, hwaccels = [], None, frozenset(), ()
+    if not ffmpeg:
+        problems.append(f"ffmpeg не найден (искали в {TOOL_ENV['ffmpeg']}, {BIN_DIR_ENV}, {bundled_dir()} и PATH)")
+    if not ffprobe:
+        problems.append("ffprobe не найден — информация о файлах недоступна")
+    if ffmpeg:
+        try:
+            version = (_run([ffmpeg, "-hide_banner", "-version"]).splitlines() or [None])[0]
+            lines = _run([ffmpeg, "-hide_banner", "-hwaccels"]).splitlines()
+            hwaccels = tuple(l.strip() for l in lines[1:] if l.strip())
+        except (OSError, subprocess.SubprocessError) as e:
+            problems.append(f"ffmpeg не запускается: {e}")
+        encoders = available_encoders(ffmpeg) or frozenset()
+        parsed = parse_version(version or "")
+        if parsed and parsed < MIN_VERSION:
+            problems.append(f"ffmpeg {parsed[0]}.{parsed[1]} устарел, нужна версия {MIN_VERSION[0]}.{MIN_VERSION[1]} или новее")
+        if version and not encoders:
+            problems.append("не удалось получить список энкодеров ffmpeg")
+    return ToolInfo(ffmpeg, ffprobe, version, frozenset(encoders), hwaccels, tuple(problems))
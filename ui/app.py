@@ -1,49 +1,106 @@
+import threading
 import tkinter as tk
-from tkinter import ttk
-import queue
-from ui.tab_cut import CutTab
-from ui.tab_convert import ConvertTab
-from ui.tab_download import DownloadTab
+from tkinter import ttk, messagebox
+from ui.progress_bus import ProgressBus
+from metrics import with_metrics_log
+import supervisor
+
+# Сколько ждать завершения потоков воркеров при закрытии окна (после остановки ffmpeg)
+SHUTDOWN_JOIN_TIMEOUT = 5.0
+
+# Модули вкладок импортируются при первом открытии, а сами вкладки подгружают
+# workers (и вместе с ним yt_dlp) только при запуске задачи. Импорт внутри функций,
+# а не через importlib, чтобы PyInstaller видел их при сборке
+def _download_tab():
+    from ui.tab_download import DownloadTab
+    return DownloadTab
+
+def _cut_tab():
+    from ui.tab_cut import CutTab
+    return CutTab
+
+def _convert_tab():
+    from ui.tab_convert import ConvertTab
+    return ConvertTab
+
+# (task_type, заголовок, загрузчик класса вкладки)
+TABS = [
+    ("dl", "Скачивание", _download_tab),
+    ("cut", "Обрезка", _cut_tab),
+    ("conv", "Конвертация", _convert_tab),
+]
 
 class FFmpegApp(tk.Tk):
     def __init__(self):
         super().__init__()
         self.title("Neat FFmpeg")
         self.geometry("900x650")
-        
-        # Единая очередь сообщений
-        self.queue = queue.Queue()
+
+        # Единая шина сообщений от воркеров (интерфейс как у queue.Queue: put).
+        # С переменной NEAT_FFMPEG_METRICS итоги задач дополнительно пишутся в JSON-lines файл
+        self.bus = ProgressBus(self, self.dispatch)
+        self.queue = with_metrics_log(self.bus)
+        self.protocol("WM_DELETE_WINDOW", self._on_close)
 
         self.notebook = ttk.Notebook(self)
         self.notebook.pack(fill="both", expand=True)
 
-        # Инициализация вкладок
-        self.tab_cut = CutTab(self.notebook, self.queue)
-        self.tab_conv = ConvertTab(self.notebook, self.queue)
-        self.tab_download = DownloadTab(self.notebook, self.queue)
-
-        self.notebook.add(self.tab_download, text="Скачивание")
-        self.notebook.add(self.tab_cut, text="Обрезка")
-        self.notebook.add(self.tab_conv, text="Конвертация")
-
-        # Запуск цикла чтения очереди
-        self.after(100, self.process_queue)
-
-    def process_queue(self):
-        try:
-            while True:
-                # task_type: "cut" или "conv"
-                # msg_type: "progress", "error", "done"...
-                task_type, msg_type, data = self.queue.get_nowait()
-                
-                if task_type == "cut":
-                    self.tab_cut.handle_message(msg_type, data)
-                elif task_type == "conv":
-                    self.tab_conv.handle_message(msg_type, data)
-                elif task_type == "dl":
-                    self.tab_download.handle_message(msg_type, data)
-                    
-        except queue.Empty:
-            pass
-        
-        self.after(100, self.process_queue)
\ No newline at end of file
+        # Пока вкладку не открыли, в блокноте лежит пустая рамка-заглушка
+        self.tabs = {}
+        self._placeholders = {}
+        for task_type, title, _ in TABS:
+            frame = ttk.Frame(self.notebook)
+            self.notebook.add(frame, text=title)
+            self._placeholders[task_type] = frame
+        self.notebook.bind("<<NotebookTabChanged>>", self._on_tab_changed)
+        self._ensure_tab(TABS[0][0])
+
+        # Проверка ffmpeg (запуск -version, -encoders, -hwaccels) не задерживает появление окна
+        threading.Thread(target=self._check_tools, daemon=True).start()
+
+    def _check_tools(self):
+        import tools
+        self.queue.put(("app", "tools", tools.tool_info()))
+
+    def _on_tab_changed(self, event):
+        idx = self.notebook.index(self.notebook.select())
+        self._ensure_tab(TABS[idx][0])
+
+    def _ensure_tab(self, task_type):
+        if task_type in self.tabs:
+            return self.tabs[task_type]
+        tab_cls = next(loader for t, _, loader in TABS if t == task_type)()
+        tab = tab_cls(self._placeholders[task_type], self.queue)
+        tab.pack(fill="both", expand=True)
+        self.tabs[task_type] = tab
+        return tab
+
+    def _on_close(self):
+        """Закрытие окна: отменяем задачи, останавливаем ffmpeg, удаляем недописанные
+        файлы и ждём потоки воркеров — чтобы после выхода не осталось процессов."""
+        workers = []
+        for tab in self.tabs.values():
+            tab.cancel_event.set()
+            worker = getattr(tab, "worker", None)
+            if worker is not None and worker.is_alive():
+                workers.append(worker)
+        if workers or supervisor.running():
+            self.title("Neat FFmpeg — остановка задач...")
+            self.update_idletasks()
+        self.bus.close()
+        supervisor.shutdown()
+        for worker in workers:
+            worker.join(SHUTDOWN_JOIN_TIMEOUT)
+        self.destroy()
+
+    def dispatch(self, task_type, msg_type, data):
+        # task_type: "cut", "conv" или "dl"
+        # msg_type: "progress", "error", "done"...
+        if task_type == "app":
+            if msg_type == "tools" and data.problems:
+                messagebox.showwarning("FFmpeg", "\n".join(data.problems))
+            return
+        # Сообщения приходят только от запущенных из вкладки задач, так что она уже создана
+        tab = self.tabs.get(task_type)
+        if tab is not None:
+            tab.handle_message(msg_type, data)
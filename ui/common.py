@@ -1,56 +1,164 @@
 import tkinter as tk
 from tkinter import ttk, filedialog
-from utils import run_ffprobe, format_probe_info
+import itertools
+import queue as queue_mod
+import threading
+import os
+from utils import run_ffprobe, format_probe_info, probe_summary
+from probe_cache import get_cache as get_probe_cache
+
+class ProbePool:
+    """Фоновые потоки для ffprobe, чтобы не блокировать главный цикл Tk.
+
+    Запросы по выделению идут вперёд фоновой предзагрузки. Перед запуском
+    проверяется is_current(): устаревшие запросы (пользователь уже листает
+    дальше) просто выбрасываются.
+    """
+    SELECT, PREFETCH = 0, 1
+
+    def __init__(self, workers=None):
+        if workers is None:
+            # ffprobe в основном ждёт диск/сеть, но держим число процессов ограниченным
+            workers = max(2, min(4, os.cpu_count() or 1))
+        self._tasks = queue_mod.PriorityQueue()
+        self._seq = itertools.count()
+        for i in range(workers):
+            threading.Thread(target=self._loop, name=f"probe-{i}", daemon=True).start()
+
+    def submit(self, path, callback, priority=PREFETCH, is_current=None):
+        self._tasks.put((priority, next(self._seq), path, callback, is_current))
+
+    def _loop(self):
+        while True:
+            _, _, path, callback, is_current = self._tasks.get()
+            if is_current is not None and not is_current():
+                continue
+            try:
+                data = run_ffprobe(path)
+            except Exception as e:
+                data = {"error": str(e)}
+            callback(path, data)
+
+_probe_pool = None
+
+def get_probe_pool():
+    global _probe_pool
+    if _probe_pool is None:
+        _probe_pool = ProbePool()
+    return _probe_pool
+
+def skip_done_checkbox(parent):
+    """Флажок «Пропускать готовые»: повторный запуск не переделывает файлы,
+    уже сделанные с теми же настройками. Возвращает его BooleanVar."""
+    var = tk.BooleanVar(value=True)
+    ttk.Checkbutton(parent, text="Пропускать готовые", variable=var).pack(side="left", padx=10)
+    return var
 
 class FileListWidget(ttk.Frame):
-    def __init__(self, parent, info_text_widget, title="Файлы:"):
+    def __init__(self, parent, info_text_widget, title="Файлы:", queue=None, task=None, on_select=None):
         super().__init__(parent)
+        # Вызывается с путём выбранного файла (вкладке обрезки — для ленты миниатюр)
+        self.on_select = on_select
         self.files = []
+        # Уже известные результаты ffprobe — передаются воркерам, чтобы не пробовать повторно
+        self.probes = {}
         self.info_widget = info_text_widget
-        
+        # Результаты ffprobe возвращаются через общую очередь приложения как (task, "probe", (path, data))
+        self.queue = queue
+        self.task = task
+        self._selected = None
+
         ttk.Label(self, text=title).pack(anchor="w")
-        
-        self.listbox = tk.Listbox(self, height=10)
-        self.listbox.pack(fill="x", pady=5)
-        self.listbox.bind("<<ListboxSelect>>", self._on_select)
+
+        self.tree = ttk.Treeview(self, columns=("dur", "res", "codec"), height=10, selectmode="extended")
+        self.tree.heading("#0", text="Файл")
+        self.tree.heading("dur", text="Длит.")
+        self.tree.heading("res", text="Разрешение")
+        self.tree.heading("codec", text="Кодеки")
+        self.tree.column("#0", width=300, stretch=True)
+        self.tree.column("dur", width=70, stretch=False)
+        self.tree.column("res", width=90, stretch=False)
+        self.tree.column("codec", width=90, stretch=False)
+        self.tree.pack(fill="x", pady=5)
+        self.tree.bind("<<TreeviewSelect>>", self._on_select)
 
         btns = ttk.Frame(self)
         btns.pack(fill="x")
-        
+
         ttk.Button(btns, text="Добавить", command=self._add).pack(side="left")
         ttk.Button(btns, text="Удалить", command=self._remove).pack(side="left", padx=5)
         ttk.Button(btns, text="Очистить", command=self._clear).pack(side="left")
 
     def _add(self):
-        paths = filedialog.askopenfilenames()
+        self.add_files(filedialog.askopenfilenames())
+
+    def add_files(self, paths):
+        cache = get_probe_cache()
         for p in paths:
-            if p not in self.files:
-                self.files.append(p)
-                self.listbox.insert(tk.END, p)
+            if p in self.files: continue
+            self.files.append(p)
+            data = cache.lookup(p)
+            self.tree.insert("", tk.END, iid=p, text=p, values=("…", "", "") if data is None else probe_summary(data))
+            if data is not None:
+                self.probes[p] = data
+            elif self.queue is not None:
+                # Вся пачка анализируется параллельно в фоне, пока пользователь настраивает параметры
+                get_probe_pool().submit(p, self._post_probe, ProbePool.PREFETCH)
 
     def _remove(self):
-        for idx in reversed(self.listbox.curselection()):
-            del self.files[idx]
-            self.listbox.delete(idx)
+        for iid in self.tree.selection():
+            self.files.remove(iid)
+            self.probes.pop(iid, None)
+            self.tree.delete(iid)
 
     def _clear(self):
         self.files.clear()
-        self.listbox.delete(0, tk.END)
+        self.probes.clear()
+        self.tree.delete(*self.tree.get_children())
 
     def _on_select(self, event):
-        sel = self.listbox.curselection()
+        sel = self.tree.selection()
         if not sel: return
-        path = self.listbox.get(sel[0])
-        
-        # Обновляем инфо-панель (которая передана извне)
-        if self.info_widget:
-            self.info_widget.config(state="normal")
-            self.info_widget.delete("1.0", tk.END)
-            # Запускаем ffprobe синхронно (можно вынести в thread если тормозит)
-            data = run_ffprobe(path)
-            text = format_probe_info(data)
-            self.info_widget.insert(tk.END, text)
-            self.info_widget.config(state="disabled")
+        path = sel[0]
+        self._selected = path
+        if self.on_select is not None:
+            self.on_select(path)
+        if not self.info_widget: return
+
+        if self.queue is None:
+            self._show_info(format_probe_info(run_ffprobe(path)))
+            return
+
+        data = self.probes.get(path) or get_probe_cache().lookup(path)
+        if data is not None:
+            self._show_info(format_probe_info(data))
+            return
+        self._show_info("Анализ файла…")
+        get_probe_pool().submit(path, self._post_probe, ProbePool.SELECT,
+                                is_current=lambda: self._selected == path)
+
+    def _post_probe(self, path, data):
+        # Вызывается из фонового потока — в Tk ничего не трогаем
+        self.queue.put((self.task, "probe", (path, data)))
+
+    def handle_probe(self, path, data):
+        """Принимает результат фонового ffprobe: обновляет строку списка и инфо-панель."""
+        if path not in self.files: return
+        if "error" not in data:
+            self.probes[path] = data
+        self.tree.item(path, values=probe_summary(data))
+        if path == self._selected and self.info_widget:
+            self._show_info(format_probe_info(data))
+
+    def _show_info(self, text):
+        self.info_widget.config(state="normal")
+        self.info_widget.delete("1.0", tk.END)
+        self.info_widget.insert(tk.END, text)
+        self.info_widget.config(state="disabled")
 
     def get_files(self):
-        return self.files
\ No newline at end of file
+        return self.files
+
+    def get_probes(self):
+        """Результаты ffprobe для уже проанализированных файлов списка."""
+        return {p: self.probes[p] for p in self.files if p in self.probes}
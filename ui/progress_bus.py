@@ -0,0 +1,70 @@
+import time
+import threading
+import itertools
+import tkinter as tk
+from collections import OrderedDict
+
+class ProgressBus:
+    """Замена queue.Queue между воркерами и Tk без постоянного опроса.
+
+    Воркеры вызывают put((task, msg_type, data)) как раньше. Частые сообщения
+    (прогресс, ETA) схлопываются — до интерфейса доходит только последнее
+    значение на задачу. Главный цикл будится виртуальным событием, а
+    перерисовка ограничена max_fps; когда задач нет, bus ничего не делает.
+    """
+    WAKE_EVENT = "<<ProgressBusWake>>"
+    # Для этих типов важно только последнее значение (job_progress — по каждой задаче отдельно)
+    COALESCE = {"progress", "eta", "job_progress"}
+
+    def __init__(self, widget, dispatch, max_fps=30):
+        self.widget = widget
+        self.dispatch = dispatch
+        self.min_interval = 1.0 / max_fps
+        self._pending = OrderedDict()
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._wake_sent = False
+        self._last_drain = 0.0
+        self._closed = False
+        widget.bind(self.WAKE_EVENT, self._on_wake)
+
+    def close(self):
+        """Окно закрывается: дальнейшие сообщения отбрасываются. Иначе воркер,
+        дописывающий статус, ждал бы event_generate от занятого главного потока."""
+        self._closed = True
+
+    def put(self, item):
+        if self._closed:
+            return
+        task, msg_type, data = item
+        if msg_type in self.COALESCE:
+            key = (task, msg_type, data[0] if msg_type == "job_progress" else None)
+        else:
+            key = next(self._seq)
+        with self._lock:
+            # Повторный ключ сохраняет место в очереди, меняется только значение
+            self._pending[key] = item
+            wake = not self._wake_sent
+            self._wake_sent = True
+        if wake:
+            try:
+                self.widget.event_generate(self.WAKE_EVENT, when="tail")
+            except (tk.TclError, RuntimeError):
+                # Окно уже закрыто — сообщения больше некому показывать
+                pass
+
+    def _on_wake(self, event=None):
+        delay = self.min_interval - (time.monotonic() - self._last_drain)
+        if delay > 0:
+            self.widget.after(int(delay * 1000) + 1, self._drain)
+        else:
+            self._drain()
+
+    def _drain(self):
+        with self._lock:
+            items = list(self._pending.values())
+            self._pending.clear()
+            self._wake_sent = False
+        self._last_drain = time.monotonic()
+        for task, msg_type, data in items:
+            self.dispatch(task, msg_type, data)
@@ -1,8 +1,9 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
-from workers import convert_worker
-from ui.common import FileListWidget
+from ui.common import FileListWidget, skip_done_checkbox
+from command_builder import PRESETS, VIDEO_CODECS
+from utils import seconds_to_hms
 
 class ConvertTab(ttk.Frame):
     def __init__(self, parent, queue):
@@ -28,7 +29,7 @@ class ConvertTab(ttk.Frame):
         self.info_text.pack(fill="both", expand=True)
 
         # Левая часть: Список файлов
-        self.file_widget = FileListWidget(left, self.info_text)
+        self.file_widget = FileListWidget(left, self.info_text, queue=self.queue, task="conv")
         self.file_widget.pack(fill="x")
 
         # Настройки
@@ -53,6 +54,17 @@ class ConvertTab(ttk.Frame):
         self.cb_fmt = add_combo(grp, "Output fmt:", ["mp4", "mkv", "mov"], "mp4", 2, 2)
         self.cb_acodec = add_combo(grp, "A. Codec:", ["copy", "aac", "mp3", "pcm_s16le", "opus", "flac"], "aac", 3, 0)
         self.cb_abitrate = add_combo(grp, "A. Bitrate:", ["copy", "96k", "128k", "160k", "192k", "256k", "320k"], "128k", 3, 2)
+        self.cb_jobs = add_combo(grp, "Задач сразу:", ["auto", "1", "2", "3", "4", "6", "8"], "auto", 4, 0)
+        self.cb_vcodec = add_combo(grp, "V. Codec:", VIDEO_CODECS, "libx264", 4, 2)
+
+        # Профиль просто заполняет поля выше — дальше их можно править вручную
+        self.cb_profile = add_combo(grp, "Профиль:", list(PRESETS), "balanced", 5, 0)
+        self.cb_profile.bind("<<ComboboxSelected>>", self._apply_profile)
+
+        # Кодирование под размер: пусто или 0 — обычный режим по CRF
+        ttk.Label(grp, text="Размер, МБ:").grid(row=5, column=2, sticky="w", padx=5, pady=2)
+        self.entry_target_mb = ttk.Entry(grp, width=12)
+        self.entry_target_mb.grid(row=5, column=3, sticky="w", padx=5, pady=2)
 
         sf = ttk.Frame(left)
         sf.pack(fill="x", pady=5)
@@ -60,6 +72,13 @@ class ConvertTab(ttk.Frame):
         self.entry_suffix = ttk.Entry(sf, width=15)
         self.entry_suffix.insert(0, "_conv")
         self.entry_suffix.pack(side="left", padx=5)
+        self.var_skip_done = skip_done_checkbox(sf)
+        # Длинный файл кодируется кусками параллельно — файлы пачки при этом идут по одному
+        self.var_chunked = tk.BooleanVar(value=False)
+        ttk.Checkbutton(sf, text="Делить длинные файлы на части", variable=self.var_chunked).pack(side="left")
+        # Потоки, уже совпадающие с настройками, копируются без перекодирования
+        self.var_copy_matching = tk.BooleanVar(value=True)
+        ttk.Checkbutton(sf, text="Не перекодировать подходящее", variable=self.var_copy_matching).pack(side="left", padx=10)
 
         # --- КНОПКИ УПРАВЛЕНИЯ ---
         btn_frame = ttk.Frame(left)
@@ -76,11 +95,28 @@ class ConvertTab(ttk.Frame):
         status_frame.pack(fill="x", pady=5)
         self.lbl_status = ttk.Label(status_frame, text="Файл 0 из 0")
         self.lbl_status.pack(side="left")
+        self.lbl_eta = ttk.Label(status_frame, text="")
+        self.lbl_eta.pack(side="right")
         
         self.progress = ttk.Progressbar(left, orient="horizontal", mode="determinate")
         self.progress.pack(fill="x")
 
+    def _apply_profile(self, event=None):
+        preset = PRESETS.get(self.cb_profile.get())
+        if not preset: return
+        for key, cb in (("vcodec", self.cb_vcodec), ("crf", self.cb_crf), ("preset", self.cb_preset),
+                        ("resolution", self.cb_res), ("fps", self.cb_fps),
+                        ("acodec", self.cb_acodec), ("abitrate", self.cb_abitrate)):
+            cb.set(preset[key])
+
+    def _target_mb(self):
+        try:
+            return max(float(self.entry_target_mb.get().replace(",", ".")), 0.0)
+        except ValueError:
+            return 0.0
+
     def start(self):
+        from workers import convert_worker
         files = self.file_widget.get_files()
         if not files:
             messagebox.showerror("Ошибка", "Нет файлов для обработки.")
@@ -96,6 +132,7 @@ class ConvertTab(ttk.Frame):
         self.lbl_status.config(text=f"Подготовка... (Всего файлов: {len(files)})")
 
         settings = {
+            "vcodec": self.cb_vcodec.get(),
             "crf": self.cb_crf.get(),
             "preset": self.cb_preset.get(),
             "resolution": self.cb_res.get(),
@@ -104,11 +141,20 @@ class ConvertTab(ttk.Frame):
             "out_format": self.cb_fmt.get(),
             "acodec": self.cb_acodec.get(),
             "abitrate": self.cb_abitrate.get(),
-            "suffix": self.entry_suffix.get()
+            "target_size_mb": self._target_mb(),
+            "skip_done": self.var_skip_done.get(),
+            "chunked": self.var_chunked.get(),
+            "copy_matching": self.var_copy_matching.get(),
+            "suffix": self.entry_suffix.get(),
+            # "auto" или мусор в поле — подбираем по числу ядер
+            "jobs": int(self.cb_jobs.get()) if self.cb_jobs.get().isdigit() else 0
         }
 
         # Передаем cancel_event в аргументы!
-        threading.Thread(target=convert_worker, args=(files, settings, self.queue, self.cancel_event), daemon=True).start()
+        # Уже готовые ffprobe из списка файлов — чтобы воркер не анализировал их повторно
+        kwargs = {"probes": self.file_widget.get_probes()}
+        self.worker = threading.Thread(target=convert_worker, args=(files, settings, self.queue, self.cancel_event), kwargs=kwargs, daemon=True)
+        self.worker.start()
 
     def stop(self):
         if self.processing:
@@ -119,11 +165,17 @@ class ConvertTab(ttk.Frame):
     def handle_message(self, msg_type, data):
         if msg_type == "update_index":
             idx, total = data
-            self.lbl_status.config(text=f"Обработка файла {idx} из {total}")
-            self.progress['value'] = 0
+            # Файлы обрабатываются параллельно, прогресс-бар — общий по пачке
+            self.lbl_status.config(text=f"Обработано файлов: {idx} из {total}")
             
         elif msg_type == "progress":
             self.progress['value'] = data
+
+        elif msg_type == "probe":
+            self.file_widget.handle_probe(*data)
+
+        elif msg_type == "eta":
+            self.lbl_eta.config(text=f"Осталось ~{seconds_to_hms(data)}" if data is not None else "")
             
         elif msg_type == "status":
             self.lbl_status.config(text=data)
@@ -138,8 +190,14 @@ class ConvertTab(ttk.Frame):
             self.btn_start.config(state="normal")
             self.btn_stop.config(state="disabled")
             self.progress['value'] = 100
-            self.lbl_status.config(text="Конвертация завершена!")
-            messagebox.showinfo("Готово", "Все файлы обработаны.")
+            self.lbl_eta.config(text="")
+            if data:
+                # Причины ошибок уже показаны статусами по каждому файлу
+                self.lbl_status.config(text=f"Конвертация завершена, файлов с ошибкой: {data}")
+                messagebox.showwarning("Готово", f"Не удалось обработать файлов: {data}")
+            else:
+                self.lbl_status.config(text="Конвертация завершена!")
+                messagebox.showinfo("Готово", "Все файлы обработаны.")
             
         elif msg_type == "error":
             self.processing = False
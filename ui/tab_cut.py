@@ -1,8 +1,10 @@
 import tkinter as tk
-from tkinter import ttk, messagebox
+from tkinter import ttk, messagebox, filedialog
+import base64
 import threading
-from workers import cut_worker
-from ui.common import FileListWidget
+from ui.common import FileListWidget, skip_done_checkbox
+from utils import seconds_to_hms, parse_segments, format_cut_time
+from thumbnails import THUMB_HEIGHT
 
 class CutTab(ttk.Frame):
     def __init__(self, parent, queue):
@@ -10,6 +12,10 @@ class CutTab(ttk.Frame):
         self.queue = queue
         self.processing = False
         self.cancel_event = threading.Event()
+        # Лента миниатюр выбранного файла: строится в фоне, при смене файла прерывается
+        self._strip_path = None
+        self._strip_cancel = threading.Event()
+        self._thumbs = []
         self._build_ui()
 
     def _build_ui(self):
@@ -22,10 +28,22 @@ class CutTab(ttk.Frame):
         paned.add(right, weight=1)
 
         ttk.Label(right, text="Инфо:").pack(anchor="w")
-        self.info_text = tk.Text(right, width=30, height=20, state="disabled")
+        self.info_text = tk.Text(right, width=30, height=12, state="disabled")
         self.info_text.pack(fill="both", expand=True)
 
-        self.file_widget = FileListWidget(left, self.info_text)
+        # Ключевые кадры — ровно те точки, с которых начинается обрезка без перекодирования
+        ttk.Label(right, text="Ключевые кадры (ЛКМ — начало, ПКМ — конец):").pack(anchor="w", pady=(5, 0))
+        strip = ttk.Frame(right)
+        strip.pack(fill="both", expand=True)
+        self.strip_canvas = tk.Canvas(strip, height=2 * (THUMB_HEIGHT + 24), highlightthickness=0)
+        strip_scroll = ttk.Scrollbar(strip, orient="vertical", command=self.strip_canvas.yview)
+        self.strip_canvas.configure(yscrollcommand=strip_scroll.set)
+        strip_scroll.pack(side="right", fill="y")
+        self.strip_canvas.pack(side="left", fill="both", expand=True)
+        self.strip_canvas.bind("<Configure>", lambda e: self._layout_thumbs())
+
+        self.file_widget = FileListWidget(left, self.info_text, queue=self.queue, task="cut",
+                                          on_select=self._show_filmstrip)
         self.file_widget.pack(fill="x")
 
         # Тайминг
@@ -42,12 +60,45 @@ class CutTab(ttk.Frame):
         self.entry_end.insert(0, "00:00:00")
         self.entry_end.grid(row=0, column=3)
 
+        # Несколько фрагментов за один проход: если список не пуст, поля выше не используются
+        seg_frame = ttk.LabelFrame(left, text="Фрагменты (по одному на строку: начало-конец)")
+        seg_frame.pack(fill="x")
+        self.text_segments = tk.Text(seg_frame, height=4, width=40)
+        self.text_segments.pack(side="left", fill="x", expand=True, padx=5, pady=5)
+
+        seg_btns = ttk.Frame(seg_frame)
+        seg_btns.pack(side="left", anchor="n", padx=5, pady=5)
+        ttk.Button(seg_btns, text="Импорт...", command=self.import_segments).pack(fill="x")
+        self.var_concat = tk.BooleanVar(value=False)
+        ttk.Checkbutton(seg_btns, text="Склеить в один файл", variable=self.var_concat).pack(anchor="w", pady=(5, 0))
+        self.var_smart = tk.BooleanVar(value=False)
+        ttk.Checkbutton(seg_btns, text="Точно до кадра (smart cut)", variable=self.var_smart).pack(anchor="w")
+
+        # Автопоиск фрагментов в выбранном файле: разрез по сменам сцен, без тишины.
+        # Результат анализа кэшируется — другие пороги применяются без повторного прохода
+        scan_frame = ttk.Frame(left)
+        scan_frame.pack(fill="x", pady=(5, 0))
+        self.var_scan_scenes = tk.BooleanVar(value=True)
+        ttk.Checkbutton(scan_frame, text="Сцены, порог:", variable=self.var_scan_scenes).pack(side="left")
+        self.entry_scene_threshold = ttk.Entry(scan_frame, width=5)
+        self.entry_scene_threshold.insert(0, "10")
+        self.entry_scene_threshold.pack(side="left", padx=(0, 10))
+        self.var_scan_silence = tk.BooleanVar(value=True)
+        ttk.Checkbutton(scan_frame, text="Убрать тишину, дБ:", variable=self.var_scan_silence).pack(side="left")
+        self.entry_noise_db = ttk.Entry(scan_frame, width=5)
+        self.entry_noise_db.insert(0, "-35")
+        self.entry_noise_db.pack(side="left", padx=(0, 10))
+        self.btn_scan = ttk.Button(scan_frame, text="Найти фрагменты", command=self.scan)
+        self.btn_scan.pack(side="left")
+        self._analyzing = False
+
         sf_frame = ttk.Frame(left)
         sf_frame.pack(fill="x", pady=5)
         ttk.Label(sf_frame, text="Приписка:").pack(side="left")
         self.entry_suffix = ttk.Entry(sf_frame, width=15)
         self.entry_suffix.insert(0, "_cut")
         self.entry_suffix.pack(side="left", padx=5)
+        self.var_skip_done = skip_done_checkbox(sf_frame)
 
         # Кнопки
         btn_frame = ttk.Frame(left)
@@ -64,22 +115,143 @@ class CutTab(ttk.Frame):
         status_frame.pack(fill="x", pady=5)
         self.lbl_status = ttk.Label(status_frame, text="Файл 0 из 0")
         self.lbl_status.pack(side="left")
+        self.lbl_eta = ttk.Label(status_frame, text="")
+        self.lbl_eta.pack(side="right")
 
         self.progress = ttk.Progressbar(left, orient="horizontal", mode="determinate")
         self.progress.pack(fill="x")
 
+    def import_segments(self):
+        """Загружает список фрагментов из текстового/CSV файла."""
+        path = filedialog.askopenfilename(filetypes=[("Текст / CSV", "*.txt *.csv"), ("Все файлы", "*.*")])
+        if not path: return
+        with open(path, encoding="utf-8-sig", errors="replace") as f:
+            segments = parse_segments(f.read())
+        if not segments:
+            messagebox.showwarning("Внимание", "В файле не найдено ни одного фрагмента")
+            return
+        self.text_segments.delete("1.0", tk.END)
+        self.text_segments.insert("1.0", "\n".join(f"{a}-{b}" for a, b in segments))
+
+    def _show_filmstrip(self, path):
+        """Запускает построение ленты для выбранного файла (из кэша — сразу)."""
+        if path == self._strip_path: return
+        from thumbnails import filmstrip
+        from utils import run_ffprobe
+        from smartcut import start_time
+        self._strip_cancel.set()
+        cancel = self._strip_cancel = threading.Event()
+        self._strip_path = path
+        self._thumbs = []
+        self._layout_thumbs()
+
+        def on_thumb(t, png):
+            # Пока лента строится, png во временной папке — передаём содержимое, а не путь
+            with open(png, "rb") as f:
+                self.queue.put(("cut", "thumb", (path, t, base64.b64encode(f.read()).decode("ascii"))))
+
+        def work():
+            try:
+                probe = run_ffprobe(path)
+                duration = float(probe.get("format", {}).get("duration", 0) or 0)
+                thumbs = filmstrip(path, on_thumb, cancel, duration, start_time(probe))
+            except Exception:
+                thumbs = None
+            if not cancel.is_set():
+                self.queue.put(("cut", "thumbs_done", (path, thumbs is not None)))
+        threading.Thread(target=work, name="filmstrip", daemon=True).start()
+
+    def _layout_thumbs(self):
+        self.strip_canvas.delete("all")
+        if not self._thumbs and self._strip_path:
+            self.strip_canvas.create_text(5, 5, text="Загрузка миниатюр…", anchor="nw", tags="hint")
+        for i in range(len(self._thumbs)):
+            self._place_thumb(i)
+
+    def _place_thumb(self, i):
+        t, img = self._thumbs[i]
+        cell_w, cell_h = img.width() + 6, img.height() + 20
+        cols = max(1, self.strip_canvas.winfo_width() // cell_w)
+        x, y = (i % cols) * cell_w + 3, (i // cols) * cell_h + 3
+        tag = f"thumb{i}"
+        self.strip_canvas.create_image(x, y, image=img, anchor="nw", tags=tag)
+        self.strip_canvas.create_text(x + img.width() // 2, y + img.height() + 2, text=seconds_to_hms(t),
+                                      anchor="n", tags=tag)
+        self.strip_canvas.tag_bind(tag, "<Button-1>", lambda e: self._set_time(self.entry_start, t))
+        # Правая кнопка: Button-3 на Windows/Linux, Button-2 на macOS
+        for button in ("<Button-3>", "<Button-2>"):
+            self.strip_canvas.tag_bind(tag, button, lambda e: self._set_time(self.entry_end, t))
+        self.strip_canvas.configure(scrollregion=self.strip_canvas.bbox("all"))
+
+    def _set_time(self, entry, t):
+        entry.delete(0, tk.END)
+        entry.insert(0, format_cut_time(t))
+
+    def scan(self):
+        """Анализ выбранного (или первого) файла; найденные фрагменты попадают в поле «Фрагменты»."""
+        from workers import analyze_worker
+        files = self.file_widget.get_files()
+        if not files:
+            messagebox.showerror("Ошибка", "Нет файлов")
+            return
+        if self.processing: return
+        try:
+            options = {
+                "scene_threshold": float(self.entry_scene_threshold.get().replace(",", ".")),
+                "noise_db": float(self.entry_noise_db.get().replace(",", ".")),
+                "split_scenes": self.var_scan_scenes.get(),
+                "drop_silence": self.var_scan_silence.get(),
+            }
+        except ValueError:
+            messagebox.showerror("Ошибка", "Порог сцены и уровень тишины должны быть числами")
+            return
+        selection = self.file_widget.tree.selection()
+        path = selection[0] if selection else files[0]
+
+        self.processing = self._analyzing = True
+        self.cancel_event.clear()
+        self.btn_start.config(state="disabled")
+        self.btn_scan.config(state="disabled")
+        self.btn_stop.config(state="normal")
+        self.progress['value'] = 0
+        self.lbl_status.config(text=f"Анализ {path}...")
+        self.worker = threading.Thread(target=analyze_worker, args=([path], self.queue, self.cancel_event),
+                                       kwargs={"options": options, "probes": self.file_widget.get_probes()},
+                                       daemon=True)
+        self.worker.start()
+
+    def _show_segments(self, segments):
+        self.text_segments.delete("1.0", tk.END)
+        self.text_segments.insert("1.0", "\n".join(f"{format_cut_time(a)}-{format_cut_time(b)}" for a, b in segments))
+        self.lbl_status.config(text=f"Найдено фрагментов: {len(segments)}")
+
+    def _finish(self):
+        self.processing = self._analyzing = False
+        self.btn_start.config(state="normal")
+        self.btn_scan.config(state="normal")
+        self.btn_stop.config(state="disabled")
+
     def start(self):
+        from workers import cut_worker
         files = self.file_widget.get_files()
         if not files:
             messagebox.showerror("Ошибка", "Нет файлов")
             return
         if self.processing: return
 
+        seg_text = self.text_segments.get("1.0", tk.END).strip()
+        segments = parse_segments(seg_text)
+        if seg_text and not segments:
+            messagebox.showerror("Ошибка", "Не удалось разобрать список фрагментов")
+            return
+
         self.processing = True
         self.cancel_event.clear()
         self.btn_start.config(state="disabled")
+        self.btn_scan.config(state="disabled")
         self.btn_stop.config(state="normal")
         
+        self.progress['value'] = 0
         self.lbl_status.config(text=f"Запуск... (Всего: {len(files)})")
         
         # ВАЖНО: Добавили self.cancel_event в кортеж args
@@ -91,7 +263,15 @@ class CutTab(ttk.Frame):
             self.queue,
             self.cancel_event
         )
-        threading.Thread(target=cut_worker, args=args, daemon=True).start()
+        kwargs = {
+            "probes": self.file_widget.get_probes(),
+            "segments": segments,
+            "concat": self.var_concat.get(),
+            "smart": self.var_smart.get(),
+            "skip_done": self.var_skip_done.get(),
+        }
+        self.worker = threading.Thread(target=cut_worker, args=args, kwargs=kwargs, daemon=True)
+        self.worker.start()
 
     def stop(self):
         if self.processing:
@@ -101,30 +281,70 @@ class CutTab(ttk.Frame):
 
     def handle_message(self, msg_type, data):
         if msg_type == "update_index":
+            if self._analyzing:
+                return  # итог анализа уже показан в _show_segments
             idx, total = data
-            self.lbl_status.config(text=f"Обработка файла {idx} из {total}")
-            self.progress['value'] = 0
+            # Файлы обрабатываются параллельно, прогресс-бар — общий по пачке
+            self.lbl_status.config(text=f"Обработано файлов: {idx} из {total}")
             
         elif msg_type == "progress":
             self.progress['value'] = data
+
+        elif msg_type == "probe":
+            self.file_widget.handle_probe(*data)
+
+        elif msg_type == "thumb":
+            path, t, png = data
+            if path != self._strip_path: return
+            try:
+                img = tk.PhotoImage(data=png)
+            except tk.TclError:
+                return
+            if not self._thumbs:
+                self.strip_canvas.delete("hint")
+            self._thumbs.append((t, img))
+            self._place_thumb(len(self._thumbs) - 1)
+
+        elif msg_type == "thumbs_done":
+            path, ok = data
+            if path == self._strip_path and not self._thumbs:
+                self.strip_canvas.delete("all")
+                self.strip_canvas.create_text(5, 5, anchor="nw",
+                                              text="Нет ключевых кадров" if ok else "Миниатюры недоступны")
+
+        elif msg_type == "eta":
+            self.lbl_eta.config(text=f"Осталось ~{seconds_to_hms(data)}" if data is not None else "")
             
+        elif msg_type == "analysis":
+            path, segments = data
+            if segments:
+                self._show_segments(segments)
+            else:
+                messagebox.showwarning("Внимание", "Фрагменты не найдены — попробуйте другие пороги")
+
         elif msg_type == "status":
             self.lbl_status.config(text=data)
-            if "прервана" in data or "отменена" in data:
-                self.processing = False
-                self.btn_start.config(state="normal")
-                self.btn_stop.config(state="disabled")
+            # «Обрезка прервана», «Анализ прерван»
+            if "прерван" in data or "отменена" in data:
+                self._finish()
+
+        elif msg_type == "done" and self._analyzing:
+            self._finish()
+            self.progress['value'] = 100
+            self.lbl_eta.config(text="")
 
         elif msg_type == "done":
-            self.processing = False
-            self.btn_start.config(state="normal")
-            self.btn_stop.config(state="disabled")
+            self._finish()
             self.progress['value'] = 100
-            self.lbl_status.config(text="Обрезка завершена!")
-            messagebox.showinfo("Готово", "Все файлы обрезаны.")
+            self.lbl_eta.config(text="")
+            if data:
+                # Причины ошибок уже показаны статусами по каждому файлу
+                self.lbl_status.config(text=f"Обрезка завершена, файлов с ошибкой: {data}")
+                messagebox.showwarning("Готово", f"Не удалось обрезать файлов: {data}")
+            else:
+                self.lbl_status.config(text="Обрезка завершена!")
+                messagebox.showinfo("Готово", "Все файлы обрезаны.")
             
         elif msg_type == "error":
-            self.processing = False
-            self.btn_start.config(state="normal")
-            self.btn_stop.config(state="disabled")
+            self._finish()
             messagebox.showerror("Ошибка", data)
\ No newline at end of file
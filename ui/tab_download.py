@@ -2,7 +2,6 @@ import tkinter as tk
 from tkinter import ttk, messagebox
 import threading
 import os
-from workers import download_worker
 
 class DownloadTab(ttk.Frame):
     def __init__(self, parent, queue):
@@ -17,18 +16,18 @@ class DownloadTab(ttk.Frame):
         main_frame = ttk.Frame(self)
         main_frame.pack(fill="both", expand=True, padx=20, pady=20)
 
-        # Поле ввода ссылки
-        ttk.Label(main_frame, text="Ссылка на видео (YouTube):").pack(anchor="w", pady=(0, 5))
+        # Поле ввода ссылок: по одной на строку, плейлисты раскрываются в отдельные ролики
+        ttk.Label(main_frame, text="Ссылки на видео или плейлисты (YouTube), по одной на строку:").pack(anchor="w", pady=(0, 5))
         
-        # Рамка для строки ввода (чтобы в будущем добавить иконки, если захотите)
+        # Рамка для поля ввода (чтобы в будущем добавить иконки, если захотите)
         entry_frame = ttk.Frame(main_frame)
         entry_frame.pack(fill="x", pady=(0, 15))
 
-        self.entry_url = ttk.Entry(entry_frame)
-        self.entry_url.pack(fill="x")
+        self.text_urls = tk.Text(entry_frame, height=4)
+        self.text_urls.pack(fill="x")
         
-        # --- ФИКС: Вставка правой кнопкой мыши (как вы просили) ---
-        self.entry_url.bind("<Button-1>", self._quick_paste)
+        # --- ФИКС: Вставка по клику мыши (как вы просили) ---
+        self.text_urls.bind("<Button-1>", self._quick_paste)
 
         # Выбор папки для сохранения
         lbl_folder = ttk.Label(main_frame, text="Папка для сохранения:")
@@ -46,6 +45,56 @@ class DownloadTab(ttk.Frame):
         btn_browse = ttk.Button(folder_frame, text="Выбрать...", command=self.browse_folder)
         btn_browse.pack(side="left", padx=(5, 0))
 
+        ttk.Label(folder_frame, text="Одновременно:").pack(side="left", padx=(15, 5))
+        self.cb_jobs = ttk.Combobox(folder_frame, values=["1", "2", "3", "4", "6"], width=4, state="readonly")
+        self.cb_jobs.set("3")
+        self.cb_jobs.pack(side="left")
+
+        # --- ОТРЕЗОК ---
+        # Скачивается только нужный кусок ролика, а не весь файл целиком
+        section_frame = ttk.Frame(main_frame)
+        section_frame.pack(fill="x", pady=(0, 15))
+        self.var_section = tk.BooleanVar(value=False)
+        ttk.Checkbutton(section_frame, text="Скачать только отрезок", variable=self.var_section).pack(side="left")
+        ttk.Label(section_frame, text="с").pack(side="left", padx=(10, 2))
+        self.entry_section_start = ttk.Entry(section_frame, width=10)
+        self.entry_section_start.insert(0, "00:00:00")
+        self.entry_section_start.pack(side="left")
+        ttk.Label(section_frame, text="по").pack(side="left", padx=(10, 2))
+        self.entry_section_end = ttk.Entry(section_frame, width=10)
+        self.entry_section_end.insert(0, "00:01:00")
+        self.entry_section_end.pack(side="left")
+        self.var_section_precise = tk.BooleanVar(value=False)
+        ttk.Checkbutton(section_frame, text="Точно по времени (с перекодированием)",
+                        variable=self.var_section_precise).pack(side="left", padx=(15, 0))
+
+        # --- ОБРАБОТКА ПОСЛЕ СКАЧИВАНИЯ ---
+        # Этапы запускаются сразу после загрузки каждого ролика, пока следующие ещё качаются
+        post_frame = ttk.LabelFrame(main_frame, text="После скачивания")
+        post_frame.pack(fill="x", pady=(0, 15))
+
+        self.var_cut = tk.BooleanVar(value=False)
+        ttk.Checkbutton(post_frame, text="Обрезать", variable=self.var_cut).grid(row=0, column=0, sticky="w", padx=5, pady=3)
+        ttk.Label(post_frame, text="с").grid(row=0, column=1, padx=(10, 2))
+        self.entry_cut_start = ttk.Entry(post_frame, width=10)
+        self.entry_cut_start.insert(0, "00:00:00")
+        self.entry_cut_start.grid(row=0, column=2)
+        ttk.Label(post_frame, text="по").grid(row=0, column=3, padx=(10, 2))
+        self.entry_cut_end = ttk.Entry(post_frame, width=10)
+        self.entry_cut_end.insert(0, "00:01:00")
+        self.entry_cut_end.grid(row=0, column=4)
+
+        self.var_convert = tk.BooleanVar(value=False)
+        ttk.Checkbutton(post_frame, text="Конвертировать", variable=self.var_convert).grid(row=1, column=0, sticky="w", padx=5, pady=3)
+        ttk.Label(post_frame, text="Профиль:").grid(row=1, column=1, columnspan=2, sticky="e", padx=(10, 2))
+        # Список профилей дублирует command_builder.PRESETS — не тянем его ради старта вкладки
+        self.cb_post_profile = ttk.Combobox(post_frame, values=["fast preview", "balanced", "archive"], width=14, state="readonly")
+        self.cb_post_profile.set("fast preview")
+        self.cb_post_profile.grid(row=1, column=3, columnspan=2, sticky="w")
+
+        self.var_delete_intermediate = tk.BooleanVar(value=False)
+        ttk.Checkbutton(post_frame, text="Удалять промежуточные файлы", variable=self.var_delete_intermediate).grid(row=2, column=0, columnspan=5, sticky="w", padx=5, pady=3)
+
         # --- КНОПКИ УПРАВЛЕНИЯ ---
         btns_frame = ttk.Frame(main_frame)
         btns_frame.pack(anchor="w", pady=(0, 15))
@@ -64,16 +113,29 @@ class DownloadTab(ttk.Frame):
         self.progress = ttk.Progressbar(main_frame, orient="horizontal", mode="determinate")
         self.progress.pack(fill="x")
 
+        # Очередь загрузок: строка на каждый ролик
+        self.tree = ttk.Treeview(main_frame, columns=("state", "pct"), height=8)
+        self.tree.heading("#0", text="Видео")
+        self.tree.heading("state", text="Статус")
+        self.tree.heading("pct", text="%")
+        self.tree.column("#0", width=420, stretch=True)
+        self.tree.column("state", width=160, stretch=False)
+        self.tree.column("pct", width=50, stretch=False, anchor="e")
+        self.tree.pack(fill="both", expand=True, pady=(10, 0))
+
     def _quick_paste(self, event):
-        """Быстрая вставка по правой кнопке мыши"""
+        """Быстрая вставка по клику: ссылка из буфера добавляется новой строкой"""
         try:
-            text = self.clipboard_get()
-            if text:
-                self.entry_url.delete(0, tk.END)
-                self.entry_url.insert(0, text)
+            text = self.clipboard_get().strip()
+            if text and text not in self._get_urls():
+                current = self.text_urls.get("1.0", tk.END).strip()
+                self.text_urls.insert(tk.END, ("\n" if current else "") + text)
         except: pass
         return "break"
 
+    def _get_urls(self):
+        return [line.strip() for line in self.text_urls.get("1.0", tk.END).splitlines() if line.strip()]
+
     def browse_folder(self):
         import tkinter.filedialog as fd
         d = fd.askdirectory()
@@ -81,13 +143,25 @@ class DownloadTab(ttk.Frame):
             self.entry_folder.delete(0, tk.END)
             self.entry_folder.insert(0, d)
 
+    def _get_stages(self):
+        stages = []
+        if self.var_cut.get():
+            stages.append({"type": "cut", "start": self.entry_cut_start.get().strip(), "end": self.entry_cut_end.get().strip()})
+        if self.var_convert.get():
+            stages.append({"type": "convert", "settings": {"preset_name": self.cb_post_profile.get()}})
+        return stages
+
     def start(self):
-        url = self.entry_url.get().strip()
+        from workers import download_worker
+        urls = self._get_urls()
         folder = self.entry_folder.get().strip()
 
-        if not url or not folder:
+        if not urls or not folder:
             messagebox.showwarning("Внимание", "Заполните все поля")
             return
+        section = None
+        if self.var_section.get():
+            section = (self.entry_section_start.get().strip(), self.entry_section_end.get().strip())
 
         # Подготовка к запуску
         self.processing = True
@@ -97,14 +171,22 @@ class DownloadTab(ttk.Frame):
         self.btn_stop.config(state="normal")    # Включаем стоп
         self.progress['value'] = 0
         self.lbl_status.config(text="Запуск...")
+        self.tree.delete(*self.tree.get_children())
 
         # Запуск потока (передаем cancel_event!)
-        thread = threading.Thread(
+        self.worker = threading.Thread(
             target=download_worker, 
-            args=(url, folder, self.queue, self.cancel_event), 
+            args=(urls, folder, self.queue, self.cancel_event), 
+            kwargs={
+                "jobs": int(self.cb_jobs.get()),
+                "stages": self._get_stages(),
+                "keep_intermediate": not self.var_delete_intermediate.get(),
+                "section": section,
+                "precise_section": self.var_section_precise.get(),
+            },
             daemon=True
         )
-        thread.start()
+        self.worker.start()
 
     def stop(self):
         """Метод вызывается при нажатии кнопки 'Остановить'"""
@@ -119,6 +201,15 @@ class DownloadTab(ttk.Frame):
             self.lbl_status.config(text=data)
         elif msg_type == "progress":
             self.progress['value'] = data
+        elif msg_type == "items":
+            for job_id, title, url in data:
+                self.tree.insert("", tk.END, iid=str(job_id), text=title, values=("В очереди", ""))
+        elif msg_type == "job_progress":
+            job_id, pct, state = data
+            self.tree.item(str(job_id), values=(state, pct))
+        elif msg_type == "job_status":
+            job_id, state = data
+            self.tree.item(str(job_id), values=(state, self.tree.set(str(job_id), "pct")))
         elif msg_type in ("done", "error"):
             # Возвращаем кнопки в исходное состояние
             self.processing = False
@@ -128,7 +219,7 @@ class DownloadTab(ttk.Frame):
             if msg_type == "done":
                 self.lbl_status.config(text="Завершено успешно")
                 messagebox.showinfo("Готово", "Видео скачано!")
-                self.entry_url.delete(0, tk.END) # Очищаем после успеха
+                self.text_urls.delete("1.0", tk.END) # Очищаем после успеха
             else:
                 self.lbl_status.config(text=f"Ошибка: {data}")
                 messagebox.showerror("Ошибка", data)
\ No newline at end of file
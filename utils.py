@@ -28,19 +28,40 @@ def seconds_to_hms(s: float) -> str:
     sec = s % 60
     return f"{h:02d}:{m:02d}:{sec:02d}"
 
-FFMPEG_TIME_RE = re.compile(r"time=(\d+:\d+:\d+(?:\.\d+)?)")
+def format_cut_time(t: float) -> str:
+    """ЧЧ:ММ:СС.ммм — для точек обрезки, которые точнее целых секунд (ключевые кадры, сцены)."""
+    whole = int(t)
+    return f"{whole // 3600:02d}:{whole % 3600 // 60:02d}:{t % 60:06.3f}"
 
-def parse_ffmpeg_time(line: str):
-    if not line: return None
-    m = FFMPEG_TIME_RE.search(line)
-    if m:
-        return hms_to_seconds(m.group(1))
-    return None
+SEGMENT_SPLIT_RE = re.compile(r"\s*(?:[-–—;,\t]|\s)\s*")
 
-def run_ffprobe(path: str) -> dict:
+def parse_segments(text: str):
+    """Разбирает список фрагментов: по одному на строку, «начало-конец».
+
+    Разделитель — дефис, тире, запятая, точка с запятой, таб или пробел,
+    поэтому подходит и ручной ввод, и CSV. Пустые строки, комментарии (#)
+    и строки-заголовки пропускаются. Возвращает [(начало, конец), ...] строками.
+    """
+    segments = []
+    for line in text.splitlines():
+        line = line.split("#", 1)[0].strip()
+        if not line: continue
+        parts = [p for p in SEGMENT_SPLIT_RE.split(line) if p]
+        if len(parts) < 2: continue
+        start, end = parts[0], parts[1]
+        if not re.fullmatch(r"[\d:.]+", start) or not re.fullmatch(r"[\d:.]+", end): continue
+        segments.append((start, end))
+    return segments
+
+def run_ffprobe(path: str, use_cache: bool = True) -> dict:
+    # Повторные запросы по неизменённому файлу отдаются из кэша (см. probe_cache)
+    if use_cache:
+        from probe_cache import get_cache
+        return get_cache().get(path)
+    from tools import ffprobe_exe
     try:
         cmd = [
-            "ffprobe", "-v", "quiet",
+            ffprobe_exe(), "-v", "quiet",
             "-print_format", "json",
             "-show_format", "-show_streams",
             path
@@ -77,4 +98,17 @@ def format_probe_info(probe: dict) -> str:
             lines.append(f" Codec: {s.get('codec_name')}")
             lines.append(f" Hz: {s.get('sample_rate')}")
     
-    return "\n".join(lines)
\ No newline at end of file
+    return "\n".join(lines)
+
+def probe_summary(probe: dict):
+    """Короткая сводка для колонок списка файлов: (длительность, разрешение, кодеки)."""
+    if not probe or "error" in probe:
+        return ("?", "", "")
+    dur = float(probe.get("format", {}).get("duration", 0) or 0)
+    res, codecs = "", []
+    for s in probe.get("streams", []):
+        if s.get("codec_type") == "video" and not res:
+            res = f"{s.get('width')}x{s.get('height')}"
+        if s.get("codec_type") in ("video", "audio") and s.get("codec_name"):
+            codecs.append(s["codec_name"])
+    return (seconds_to_hms(dur), res, "/".join(dict.fromkeys(codecs)))
@@ -0,0 +1,200 @@
+"""Наблюдение за папками: новые файлы обрабатываются без участия человека.
+
+Папки опрашиваются раз в interval секунд. Файл берётся в работу, когда его размер
+и время изменения не меняются settle секунд (запись закончена), и проходит этапы
+своего правила — те же cut/convert, что после скачивания (workers.run_stage).
+Одновременно обрабатывается не больше jobs файлов. Обработанные файлы и их
+результаты запоминаются в .neat_ffmpeg_watch.json в каждой папке: после перезапуска
+они не берутся повторно, а заменённый файл (другой размер или mtime) обрабатывается заново.
+"""
+import os
+import json
+import time
+import fnmatch
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from workers import run_stage, stage_output_path
+
+STATE_NAME = ".neat_ffmpeg_watch.json"
+POLL_SECONDS = 5
+# Столько секунд файл не должен меняться, чтобы считать запись законченной
+SETTLE_SECONDS = 10
+# Кодирование и так занимает все ядра — по умолчанию файлы идут по одному
+WATCH_JOBS = 1
+DEFAULT_PATTERNS = ("*.mp4", "*.mov", "*.mkv", "*.avi", "*.webm", "*.m4v", "*.ts")
+
+def make_rule(folder, stages, patterns=None):
+    """Правило: какие файлы папки folder и какими этапами обрабатывать."""
+    if not stages:
+        raise ValueError(f"{folder}: не задано ни обрезки, ни конвертации")
+    for stage in stages:
+        stage_output_path(stage, "x.mp4")  # неизвестный тип этапа — ошибка сразу, а не на первом файле
+    return {"folder": os.path.abspath(folder), "patterns": list(patterns or DEFAULT_PATTERNS), "stages": list(stages)}
+
+def stages_from(cut=None, convert=None):
+    """Этапы из краткой записи: cut {"start", "end"[, "smart", "suffix"]}, затем convert —
+    имя профиля или словарь настроек вкладки «Конвертация»."""
+    stages = []
+    if cut:
+        stages.append({"type": "cut", **cut})
+    if convert:
+        settings = {"preset_name": convert} if isinstance(convert, str) else dict(convert)
+        stages.append({"type": "convert", "settings": settings})
+    return stages
+
+def load_config(path):
+    """Настройки из JSON:
+    {"jobs": 2, "settle": 10, "interval": 5,
+     "folders": [{"folder": "/ingest/lectures", "convert": "archive"},
+                 {"folder": "/ingest/clips", "patterns": ["*.mov"],
+                  "cut": {"start": "00:00:05", "end": "00:10:00"}, "convert": "fast preview"}]}
+    Вместо cut/convert можно задать "stages" в формате download_worker.
+    Возвращает (правила, прочие параметры для watch_worker)."""
+    with open(path, encoding="utf-8-sig") as f:
+        data = json.load(f)
+    rules = [make_rule(item["folder"], item.get("stages") or stages_from(item.get("cut"), item.get("convert")),
+                       item.get("patterns"))
+             for item in data.get("folders", [])]
+    options = {k: data[k] for k in ("jobs", "settle", "interval") if data.get(k) is not None}
+    return rules, options
+
+def _is_partial(name):
+    # Временные файлы воркеров: имя.partial.mp4
+    return os.path.splitext(os.path.splitext(name)[0])[1] == ".partial"
+
+class WatchState:
+    """Обработанные файлы одной папки: имя → размер, mtime и итог."""
+    def __init__(self, folder):
+        self.path = os.path.join(folder, STATE_NAME)
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+
+    def is_processed(self, name, st):
+        with self._lock:
+            entry = self.entries.get(name)
+        return bool(entry) and entry.get("size") == st.st_size and entry.get("mtime_ns") == st.st_mtime_ns
+
+    def record(self, name, st, ok, outputs=()):
+        """Запоминает файл и его результаты — чтобы они сами не попали в обработку."""
+        folder = os.path.dirname(self.path)
+        with self._lock:
+            self.entries[name] = {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "ok": ok,
+                                  "outputs": [os.path.basename(p) for p in outputs]}
+            for out in outputs:
+                if os.path.dirname(os.path.abspath(out)) == folder and os.path.exists(out):
+                    out_st = os.stat(out)
+                    self.entries[os.path.basename(out)] = {"size": out_st.st_size, "mtime_ns": out_st.st_mtime_ns,
+                                                           "ok": True, "source": name}
+            self._save()
+
+    def _save(self):
+        tmp = self.path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
+
+def _scan(rule):
+    """[(путь, stat)] файлов папки, подходящих под шаблоны правила."""
+    found = []
+    with os.scandir(rule["folder"]) as entries:
+        for entry in entries:
+            name = entry.name
+            if name.startswith(".") or _is_partial(name) or not entry.is_file():
+                continue
+            if any(fnmatch.fnmatch(name.lower(), p.lower()) for p in rule["patterns"]):
+                found.append((entry.path, entry.stat()))
+    return found
+
+def watch_worker(rules, queue, cancel_event, jobs=None, interval=POLL_SECONDS, settle=SETTLE_SECONDS):
+    """Следит за папками правил, пока не выставлен cancel_event.
+
+    Сообщения идут с task "watch": status на каждое событие, job_start/job_status/job_done
+    по файлам; метрики этапов пересылаются как есть. Прерванный отменой файл не
+    запоминается и будет обработан после перезапуска.
+    """
+    states = {rule["folder"]: WatchState(rule["folder"]) for rule in rules}
+    pending = {}    # путь → ((размер, mtime), когда его впервые увидели таким)
+    busy = set()    # файлы в работе и их будущие результаты
+    missing = set()
+    lock = threading.Lock()
+    next_id = [0]
+    pool = ThreadPoolExecutor(max_workers=jobs or WATCH_JOBS)
+
+    def process(job_id, rule, path, st, outputs):
+        state, name = states[rule["folder"]], os.path.basename(path)
+        queue.put(("watch", "job_start", (job_id, path)))
+        queue.put(("watch", "status", f"{name}: обработка"))
+        current, produced, error = path, [], None
+        try:
+            for stage in rule["stages"]:
+                try:
+                    current, error = run_stage(stage, current, queue, cancel_event, job_id, lambda frac: None, task="watch")
+                except Exception as e:
+                    error = str(e)
+                if error:
+                    break
+                produced.append(current)
+            if cancel_event.is_set():
+                return
+            if error is None and not all(os.path.exists(p) for p in produced):
+                error = "результат не создан"
+            # Сломанный файл тоже запоминается — иначе он брался бы на каждом опросе
+            state.record(name, st, error is None, produced)
+            queue.put(("watch", "status", f"{name}: ошибка — {error}" if error else f"{name}: готово"))
+            queue.put(("watch", "job_done", (job_id, error is None)))
+        finally:
+            with lock:
+                busy.difference_update([path] + outputs)
+
+    def submit(rule, path, st):
+        # Будущие результаты тоже заняты: они появятся в той же папке до конца обработки
+        outputs, current = [], path
+        for stage in rule["stages"]:
+            current = stage_output_path(stage, current)
+            outputs.append(current)
+        with lock:
+            busy.update([path] + outputs)
+        job_id, next_id[0] = next_id[0], next_id[0] + 1
+        pool.submit(process, job_id, rule, path, st, outputs)
+
+    queue.put(("watch", "status", "Наблюдение: " + ", ".join(rule["folder"] for rule in rules)))
+    try:
+        while not cancel_event.is_set():
+            now = time.monotonic()
+            for rule in rules:
+                try:
+                    files = _scan(rule)
+                except OSError as e:
+                    if rule["folder"] not in missing:
+                        missing.add(rule["folder"])
+                        queue.put(("watch", "status", f"Папка недоступна: {e}"))
+                    continue
+                missing.discard(rule["folder"])
+                state = states[rule["folder"]]
+                present = {path for path, _ in files}
+                for path in [p for p in pending if os.path.dirname(p) == rule["folder"] and p not in present]:
+                    del pending[path]
+                for path, st in files:
+                    with lock:
+                        if path in busy:
+                            continue
+                    # Пустой файл — копирование ещё не началось
+                    if st.st_size == 0 or state.is_processed(os.path.basename(path), st):
+                        pending.pop(path, None)
+                        continue
+                    key = (st.st_size, st.st_mtime_ns)
+                    seen = pending.get(path)
+                    if seen is None or seen[0] != key:
+                        pending[path] = (key, now)
+                    elif now - seen[1] >= settle:
+                        del pending[path]
+                        submit(rule, path, st)
+            cancel_event.wait(interval)
+    finally:
+        # Отмена видна этапам через тот же cancel_event — ждём, пока они остановятся
+        pool.shutdown(wait=True)
+    queue.put(("watch", "status", "Наблюдение остановлено"))
@@ -1,172 +1,874 @@
 import os
-import time
 import subprocess
-import re
-import sys 
-from pathlib import Path  
-import yt_dlp
-from utils import hms_to_seconds, seconds_to_hms, parse_ffmpeg_time, run_ffprobe, STARTUPINFO
+import shutil
+import tempfile
+import threading
+from collections import deque
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from utils import hms_to_seconds, seconds_to_hms, STARTUPINFO
+from probe_cache import get_cache as get_probe_cache
+from progress_reader import PROGRESS_ARGS, read_progress, follow_progress_file
+from scheduler import JobScheduler, BatchProgress, plan_concurrency
+from command_builder import (
+    build_convert_cmd, validate_settings, available_encoders, apply_preset,
+    build_two_pass_cmds, target_video_bitrate, audio_bitrate_bps,
+    stream_plan, describe_plan, plan_kind,
+)
+from manifest import input_fingerprint, command_recipe, temp_output, get_manifest, commit_outputs
+from metrics import JobStats, current_stats, wait_process
+import supervisor
+import tools
+from chunked import (
+    chunk_count, plan_chunks, build_chunk_cmd, build_audio_cmd, build_join_cmd,
+    CHUNK_RETRIES, CHUNK_EXT, AUDIO_EXT,
+)
+from scenes import build_analysis_cmd, read_analysis, load_cached, store_cached, propose_segments
+from smartcut import (can_smart_cut, probe_keyframes, plan_smart_cut, edge_encode_args, build_piece_cmd,
+                      start_time, ANNEXB_FILTERS, KEYFRAME_WINDOW, EPS)
+
+# Сколько обрезок (stream copy) выполнять одновременно — упор в диск
+CUT_MAX_JOBS = 4
+
+def _run_ffmpeg(cmd, scheduler, on_progress, cwd=None):
+    """Запускает ffmpeg с `-progress pipe:1` и передаёт ProgressEvent в on_progress.
+
+    Процессорное время и итоговые fps/speed попадают в JobStats текущей задачи.
+    Возвращает (код выхода, последние строки stderr). При отмене процесс
+    убивает планировщик, pipe закрывается и чтение завершается само.
+    """
+    cmd = cmd[:1] + PROGRESS_ARGS + ["-loglevel", "error"] + cmd[1:]
+    # stdin открыт: через него supervisor просит ffmpeg завершиться (`q`)
+    proc = supervisor.spawn(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, startupinfo=STARTUPINFO, cwd=cwd)
+    scheduler.register(proc)
+    # stderr нужно вычитывать параллельно, иначе ffmpeg встанет на заполненном pipe
+    err_tail = deque(maxlen=20)
+    err_thread = threading.Thread(target=lambda: err_tail.extend(proc.stderr), daemon=True)
+    err_thread.start()
+    last = [None]
+    def track(ev):
+        last[0] = ev
+        on_progress(ev)
+    try:
+        read_progress(proc.stdout, track)
+        code, cpu = wait_process(proc)
+        stats = current_stats()
+        if stats is not None:
+            stats.add_process(cpu, last[0])
+        err_thread.join(timeout=1)
+        return code, b"".join(err_tail).decode("utf-8", "replace").strip()
+    finally:
+        scheduler.unregister(proc)
+        supervisor.release(proc)
+
+def _resolve_ffmpeg(task, queue):
+    """Путь к ffmpeg (найден один раз на процесс, см. tools) или сообщение об ошибке в очередь."""
+    try:
+        return tools.ffmpeg_exe()
+    except tools.ToolError as e:
+        queue.put((task, "error", str(e)))
+        return None
+
+def cut_output_path(path, suffix):
+    """Куда обрезка (или склейка фрагментов) кладёт результат для файла path."""
+    name, ext = os.path.splitext(path)
+    return f"{name}{suffix}{ext}"
+
+def convert_output_path(path, settings):
+    name, _ = os.path.splitext(path)
+    return f"{name}{settings.get('suffix')}.{settings.get('out_format')}"
 
 # === ОБРЕЗКА (CUT) ===
-def cut_worker(files, start_str, end_str, suffix, queue, cancel_event):
-    total = len(files)
-    start_sec = hms_to_seconds(start_str)
-    end_sec = hms_to_seconds(end_str)
-    dur = end_sec - start_sec
-
-    if getattr(sys, 'frozen', False):
-        base_path = Path(sys.executable).parent
-    else:
-        base_path = Path(__file__).parent
-    
-    ffmpeg_exe = str((base_path / "ffmpeg" / "bin" / "ffmpeg.exe").absolute())
+def build_cut_cmd(ffmpeg_exe, path, spans, outnames):
+    """Одна команда ffmpeg на все фрагменты файла.
+
+    Каждый фрагмент — отдельный вход того же файла с быстрым -ss до -i,
+    поэтому ffmpeg не читает всё между фрагментами, а открывается один раз на пачку.
+    """
+    cmd = [ffmpeg_exe, "-hide_banner", "-y"]
+    for start, end in spans:
+        cmd += ["-ss", f"{start:.3f}", "-t", f"{end - start:.3f}", "-i", path]
+    for i, outname in enumerate(outnames):
+        # Как и при выборе потоков по умолчанию: одно видео и одно аудио, если они есть
+        cmd += ["-map", f"{i}:v:0?", "-map", f"{i}:a:0?", "-c", "copy", "-map_metadata", "-1", outname]
+    return cmd
+
+def build_concat_list(paths):
+    """Содержимое списка для concat demuxer (с экранированием кавычек)."""
+    lines = []
+    for p in paths:
+        escaped = os.path.abspath(p).replace("'", "'\\''")
+        lines.append(f"file '{escaped}'")
+    return "\n".join(lines) + "\n"
+
+def cut_worker(files, start_str, end_str, suffix, queue, cancel_event, jobs=None, probes=None, segments=None, concat=False, smart=False, skip_done=True):
+    """Обрезает файлы. segments — список (начало, конец) вместо одного start_str/end_str;
+    при concat=True фрагменты склеиваются в один файл без перекодирования;
+    smart=True — точная до кадра обрезка с перекодированием только краёв;
+    skip_done=True — пропускать результаты, уже сделанные той же командой из того же файла."""
+    if not segments:
+        segments = [(start_str, end_str)]
+    spans = [(hms_to_seconds(a), hms_to_seconds(b)) for a, b in segments]
+
+    ffmpeg_exe = _resolve_ffmpeg("cut", queue)
+    if not ffmpeg_exe:
+        return
 
-    if dur <= 0:
+    if any(end - start <= 0 for start, end in spans):
         queue.put(("cut", "error", "Конечное время должно быть больше начального"))
         return
 
-    for idx, path in enumerate(files, start=1):
-        if cancel_event.is_set():
-            queue.put(("cut", "status", "Операция отменена"))
-            return
+    # Обрезка без перекодирования упирается в диск, а не в процессор,
+    # поэтому много параллельных копий смысла не имеют
+    jobs, _ = plan_concurrency(jobs, threads=1)
+    jobs = min(jobs, CUT_MAX_JOBS)
+    scheduler = JobScheduler(jobs, cancel_event)
+    # Вес файла — суммарная длина фрагментов; если файл короче конца отрезка и
+    # длительность известна из заранее сделанного ffprobe, учитываем это
+    probes = probes or {}
+    def file_spans(path):
+        file_dur = float(probes.get(path, {}).get("format", {}).get("duration", 0) or 0)
+        if file_dur <= 0:
+            return spans
+        return [(s, min(e, file_dur)) for s, e in spans if s < file_dur] or spans
+    lengths = [max(e - s for s, e in file_spans(p)) for p in files]
+    batch = _Batch("cut", queue, [sum(e - s for s, e in file_spans(p)) for p in files])
+
+    def job(job_id, path):
+        if cancel_event.is_set(): return False
+        with JobStats("cut", job_id, [path], smart=smart, concat=concat, segments=len(spans)) as stats:
+            ok, outputs = cut_file(job_id, path)
+        if ok is not None:
+            queue.put(("cut", "metrics", stats.result(ok, outputs)))
+        return ok is not False and not cancel_event.is_set()
 
-        queue.put(("cut", "update_index", (idx, total)))
+    def cut_file(job_id, path):
+        """(ok, итоговые файлы); ok=None — задача прервана или пропущена, метрик нет."""
+        queue.put(("cut", "job_start", (job_id, path)))
         folder, fname = os.path.split(path)
         name, ext = os.path.splitext(fname)
-        outname = os.path.join(folder, f"{name}{suffix}{ext}")
-
-        cmd = [
-            ffmpeg_exe, "-hide_banner", "-y",
-            "-ss", start_str, "-i", path,
-            "-t", seconds_to_hms(dur),
-            "-c", "copy", "-map_metadata", "-1", outname
-        ]
+        joined = cut_output_path(path, suffix)
+        if len(spans) == 1:
+            outnames = [joined]
+        else:
+            outnames = [os.path.join(folder, f"{name}{suffix}_{i:02d}{ext}") for i in range(1, len(spans) + 1)]
+        finals = [joined] if concat and len(outnames) > 1 else outnames
 
         try:
-            proc = subprocess.Popen(cmd, stderr=subprocess.PIPE, universal_newlines=True, startupinfo=STARTUPINFO)
-            while True:
-                if cancel_event.is_set():
-                    proc.terminate()
-                    queue.put(("cut", "status", "Обрезка прервана"))
-                    return
-                line = proc.stderr.readline()
-                if not line:
-                    if proc.poll() is not None: break
-                    time.sleep(0.05)
-                    continue
-                cur = parse_ffmpeg_time(line)
-                if cur is not None:
-                    pct = (cur - start_sec) / dur * 100 if dur > 0 else 0
-                    queue.put(("cut", "progress", int(pct)))
-            queue.put(("cut", "progress", 100))
+            probe = (probes.get(path) or get_probe_cache().get(path)) if (smart or skip_done) else None
+            fingerprint = input_fingerprint(path, probe)
         except Exception as e:
-            queue.put(("cut", "error", str(e)))
-            continue
-    queue.put(("cut", "done", None))
+            return batch.fail(job_id, fname, e), ()
+        recipe = command_recipe(build_cut_cmd(ffmpeg_exe, path, spans, outnames), smart=smart, concat=concat)
+        if skip_done and all(get_manifest(folder).is_done(f, fingerprint, recipe) for f in finals):
+            batch.skip(job_id, fname)
+            return None, ()
+        tmp_outnames = [temp_output(o) for o in outnames]
+        tmp_joined = temp_output(joined)
+
+        def report(frac, ev=None):
+            batch.report(job_id, frac, ev)
+
+        def on_progress(ev):
+            # При -ss перед -i время выхода отсчитывается от начала фрагмента;
+            # фрагменты пишутся параллельно, так что ориентируемся на самый длинный
+            report(ev.out_time / lengths[job_id], ev)
+
+        # Недописанные временные файлы удаляются при ошибке и отмене
+        with supervisor.partial_outputs(tmp_outnames + [tmp_joined]):
+            try:
+                if smart and can_smart_cut(probe):
+                    code, err = _smart_cut_file(ffmpeg_exe, path, probe, spans, tmp_outnames, scheduler, cancel_event, report)
+                else:
+                    if smart:
+                        queue.put(("cut", "status", f"{fname}: точная обрезка не поддерживается для этого кодека, режем по ключевым кадрам"))
+                    code, err = _run_ffmpeg(build_cut_cmd(ffmpeg_exe, path, spans, tmp_outnames), scheduler, on_progress)
+                if code == 0 and concat and len(outnames) > 1 and not cancel_event.is_set():
+                    code, err = _concat_parts(ffmpeg_exe, tmp_outnames, tmp_joined, scheduler)
+                    tmp_outnames = [tmp_joined]
+                if code == 0 and not cancel_event.is_set():
+                    commit_outputs(zip(finals, tmp_outnames), fingerprint, recipe)
+            except Exception as e:
+                return batch.fail(job_id, fname, e), ()
+        if cancel_event.is_set(): return None, ()
+        ok = batch.finish(job_id, code == 0, None if code == 0 else _error_status(fname, code, err))
+        return ok, finals
+
+    scheduler.run(job, files)
+    if cancel_event.is_set():
+        queue.put(("cut", "status", "Обрезка прервана"))
+        return
+    queue.put(("cut", "done", batch.failed))
+
+def _batch_probes(task, queue, files, probes):
+    """ffprobe всех files в порядке списка. Обычно всё уже проанализировано списком
+    файлов вкладки; недостающее пробуем одной параллельной пачкой."""
+    probes = dict(probes or {})
+    missing = [p for p in files if p not in probes]
+    if missing:
+        queue.put((task, "status", f"Анализ файлов... (Всего файлов: {len(files)})"))
+        probes.update(get_probe_cache().prefetch(missing))
+    return [probes[p] for p in files]
+
+def _duration(probe):
+    return float((probe or {}).get("format", {}).get("duration", 0) or 0)
+
+def _error_status(fname, code, err):
+    return f"Ошибка в {fname}: {err.splitlines()[-1] if err else code}"
+
+class _Batch:
+    """Прогресс пачки файлов воркера и завершение каждого файла.
+
+    Все воркеры завершают файл одинаково: статус (если есть), job_done, полная доля
+    файла в общем прогрессе и счётчик готовых файлов (update_index). Ошибка одного
+    файла пачку не останавливает — "error" остаётся для сбоев всей пачки, а число
+    неудачных файлов (failed) воркер отдаёт в итоговом "done".
+    """
+    def __init__(self, task, queue, weights):
+        self.task = task
+        self.queue = queue
+        self.total = len(weights)
+        self.progress = BatchProgress(weights)
+        self.finished = 0
+        self.failed = 0
+        self._lock = threading.Lock()
+
+    def report(self, job_id, frac, ev=None):
+        self.queue.put((self.task, "job_progress", (job_id, int(min(frac, 1.0) * 100), ev)))
+        self.queue.put((self.task, "progress", self.progress.update(job_id, frac)))
+        self.queue.put((self.task, "eta", self.progress.eta()))
+
+    def finish(self, job_id, ok, status=None):
+        if status:
+            self.queue.put((self.task, "status", status))
+        self.queue.put((self.task, "job_done", (job_id, ok)))
+        self.queue.put((self.task, "progress", self.progress.update(job_id, 1.0)))
+        with self._lock:
+            self.finished += 1
+            if not ok:
+                self.failed += 1
+            self.queue.put((self.task, "update_index", (self.finished, self.total)))
+        return ok
+
+    def fail(self, job_id, fname, exc):
+        """Файл не обработан из-за исключения: сообщаем об ошибке и идём к следующему."""
+        return self.finish(job_id, False, f"Ошибка в {fname}: {exc}")
+
+    def skip(self, job_id, fname):
+        """Результат уже есть и сделан той же командой из того же файла — засчитываем без запуска ffmpeg."""
+        return self.finish(job_id, True, f"{fname}: уже обработан, пропуск")
+
+def _smart_cut_file(ffmpeg_exe, path, probe, spans, outnames, scheduler, cancel_event, report):
+    """Точная обрезка: середина каждого фрагмента копируется, края между границей и
+    ближайшим ключевым кадром перекодируются с параметрами исходника, затем всё склеивается."""
+    total_len = sum(e - s for s, e in spans)
+    done = 0.0
+    code, err = 0, ""
+    offset = start_time(probe)
+    annexb = ANNEXB_FILTERS.get(next((s.get("codec_name") for s in probe.get("streams", [])
+                                      if s.get("codec_type") == "video"), None))
+    for (start, end), outname in zip(spans, outnames):
+        base, ext = os.path.splitext(outname)
+        pieces = plan_smart_cut(probe_keyframes(path, start, end, tools.ffprobe_exe(), offset), start, end)
+        encode_args = edge_encode_args(probe, ext)
+        parts = []
+        for i, (kind, p_start, p_end) in enumerate(pieces):
+            if cancel_event.is_set():
+                break
+            part = outname if len(pieces) == 1 else f"{base}.part{i}{ext}"
+            parts.append(part)
+            cmd = build_piece_cmd(ffmpeg_exe, path, kind, p_start, p_end, encode_args, part)
+            code, err = _run_ffmpeg(cmd, scheduler, lambda ev: report((done + ev.out_time) / total_len, ev))
+            done += p_end - p_start
+            if code != 0:
+                break
+        if code == 0 and len(parts) > 1 and not cancel_event.is_set():
+            code, err = _concat_parts(ffmpeg_exe, parts, outname, scheduler, annexb)
+        elif len(parts) > 1:
+            # Недоделанные куски не оставляем рядом с исходником
+            for part in parts:
+                if os.path.exists(part):
+                    os.remove(part)
+        if code != 0 or cancel_event.is_set():
+            break
+    return code, err
+
+def _concat_parts(ffmpeg_exe, parts, outname, scheduler, annexb=None):
+    """Склеивает готовые фрагменты через concat demuxer (-c copy). Фрагменты удаляются
+    и при ошибке — это промежуточные файлы, без склейки они не нужны.
+
+    annexb — фильтр из smartcut.ANNEXB_FILTERS: куски с разными SPS/PPS сначала
+    перепаковываются в MPEG-TS, где параметры идут в потоке перед ключевыми кадрами.
+    """
+    list_path = outname + ".concat.txt"
+    sources = [p + ".ts" for p in parts] if annexb else parts
+    try:
+        code, err = 0, ""
+        if annexb:
+            for part, ts in zip(parts, sources):
+                cmd = [ffmpeg_exe, "-hide_banner", "-y", "-i", part, "-c", "copy",
+                       "-bsf:v", annexb, "-f", "mpegts", ts]
+                code, err = _run_ffmpeg(cmd, scheduler, lambda ev: None)
+                if code != 0:
+                    return code, err
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.write(build_concat_list(sources))
+        cmd = [ffmpeg_exe, "-hide_banner", "-y", "-f", "concat", "-safe", "0", "-i", list_path,
+               "-c", "copy", "-map_metadata", "-1", outname]
+        code, err = _run_ffmpeg(cmd, scheduler, lambda ev: None)
+    finally:
+        for tmp in [list_path] + (sources if annexb else []) + parts:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+    return code, err
 
 # === КОНВЕРТАЦИЯ (CONVERT) ===
-def convert_worker(files, settings, queue, cancel_event):
-    total = len(files)
-    if getattr(sys, 'frozen', False):
-        base_path = Path(sys.executable).parent
-    else:
-        base_path = Path(__file__).parent
-    
-    ffmpeg_exe = str((base_path / "ffmpeg" / "bin" / "ffmpeg.exe").absolute())
+def convert_worker(files, settings, queue, cancel_event, jobs=None, threads=None, probes=None):
+    ffmpeg_exe = _resolve_ffmpeg("conv", queue)
+    if not ffmpeg_exe:
+        return
 
-    for idx, path in enumerate(files, start=1):
-        if cancel_event.is_set():
-            queue.put(("conv", "status", "Операция отменена"))
-            return
+    if settings.get("preset_name"):
+        settings = apply_preset(settings["preset_name"], settings)
+    errors = validate_settings(settings, available_encoders(ffmpeg_exe))
+    if errors:
+        queue.put(("conv", "error", "\n".join(errors)))
+        return
+
+    target_bytes = int(float(settings.get("target_size_mb") or 0) * 1024 * 1024)
+    # Деление на куски: файлы идут по одному, а параллельно кодируются куски каждого.
+    # Под целевой размер и без перекодирования (copy) делить нечего
+    chunked = bool(settings.get("chunked")) and not target_bytes and settings.get("vcodec") != "copy"
+    if chunked:
+        chunk_workers, chunk_threads = plan_concurrency(jobs or settings.get("jobs"), threads or settings.get("threads"))
+        jobs = 1
+    jobs, threads = plan_concurrency(jobs or settings.get("jobs"), threads or settings.get("threads"))
+    scheduler = JobScheduler(jobs, cancel_event)
+
+    # Длительности нужны для весов общего прогресса
+    probes = _batch_probes("conv", queue, files, probes)
+    durations = [_duration(p) for p in probes]
+    batch = _Batch("conv", queue, durations)
+
+    labels = {k: settings.get(k) for k in ("preset_name", "vcodec", "preset", "crf", "resolution", "target_size_mb")}
 
-        queue.put(("conv", "update_index", (idx, total)))
+    def job(job_id, path):
+        if cancel_event.is_set(): return False
+        with JobStats("conv", job_id, [path], threads=threads, **labels) as stats:
+            ok, outputs = convert_file(job_id, path)
+        if ok is not None:
+            queue.put(("conv", "metrics", stats.result(ok, outputs)))
+        return ok is not False and not cancel_event.is_set()
+
+    def convert_file(job_id, path):
+        """(ok, итоговые файлы); ok=None — задача прервана или пропущена, метрик нет."""
+        queue.put(("conv", "job_start", (job_id, path)))
         folder, fname = os.path.split(path)
         name, ext = os.path.splitext(fname)
-        outname = os.path.join(folder, f"{name}{settings.get('suffix')}.{settings.get('out_format')}")
-
-        probe = run_ffprobe(path)
-        dur = float(probe.get("format", {}).get("duration", 0))
-        
-        # Настройки видео/аудио
-        cmd = [ffmpeg_exe, "-hide_banner", "-y", "-i", path, "-c:v", "libx264", "-movflags", "+faststart"]
-        
-        # Защита от нечетных разрешений (pad)
-        res_mode = settings.get('resolution')
-        if res_mode and res_mode != "copy":
-            if ":-1" in res_mode:
-                size = res_mode.split(":")[0]
-                cmd += ["-vf", f"scale='trunc(oh*a/2)*2:{size}'" if "height" in res_mode else f"scale='{size}:trunc(ow/a/2)*2'"]
-            else:
-                cmd += ["-vf", f"scale={res_mode}:force_original_aspect_ratio=decrease,pad='ceil(iw/2)*2:ceil(ih/2)*2'"]
-
-        cmd += ["-map_metadata", "-1", outname]
+        outname = convert_output_path(path, settings)
+        dur = durations[job_id]
 
+        # Потоки, которые уже в нужном виде, копируются — перекодировать их незачем
         try:
-            proc = subprocess.Popen(cmd, stderr=subprocess.PIPE, universal_newlines=True, startupinfo=STARTUPINFO)
-            while True:
-                if cancel_event.is_set():
-                    proc.terminate()
-                    return
-                line = proc.stderr.readline()
-                if not line:
-                    if proc.poll() is not None: break
-                    continue
-                cur = parse_ffmpeg_time(line)
-                if cur is not None and dur > 0:
-                    queue.put(("conv", "progress", int((cur / dur) * 100)))
-            queue.put(("conv", "progress", 100))
+            plan = stream_plan(settings, probes[job_id])
+            cmd = build_convert_cmd(ffmpeg_exe, path, outname, settings, threads, plan)
+            fingerprint = input_fingerprint(path, probes[job_id])
         except Exception as e:
-            queue.put(("conv", "error", str(e)))
-    queue.put(("conv", "done", None))
+            return batch.fail(job_id, fname, e), ()
+        use_chunks = chunked and plan["video"] == "encode" and chunk_count(dur, chunk_workers) > 1
+        recipe = command_recipe(cmd, target_size_mb=settings.get("target_size_mb") or 0, chunked=use_chunks)
+        if settings.get("skip_done", True) and get_manifest(folder).is_done(outname, fingerprint, recipe):
+            batch.skip(job_id, fname)
+            return None, ()
+        current_stats().labels["path"] = plan_kind(plan)
+        queue.put(("conv", "status", f"{fname}: {describe_plan(plan)}"))
+        tmp_outname = temp_output(outname)
+        cmd = build_convert_cmd(ffmpeg_exe, path, tmp_outname, settings, threads, plan)
+
+        def on_progress(ev):
+            if dur <= 0: return
+            batch.report(job_id, ev.out_time / dur, ev)
+
+        with supervisor.partial_outputs([tmp_outname]):
+            try:
+                if target_bytes:
+                    code, err = _encode_to_size(ffmpeg_exe, path, tmp_outname, settings, probes[job_id], dur,
+                                                target_bytes, threads, scheduler, cancel_event, on_progress)
+                elif use_chunks:
+                    code, err = _encode_chunked(ffmpeg_exe, path, tmp_outname, settings, probes[job_id], dur,
+                                                chunk_workers, chunk_threads, cancel_event, on_progress,
+                                                copy_audio=plan["audio"] == "copy")
+                else:
+                    code, err = _run_ffmpeg(cmd, scheduler, on_progress)
+                if code == 0 and not cancel_event.is_set():
+                    commit_outputs([(outname, tmp_outname)], fingerprint, recipe)
+            except Exception as e:
+                return batch.fail(job_id, fname, e), ()
+        if cancel_event.is_set(): return None, ()
+        ok = batch.finish(job_id, code == 0, None if code == 0 else _error_status(fname, code, err))
+        return ok, [outname]
+
+    scheduler.run(job, files)
+    if cancel_event.is_set():
+        queue.put(("conv", "status", "Конвертация прервана"))
+        return
+    queue.put(("conv", "done", batch.failed))
+
+# Доля первого (быстрого, без звука) прохода в прогрессе кодирования под размер
+FIRST_PASS_WEIGHT = 0.3
+SIZE_RETRIES = 2
+
+def _encode_to_size(ffmpeg_exe, path, outname, settings, probe, dur, target_bytes, threads, scheduler, cancel_event, on_progress):
+    """Двухпроходное кодирование под целевой размер.
+
+    Битрейт видео считается из длительности и битрейта звука. Если контейнер всё же
+    вылез за лимит, второй проход повторяется с пропорционально меньшим битрейтом —
+    статистика первого прохода от битрейта не зависит и переиспользуется.
+    """
+    bitrate = target_video_bitrate(target_bytes, dur, audio_bitrate_bps(settings, probe))
+    if not bitrate or bitrate <= 0:
+        return 1, "Целевой размер слишком мал для такой длительности и битрейта звука"
+
+    passdir = tempfile.mkdtemp(prefix="neat_ffmpeg_pass_")
+    passlog = os.path.join(passdir, "pass")
+
+    def stage(lo, hi):
+        # Переводит время внутри прохода в долю [lo, hi] общего прогресса файла
+        return lambda ev: on_progress(ev._replace(out_time=dur * (lo + (hi - lo) * ev.out_time / dur)))
+
+    try:
+        first, second = build_two_pass_cmds(ffmpeg_exe, path, outname, settings, bitrate, passlog, threads)
+        code, err = _run_ffmpeg(first, scheduler, stage(0.0, FIRST_PASS_WEIGHT))
+        if code != 0:
+            return code, err
+        for attempt in range(SIZE_RETRIES + 1):
+            if cancel_event.is_set():
+                return code, err
+            _, second = build_two_pass_cmds(ffmpeg_exe, path, outname, settings, bitrate, passlog, threads)
+            code, err = _run_ffmpeg(second, scheduler, stage(FIRST_PASS_WEIGHT, 1.0))
+            if code != 0 or not settings.get("verify_size", True):
+                return code, err
+            size = os.path.getsize(outname)
+            if size <= target_bytes:
+                return code, err
+            # Не влезли — уменьшаем битрейт пропорционально перебору и ещё на 3% про запас
+            bitrate = int(bitrate * target_bytes / size * 0.97)
+        return 1, f"Не удалось уложиться в {target_bytes / 1024 / 1024:.1f} МБ (получилось {size / 1024 / 1024:.1f} МБ)"
+    finally:
+        shutil.rmtree(passdir, ignore_errors=True)
+
+def _encode_chunked(ffmpeg_exe, path, outname, settings, probe, dur, workers, threads, cancel_event, on_progress,
+                    copy_audio=False):
+    """Кодирует файл кусками по ключевым кадрам в workers процессов и склеивает без перекодирования.
+
+    Упавший кусок перезапускается отдельно (до CHUNK_RETRIES раз). Прогресс кусков
+    и звука сводится в общий для файла с весами по длительности.
+    """
+    ffprobe = tools.ffprobe_exe()
+    def first_keyframe(t):
+        return next((k for k in probe_keyframes(path, t, min(t + KEYFRAME_WINDOW, dur), ffprobe) if k >= t), None)
+    spans = plan_chunks(dur, chunk_count(dur, workers), first_keyframe)
+    has_audio = any(s.get("codec_type") == "audio" for s in (probe or {}).get("streams", []))
+
+    workdir = tempfile.mkdtemp(prefix=".neat_chunks_", dir=os.path.dirname(os.path.abspath(outname)))
+    parts = [os.path.join(workdir, f"chunk{i:03d}{CHUNK_EXT}") for i in range(len(spans))]
+    audio_path = os.path.join(workdir, "audio" + AUDIO_EXT) if has_audio else None
+    items = [(i, start, end) for i, (start, end) in enumerate(spans)]
+    if audio_path:
+        items.append((None, 0.0, dur))
+    # Звук кодируется на порядок быстрее видео — даём ему малый вес в прогрессе
+    progress = BatchProgress([end - start if i is not None else (end - start) * 0.05 for i, start, end in items])
+    scheduler = JobScheduler(workers, cancel_event)
+    stats = current_stats()
+
+    def run_piece(job_id, item):
+        i, start, end = item
+        if i is None:
+            cmd = build_audio_cmd(ffmpeg_exe, path, settings, audio_path, copy=copy_audio)
+        else:
+            cmd = build_chunk_cmd(ffmpeg_exe, path, start, end, settings, parts[i], threads, last=i == len(spans) - 1)
+        def report(ev):
+            frac = progress.update(job_id, min(ev.out_time / max(end - start, EPS), 1.0)) / 100
+            on_progress(ev._replace(out_time=dur * frac))
+        with stats.bind() if stats else nullcontext():
+            for attempt in range(CHUNK_RETRIES + 1):
+                code, err = _run_ffmpeg(cmd, scheduler, report)
+                if code == 0 or cancel_event.is_set():
+                    break
+        return code, err
+
+    try:
+        results = scheduler.run(run_piece, items)
+        if cancel_event.is_set():
+            return 1, ""
+        for result in results:
+            if not result or result[0] != 0:
+                return result or (1, "")
+        list_path = os.path.join(workdir, "chunks.txt")
+        with open(list_path, "w", encoding="utf-8") as f:
+            f.write(build_concat_list(parts))
+        return _run_ffmpeg(build_join_cmd(ffmpeg_exe, list_path, audio_path, settings, outname), scheduler, lambda ev: None)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+# === АНАЛИЗ (СЦЕНЫ И ТИШИНА) ===
+def analyze_worker(files, queue, cancel_event, options=None, jobs=None, probes=None, task="cut"):
+    """Ищет смены сцен и тишину и предлагает фрагменты для обрезки.
+
+    На каждый файл — (task, "analysis", (путь, [(начало, конец)])) с временем в секундах;
+    список годится как segments для cut_worker. options — пороги scenes.propose_segments.
+    Проход ffmpeg нужен только для файлов, которых ещё нет в кэше анализа.
+    """
+    ffmpeg_exe = _resolve_ffmpeg(task, queue)
+    if not ffmpeg_exe:
+        return
+    # Декодер и scdet сами используют несколько потоков — как при конвертации, делим ядра
+    jobs, _ = plan_concurrency(jobs)
+    scheduler = JobScheduler(jobs, cancel_event)
+
+    probes = _batch_probes(task, queue, files, probes)
+    durations = [_duration(p) for p in probes]
+    batch = _Batch(task, queue, durations)
+
+    def job(job_id, path):
+        if cancel_event.is_set(): return False
+        fname = os.path.basename(path)
+        dur = durations[job_id]
+        data = load_cached(path)
+        if data is None:
+            streams = probes[job_id].get("streams", [])
+            has_video = any(s.get("codec_type") == "video" for s in streams)
+            has_audio = any(s.get("codec_type") == "audio" for s in streams)
+            if not (has_video or has_audio):
+                return batch.finish(job_id, False, f"{fname}: нет видео и звука")
+
+            def on_progress(ev):
+                if dur <= 0: return
+                batch.report(job_id, ev.out_time / dur, ev)
+
+            workdir = tempfile.mkdtemp(prefix="neat_ffmpeg_scan_")
+            try:
+                with JobStats("scan", job_id, [path]) as stats:
+                    # ffmpeg работает в workdir (туда пишутся файлы метаданных), так что путь — абсолютный
+                    cmd = build_analysis_cmd(ffmpeg_exe, os.path.abspath(path), has_video, has_audio)
+                    code, err = _run_ffmpeg(cmd, scheduler, on_progress, cwd=workdir)
+                if cancel_event.is_set(): return False
+                queue.put((task, "metrics", stats.result(code == 0)))
+                if code != 0:
+                    return batch.finish(job_id, False, _error_status(fname, code, err))
+                data = read_analysis(workdir)
+                store_cached(path, data)
+            finally:
+                shutil.rmtree(workdir, ignore_errors=True)
+        queue.put((task, "analysis", (path, propose_segments(data, dur, **(options or {})))))
+        return batch.finish(job_id, True)
+
+    results = scheduler.run(job, files)
+    if cancel_event.is_set():
+        queue.put((task, "status", "Анализ прерван"))
+        return
+    failed = sum(1 for ok in results if not ok)
+    if failed:
+        queue.put((task, "error", f"Не удалось проанализировать {failed} из {len(files)}"))
+        return
+    queue.put((task, "done", None))
 
 # === ЗАГРУЗКА (YOUTUBE) ===
-def download_worker(url, folder, queue, cancel_event):
-    if getattr(sys, 'frozen', False):
-        base_path = Path(sys.executable).parent
-    else:
-        base_path = Path(__file__).parent
+# Сколько роликов качать одновременно и сколько фрагментов DASH/HLS внутри каждого
+DOWNLOAD_JOBS = 3
+FRAGMENT_THREADS = 4
+# Список уже скачанных ID (формат --download-archive yt-dlp) в папке загрузки
+ARCHIVE_NAME = ".neat_ffmpeg_archive.txt"
+
+# Сколько файлов одновременно обрабатывать после скачивания. Кодирование и так
+# занимает все ядра, поэтому один — зато следующий ролик качается параллельно
+PIPELINE_JOBS = 1
+
+class _Canceled(Exception):
+    pass
+
+class _StageQueue:
+    """Очередь для cut/convert-воркера внутри конвейера загрузки (и наблюдения за папками).
+
+    Прогресс этапа превращается в статус строки ролика на вкладке скачивания,
+    а итог (done/error) запоминается, чтобы решить, запускать ли следующий этап.
+    Неудача липкая: завершающий пачку done не отменяет job_done с ошибкой.
+    """
+    def __init__(self, queue, job_id, label, on_fraction, task="dl"):
+        self.queue = queue
+        self.job_id = job_id
+        self.label = label
+        self.on_fraction = on_fraction
+        self.task = task
+        self.ok = None
+        self.error = None
+        self._status = None
+
+    def put(self, item):
+        _, msg_type, data = item
+        if msg_type == "status":
+            # Причина ошибки файла приходит статусом прямо перед job_done
+            self._status = data
+        elif msg_type == "progress":
+            self.queue.put((self.task, "job_status", (self.job_id, f"{self.label} {int(data)}%")))
+            self.on_fraction(data / 100)
+        elif msg_type == "done":
+            if self.ok is None:
+                self.ok = True
+        elif msg_type == "error":
+            self.ok = False
+            self.error = data
+        elif msg_type == "job_done" and not data[1]:
+            self.ok = False
+            self.error = self.error or self._status
+        elif msg_type in ("metrics", "log"):
+            # Метрики этапа нужны в общем логе так же, как у отдельного запуска
+            self.queue.put(item)
+
+def _stage_settings(stage):
+    settings = dict(stage["settings"])
+    settings.setdefault("suffix", "_conv")
+    settings.setdefault("out_format", "mp4")
+    return settings
 
-    # Путь именно к папке bin, где лежат exe файлы
-    ffmpeg_bin_dir = (base_path / "ffmpeg" / "bin").absolute()
-    
-    # 1. Принудительно добавляем путь в окружение процесса
-    env = os.environ.copy()
-    env["PATH"] = f"{ffmpeg_bin_dir}{os.pathsep}{env.get('PATH', '')}"
+def stage_output_path(stage, path):
+    """Куда этап запишет результат для входа path."""
+    if stage["type"] == "cut":
+        return cut_output_path(path, stage.get("suffix", "_cut"))
+    if stage["type"] == "convert":
+        return convert_output_path(path, _stage_settings(stage))
+    raise ValueError(f"Неизвестный этап: {stage['type']}")
 
+def run_stage(stage, path, queue, cancel_event, job_id, on_fraction, task="dl"):
+    """Выполняет один этап конвейера над path. Возвращает (путь результата, ошибка или None).
+    Этапы используются после скачивания и в режиме наблюдения за папками (watcher)."""
+    outname = stage_output_path(stage, path)
+    if stage["type"] == "cut":
+        sq = _StageQueue(queue, job_id, "Обрезка", on_fraction, task)
+        cut_worker([path], stage["start"], stage["end"], stage.get("suffix", "_cut"), sq, cancel_event,
+                   jobs=1, smart=stage.get("smart", False))
+    else:
+        sq = _StageQueue(queue, job_id, "Конвертация", on_fraction, task)
+        convert_worker([path], _stage_settings(stage), sq, cancel_event, jobs=1)
+    if not sq.ok or sq.error:
+        return None, sq.error or "ошибка обработки"
+    if not os.path.exists(outname):
+        return None, f"{os.path.basename(outname)} не создан"
+    return outname, None
+
+def _ydl_logger(cancel_event, queue):
+    # Предупреждения и ошибки yt-dlp идут в ту же очередь, что и прогресс (msg_type "log")
     class MyLogger:
         def debug(self, msg): 
-            if cancel_event.is_set(): raise Exception("CANCELED")
+            if cancel_event.is_set(): raise _Canceled("CANCELED")
         def info(self, msg): pass
-        def warning(self, msg): print(f"WARN: {msg}")
-        def error(self, msg): print(f"ERR: {msg}")
+        def warning(self, msg): queue.put(("dl", "log", ("warning", msg)))
+        def error(self, msg): queue.put(("dl", "log", ("error", msg)))
+    return MyLogger()
 
-    def progress_hook(d):
-        if cancel_event.is_set(): raise Exception("CANCELED")
-        if d['status'] == 'downloading':
-            p = d.get('_percent_str', '0%').replace('%','').strip()
-            try:
-                val = int(float(p))
-                queue.put(("dl", "progress", val))
-                queue.put(("dl", "status", f"Загрузка: {val}%"))
-            except: pass
-
-    ydl_opts = {
-        # ВАЖНО: Тут должен быть путь к ПАПКЕ, где лежит ffmpeg.exe
-        'ffmpeg_location': str(ffmpeg_bin_dir),
+def expand_urls(urls, ydl_opts=None):
+    """Раскрывает плейлисты в отдельные ролики без скачивания: [(url, title, info)]."""
+    import yt_dlp
+    opts = {"extract_flat": "in_playlist", "quiet": True, "skip_download": True}
+    opts.update(ydl_opts or {})
+    items = []
+    with yt_dlp.YoutubeDL(opts) as ydl:
+        for url in urls:
+            info = ydl.extract_info(url, download=False)
+            entries = info.get("entries") if info.get("_type") in ("playlist", "multi_video") else None
+            if entries is None:
+                items.append((info.get("webpage_url") or url, info.get("title") or url, info))
+                continue
+            for entry in entries:
+                if not entry: continue
+                entry_url = entry.get("webpage_url") or entry.get("url")
+                items.append((entry_url, entry.get("title") or entry_url, entry))
+    return items
+
+def download_worker(urls, folder, queue, cancel_event, jobs=None, archive=True, ydl_overrides=None,
+                    stages=None, keep_intermediate=True, section=None, precise_section=False):
+    """Скачивает ссылки (str или список; плейлисты раскрываются) параллельно по jobs штук.
+
+    ydl_overrides дополняют параметры YoutubeDL — например, для локального тестового сервера.
+    stages — этапы обработки каждого скачанного файла по порядку, например
+    [{"type": "cut", "start": "00:01:00", "end": "00:02:00"},
+     {"type": "convert", "settings": {"preset_name": "fast preview"}}].
+    Они запускаются сразу после загрузки ролика, пока следующие ещё качаются.
+    keep_intermediate=False удаляет скачанный и промежуточные файлы после успешной обработки.
+    section=("ЧЧ:ММ:СС", "ЧЧ:ММ:СС") скачивает только этот отрезок каждого ролика;
+    precise_section перекодирует его, чтобы границы были точно по времени, а не по ключевым кадрам.
+    """
+    # yt_dlp тяжёлый и нужен только здесь — не грузим его ради обрезки/конвертации
+    import yt_dlp
+    if isinstance(urls, str):
+        urls = [urls]
+    base_opts = {
         # Формат: просим лучшее видео и аудио
         'format': 'bestvideo[ext=mp4]+bestaudio[ext=m4a]/best[ext=mp4]/best',
         'outtmpl': os.path.join(folder, '%(title)s.%(ext)s'),
         'merge_output_format': 'mp4',
-        'progress_hooks': [progress_hook],
-        'logger': MyLogger(),
+        'concurrent_fragment_downloads': FRAGMENT_THREADS,
+        'logger': _ydl_logger(cancel_event, queue),
         'nocheckcertificate': True,
     }
+    # Папка того же ffmpeg, что у обрезки и конвертации; без него yt-dlp качает только готовые файлы
+    if tools.ffmpeg_dir():
+        base_opts['ffmpeg_location'] = tools.ffmpeg_dir()
+    if archive:
+        base_opts['download_archive'] = os.path.join(folder, ARCHIVE_NAME)
+    if section:
+        start, end = hms_to_seconds(section[0]), hms_to_seconds(section[1])
+        if end <= start:
+            queue.put(("dl", "error", "Конец отрезка должен быть позже начала"))
+            return
+        from yt_dlp.utils import download_range_func
+        # Докачиваются только нужные байты (ffmpeg читает поток с -ss/-t)
+        base_opts['download_ranges'] = download_range_func(None, [(start, end)])
+        base_opts['force_keyframes_at_cuts'] = precise_section
+        # Разные отрезки одного ролика не должны перетирать друг друга
+        span = f"_{seconds_to_hms(start)}-{seconds_to_hms(end)}".replace(":", ".")
+        base_opts['outtmpl'] = os.path.join(folder, f'%(title)s{span}.%(ext)s')
+        # Архив помнит только ID ролика — другой отрезок того же видео был бы пропущен
+        base_opts.pop('download_archive', None)
+        archive = False
+    base_opts.update(ydl_overrides or {})
 
     try:
-        queue.put(("dl", "status", "Анализ видео..."))
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            ydl.download([url])
-        queue.put(("dl", "done", None))
+        queue.put(("dl", "status", "Анализ ссылок..."))
+        expand_opts = {"logger": base_opts["logger"], "nocheckcertificate": True, **(ydl_overrides or {})}
+        items = expand_urls(urls, expand_opts)
     except Exception as e:
-        status = "Отменено" if "CANCELED" in str(e) else f"Ошибка: {str(e)}"
-        queue.put(("dl", "error", status))
\ No newline at end of file
+        status = "Отменено" if cancel_event.is_set() else f"Ошибка: {str(e)}"
+        queue.put(("dl", "error", status))
+        return
+
+    queue.put(("dl", "items", [(job_id, title, url) for job_id, (url, title, _) in enumerate(items)]))
+    scheduler = JobScheduler(jobs or DOWNLOAD_JOBS, cancel_event)
+    batch = BatchProgress([1] * len(items))
+    finished = [0]
+    lock = threading.Lock()
+    stages = list(stages or [])
+    # Доля каждого этапа (загрузка + обработка) в прогрессе ролика
+    share = 1.0 / (1 + len(stages))
+    pipeline = ThreadPoolExecutor(max_workers=PIPELINE_JOBS) if stages else None
+    processing = []
+
+    def process(job_id, path):
+        current, produced = path, [path]
+        for i, stage in enumerate(stages):
+            if cancel_event.is_set(): return False
+            base = share * (i + 1)
+            on_fraction = lambda frac, base=base: queue.put(("dl", "progress", batch.update(job_id, base + share * frac)))
+            try:
+                current, error = run_stage(stage, current, queue, cancel_event, job_id, on_fraction)
+            except Exception as e:
+                current, error = None, str(e)
+            if error:
+                if cancel_event.is_set(): return False
+                queue.put(("dl", "job_status", (job_id, f"Ошибка: {error}")))
+                queue.put(("dl", "job_done", (job_id, False)))
+                return False
+            produced.append(current)
+        if not keep_intermediate:
+            for p in produced[:-1]:
+                if os.path.abspath(p) != os.path.abspath(current):
+                    try: os.remove(p)
+                    except OSError: pass
+        queue.put(("dl", "job_status", (job_id, "Готово")))
+        queue.put(("dl", "job_done", (job_id, True)))
+        queue.put(("dl", "progress", batch.update(job_id, 1.0)))
+        return True
+
+    def job(job_id, item):
+        url, title, info = item
+        if cancel_event.is_set(): return False
+
+        def progress_hook(d):
+            if cancel_event.is_set(): raise _Canceled("CANCELED")
+            if d['status'] == 'downloading':
+                total = d.get('total_bytes') or d.get('total_bytes_estimate')
+                if not total: return
+                frac = d.get('downloaded_bytes', 0) / total
+                queue.put(("dl", "job_progress", (job_id, int(min(frac, 1.0) * 100), "Загрузка")))
+                queue.put(("dl", "progress", batch.update(job_id, frac * share)))
+            elif d['status'] == 'finished':
+                # Видео и звук качаются отдельными файлами — складываем
+                size = d.get('downloaded_bytes') or d.get('total_bytes') or 0
+                stats.downloaded_bytes = (stats.downloaded_bytes or 0) + size
+
+        opts = dict(base_opts, progress_hooks=[progress_hook])
+        follower = None
+        if section:
+            # Отрезок качает ffmpeg, а yt-dlp не сообщает о его прогрессе — просим ffmpeg
+            # писать -progress в файл и считаем долю от длины отрезка, а не всего ролика
+            dur = float(info.get("duration") or 0)
+            section_len = (min(end, dur) if dur > start else end) - start
+            fd, progress_path = tempfile.mkstemp(prefix="neat_dl_", suffix=".progress")
+            os.close(fd)
+            opts['external_downloader_args'] = {'ffmpeg_o': ['-progress', progress_path]}
+            stop_follow = threading.Event()
+            def on_event(ev):
+                frac = 1.0 if ev.finished else min(ev.out_time / section_len, 1.0)
+                queue.put(("dl", "job_progress", (job_id, int(frac * 100), "Загрузка отрезка")))
+                queue.put(("dl", "progress", batch.update(job_id, frac * share)))
+            follower = threading.Thread(target=follow_progress_file, args=(progress_path, on_event, stop_follow), daemon=True)
+            follower.start()
+        ok = True
+        path = None
+        labels = {"url": url, "section": list(section) if section else None}
+        with JobStats("dl", job_id, [], **labels) as stats:
+            try:
+                with yt_dlp.YoutubeDL(opts) as ydl:
+                    # Уже скачанные раньше ролики пропускаем, не обращаясь к сайту
+                    if archive and info.get("id") and ydl.in_download_archive(info):
+                        queue.put(("dl", "job_status", (job_id, "Уже скачано")))
+                    else:
+                        queue.put(("dl", "job_status", (job_id, "Загрузка")))
+                        result = ydl.extract_info(url, download=True)
+                        # Итоговый путь — после склейки дорожек и прочей постобработки yt-dlp
+                        downloads = (result or {}).get("requested_downloads") or []
+                        path = downloads[-1].get("filepath") if downloads else None
+                        if not path and result:
+                            path = ydl.prepare_filename(result)
+                        queue.put(("dl", "job_status", (job_id, "Скачано" if stages else "Готово")))
+            except Exception as e:
+                if cancel_event.is_set(): return False
+                ok = False
+                queue.put(("dl", "job_status", (job_id, f"Ошибка: {e}")))
+            finally:
+                if follower is not None:
+                    stop_follow.set()
+                    follower.join(timeout=2)
+                    try: os.remove(progress_path)
+                    except OSError: pass
+        if path:
+            # Пропущенные по архиву и отменённые в метрики не попадают
+            queue.put(("dl", "metrics", stats.result(ok, [path])))
+        elif not ok:
+            queue.put(("dl", "metrics", stats.result(ok)))
+        if ok and path and pipeline is not None:
+            # Обработка уходит в отдельный пул, а этот поток берётся за следующий ролик
+            queue.put(("dl", "progress", batch.update(job_id, share)))
+            processing.append(pipeline.submit(process, job_id, path))
+        else:
+            queue.put(("dl", "job_done", (job_id, ok)))
+            queue.put(("dl", "progress", batch.update(job_id, 1.0)))
+        with lock:
+            finished[0] += 1
+            queue.put(("dl", "status", f"Скачано {finished[0]} из {len(items)}"))
+        return ok
+
+    results = scheduler.run(job, items)
+    failed = results.count(False)
+    if pipeline is not None:
+        queue.put(("dl", "status", "Обработка скачанного..."))
+        # Отмена видна воркерам этапов через тот же cancel_event — ждём их завершения
+        pipeline.shutdown(wait=True)
+        failed += sum(1 for f in processing if not f.result())
+    if cancel_event.is_set():
+        queue.put(("dl", "error", "Отменено"))
+    elif failed:
+        what = "скачать или обработать" if stages else "скачать"
+        queue.put(("dl", "error", f"Не удалось {what} {failed} из {len(items)}"))
+    else:
+        queue.put(("dl", "done", None))